@@ -0,0 +1,152 @@
+#!/usr/bin/env python
+"""
+Reports the bytes written and the cpu-time spent to write and read the
+archives in the work_dir of a slurm.array.Pool for each codec in
+pypoolparty.slurm.array.compressing on representative payloads.
+
+    python benchmarks/compression_codecs.py --num_members 1000
+"""
+
+import argparse
+import array
+import os
+import pickle
+import random
+import tempfile
+import time
+import zipfile
+from pypoolparty.slurm.array import compressing
+
+
+def make_stderr(prng, num_lines=40):
+    levels = ["DEBUG", "INFO", "WARNING"]
+    lines = []
+    for i in range(num_lines):
+        lines.append(
+            "2024-05-{:02d}T12:{:02d}:{:02d} {:s} step {:d} of {:d}: "
+            "energy {:.6e} GeV, {:d} photons\n".format(
+                prng.randint(1, 28),
+                prng.randint(0, 59),
+                prng.randint(0, 59),
+                prng.choice(levels),
+                i,
+                num_lines,
+                prng.uniform(1, 1e3),
+                prng.randint(0, 100000),
+            )
+        )
+    return "".join(lines).encode()
+
+
+def make_result_dict(prng, num_keys=200):
+    out = {}
+    for i in range(num_keys):
+        out["key_{:06d}".format(i)] = {
+            "value": prng.uniform(0, 1),
+            "count": prng.randint(0, 1000),
+            "label": prng.choice(["gamma", "proton", "electron", "helium"]),
+        }
+    return pickle.dumps(out)
+
+
+def make_result_floats(prng, num=20000):
+    return pickle.dumps(
+        array.array("d", [prng.gauss(0, 1) for i in range(num)])
+    )
+
+
+def make_random_bytes(prng, num=20000):
+    return bytes(prng.getrandbits(8) for i in range(num))
+
+
+PAYLOADS = {
+    "stderr_text": make_stderr,
+    "result_dict": make_result_dict,
+    "result_floats": make_result_floats,
+    "random_bytes": make_random_bytes,
+}
+
+CODECS = [
+    "stored",
+    ("deflate", 1),
+    ("deflate", 6),
+    ("deflate", 9),
+    ("bzip2", 1),
+    ("bzip2", 9),
+    "lzma",
+]
+
+
+def codec_to_str(codec):
+    if isinstance(codec, str):
+        return codec
+    return "{:s}:{:d}".format(codec[0], codec[1])
+
+
+def benchmark(path, members, codec):
+    zcodec = compressing.init_codec(codec)
+
+    start = time.process_time()
+    with compressing.open_zip_for_writing(path, zcodec) as zout:
+        for name, payload in members.items():
+            with zout.open(name=name, mode="w") as f:
+                f.write(payload)
+    write_time = time.process_time() - start
+
+    start = time.process_time()
+    with zipfile.ZipFile(path, "r") as zin:
+        for name in zin.namelist():
+            zin.read(name)
+    read_time = time.process_time() - start
+
+    return {
+        "num_bytes": os.stat(path).st_size,
+        "write_time": write_time,
+        "read_time": read_time,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="compression_codecs.py",
+        description=__doc__.splitlines()[1],
+    )
+    parser.add_argument("--num_members", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    prng = random.Random(args.seed)
+
+    header = "{:<14s} {:<10s} {:>12s} {:>8s} {:>10s} {:>10s}".format(
+        "payload", "codec", "bytes", "ratio", "write/s", "read/s"
+    )
+    print(header)
+    print("-" * len(header))
+
+    with tempfile.TemporaryDirectory(prefix="pypoolparty_bench_") as tmp:
+        for payload_name, make_payload in PAYLOADS.items():
+            members = {}
+            for i in range(args.num_members):
+                members["{:d}.{:s}".format(i, payload_name)] = make_payload(
+                    prng
+                )
+            num_raw = sum([len(m) for m in members.values()])
+
+            for codec in CODECS:
+                path = os.path.join(tmp, payload_name + ".zip")
+                r = benchmark(path=path, members=members, codec=codec)
+                print(
+                    "{:<14s} {:<10s} {:>12d} {:>8.2f} {:>10.3f} {:>10.3f}".format(
+                        payload_name,
+                        codec_to_str(codec),
+                        r["num_bytes"],
+                        num_raw / r["num_bytes"],
+                        r["write_time"],
+                        r["read_time"],
+                    )
+                )
+                os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
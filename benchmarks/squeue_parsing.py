@@ -0,0 +1,163 @@
+#!/usr/bin/env python
+"""
+Measures the parsing and classification of squeue's stdout: the format
+'%all' parsed into one dict per job and classified job by job, versus the
+projected format with only the needed fields parsed into columns and
+classified in bulk. And for a job-array with num_rows elements of which
+num_running are running: squeue with '--array' which reports every element
+in its own line, versus squeue without '--array' which reports the pending
+elements in a single line with a compact array_task_id.
+
+    python benchmarks/squeue_parsing.py --num_rows 100000
+
+The rows are cycled from the recorded stdout in the tests' resources.
+"""
+
+import argparse
+import os
+import time
+import json_line_logger
+from pypoolparty import utils
+from pypoolparty.slurm import calling
+from pypoolparty.slurm import organizing_jobs
+from pypoolparty.slurm.array import ranges
+
+QUIET = json_line_logger.LoggerStream(
+    stream=open(os.devnull, "wt"), name="quiet"
+)
+
+
+def make_stdouts(num_rows):
+    path = os.path.join(
+        utils.resources_path(),
+        "slurm",
+        "tests",
+        "resources",
+        "squeue_format_all.stdout",
+    )
+    with open(path, "rt") as f:
+        recorded = f.read()
+    jobs = calling._parse_stdout_format_all(recorded, logger=QUIET)
+    lines = recorded.splitlines()
+    header, rows = lines[0], lines[1:]
+    keys = list(calling.SQUEUE_FIELDS.keys())
+
+    full = [header]
+    projected = ["|".join(key.upper() for key in keys)]
+    for i in range(num_rows):
+        full.append(rows[i % len(rows)])
+        job = jobs[i % len(jobs)]
+        projected.append("|".join(job[key] for key in keys))
+    return "\n".join(full) + "\n", "\n".join(projected) + "\n"
+
+
+def make_array_stdouts(num_rows, num_running):
+    keys = list(calling.SQUEUE_FIELDS.keys())
+    header = "|".join(key.upper() for key in keys)
+    row = "abc|123_{:s}|{:s}|{:s}|4294901234|{:s}"
+
+    expanded = [header]
+    compact = [header]
+    for i in range(num_rows):
+        if i < num_running:
+            line = row.format(str(i), "RUNNING", "None", str(i))
+            expanded.append(line)
+            compact.append(line)
+        else:
+            expanded.append(
+                row.format(str(i), "PENDING", "JobArrayTaskLimit", str(i))
+            )
+    pending = "{:d}-{:d}%{:d}".format(num_running, num_rows - 1, num_running)
+    compact.append(
+        row.format(
+            "[" + pending + "]", "PENDING", "JobArrayTaskLimit", pending
+        )
+    )
+    return "\n".join(expanded) + "\n", "\n".join(compact) + "\n"
+
+
+def per_job(stdout):
+    jobs = calling._parse_stdout_format_all(stdout, logger=QUIET)
+    return organizing_jobs.split_jobs_in_running_pending_error(
+        jobs=jobs, logger=QUIET
+    )
+
+
+def columnar(stdout):
+    columns = calling._parse_stdout_columns(
+        stdout, keys=list(calling.SQUEUE_FIELDS.keys()), logger=QUIET
+    )
+    return organizing_jobs.split_columns_in_running_pending_error(
+        columns=columns, logger=QUIET
+    )
+
+
+def array_columnar(stdout):
+    columns = calling._parse_stdout_columns(
+        stdout, keys=list(calling.SQUEUE_FIELDS.keys()), logger=QUIET
+    )
+    running, pending, error = (
+        organizing_jobs.split_columns_in_running_pending_error(
+            columns=columns, logger=QUIET
+        )
+    )
+    return (
+        ranges.from_columns(columns=columns, indices=running),
+        ranges.from_columns(columns=columns, indices=pending),
+        error,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="squeue_parsing.py",
+        description=__doc__.splitlines()[1],
+    )
+    parser.add_argument("--num_rows", type=int, default=100000)
+    parser.add_argument("--num_running", type=int, default=500)
+    parser.add_argument("--num_repetitions", type=int, default=3)
+    args = parser.parse_args()
+
+    full, projected = make_stdouts(num_rows=args.num_rows)
+    expanded, compact = make_array_stdouts(
+        num_rows=args.num_rows, num_running=args.num_running
+    )
+    candidates = {
+        "%all, per job": (per_job, full),
+        "projected, columnar": (columnar, projected),
+        "array, expanded": (array_columnar, expanded),
+        "array, compact": (array_columnar, compact),
+    }
+
+    header = "{:<22s} {:>12s} {:>12s}".format(
+        "candidate", "stdout/MB", "min/s"
+    )
+    print(header)
+    print("-" * len(header))
+
+    results = {}
+    for name, (func, stdout) in candidates.items():
+        wall_times = []
+        for i in range(args.num_repetitions):
+            start = time.perf_counter()
+            results[name] = func(stdout)
+            wall_times.append(time.perf_counter() - start)
+        print(
+            "{:<22s} {:>12.3f} {:>12.3f}".format(
+                name, len(stdout) / 1e6, min(wall_times)
+            )
+        )
+
+    running, pending, error = results["%all, per job"]
+    assert len(running) == len(results["projected, columnar"][0])
+    assert len(pending) == len(results["projected, columnar"][1])
+    assert len(error) == len(results["projected, columnar"][2])
+
+    for i in range(2):
+        assert ranges.count(results["array, expanded"][i]) == ranges.count(
+            results["array, compact"][i]
+        )
+
+
+if __name__ == "__main__":
+    main()
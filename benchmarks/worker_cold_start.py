@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+"""
+Measures the cold-start time of a worker-node's python-process: importing
+the whole package pypoolparty (as the worker-node scripts did before) versus
+loading the stdlib-only pypoolparty.worker_runtime.
+
+    python benchmarks/worker_cold_start.py --num_repetitions 50
+
+Each repetition starts a fresh python-process. To see the effect of a slow
+shared filesystem, run it with the site-packages on NFS and with cold
+caches.
+"""
+
+import argparse
+import statistics
+import subprocess
+import sys
+import time
+from pypoolparty import worker_runtime
+
+REPORT = (
+    "import sys\n"
+    "print(len(sys.modules), int('pypoolparty' in sys.modules))\n"
+)
+
+CANDIDATES = {
+    "bare python": "import os\n",
+    "import pypoolparty": "import os\nimport pypoolparty as ppp\n",
+    "worker_runtime": "import os\n" + worker_runtime.make_load_string(),
+}
+
+
+def measure(python_path, code):
+    start = time.perf_counter()
+    out = subprocess.check_output([python_path, "-c", code + REPORT])
+    wall_time = time.perf_counter() - start
+    num_modules, pypoolparty_imported = [int(t) for t in out.split()]
+    return wall_time, num_modules, pypoolparty_imported
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        prog="worker_cold_start.py",
+        description=__doc__.splitlines()[1],
+    )
+    parser.add_argument("--num_repetitions", type=int, default=20)
+    parser.add_argument("--python_path", type=str, default=sys.executable)
+    args = parser.parse_args()
+
+    header = "{:<20s} {:>10s} {:>10s} {:>10s} {:>12s}".format(
+        "candidate", "median/ms", "min/ms", "modules", "pypoolparty"
+    )
+    print(header)
+    print("-" * len(header))
+
+    for name, code in CANDIDATES.items():
+        wall_times = []
+        for i in range(args.num_repetitions):
+            wall_time, num_modules, pypoolparty_imported = measure(
+                python_path=args.python_path, code=code
+            )
+            wall_times.append(wall_time)
+        print(
+            "{:<20s} {:>10.1f} {:>10.1f} {:>10d} {:>12s}".format(
+                name,
+                1e3 * statistics.median(wall_times),
+                1e3 * min(wall_times),
+                num_modules,
+                "yes" if pypoolparty_imported else "no",
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -7,4 +7,14 @@ from . import making_script
 from . import pooling
 from . import job_counter
 from . import debugging
+from . import flat_archive
+from . import oob_pickle
+from . import journal
+from . import environment
+from . import watching
+from . import cadence
+from . import status_cache
+from . import retrying
+from . import staging
+from . import submitting
 from . import testing
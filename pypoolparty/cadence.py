@@ -0,0 +1,141 @@
+"""
+The adaptive cadence of the polls in the loops of the pools.
+
+The loops poll two things: the scheduler, e.g. squeue or qstat, and the
+work_dir for new results. Each one has its own Cadence. A Cadence backs off
+exponentially from its min_interval to its max_interval while its polls do
+not find any change, and it falls back to its min_interval as soon as a
+poll finds a change, or when it is sped up because something else changed,
+e.g. new results arrived. Each decision is logged so that the intervals can
+be tuned.
+"""
+
+import time
+
+
+class Cadence:
+    def __init__(
+        self,
+        name,
+        min_interval,
+        max_interval=None,
+        factor=2.0,
+        logger=None,
+    ):
+        """
+        Parameters
+        ----------
+        name : str
+            The name in the log, e.g. 'scheduler'.
+        min_interval : float
+            The shortest time in seconds between two polls.
+        max_interval : float or None
+            The longest time in seconds between two polls. Default is
+            min_interval, i.e. a fixed interval.
+        factor : float
+            The interval grows by this factor after each poll which did not
+            find a change.
+        logger : logging.Logger or None
+            The decisions are logged in debug.
+        """
+        self.name = name
+        self.min_interval = float(min_interval)
+        assert self.min_interval >= 0.0
+        if max_interval is None:
+            max_interval = min_interval
+        self.max_interval = float(max_interval)
+        assert self.max_interval >= self.min_interval
+        self.factor = float(factor)
+        assert self.factor >= 1.0
+        self.logger = logger
+
+        self.interval = self.min_interval
+        self.last_poll = None
+        self.next_poll = time.monotonic()
+        self.num_polls = 0
+
+    def is_due(self, now=None):
+        now = time.monotonic() if now is None else now
+        return now >= self.next_poll
+
+    def seconds_until_due(self, now=None):
+        now = time.monotonic() if now is None else now
+        return max(0.0, self.next_poll - now)
+
+    def polled(self, changed, now=None):
+        """
+        Call this after each poll. When the poll found a change, the
+        interval falls back to min_interval, else it grows by factor up to
+        max_interval.
+        """
+        now = time.monotonic() if now is None else now
+        last_interval = self.interval
+        if changed:
+            self.interval = self.min_interval
+        else:
+            self.interval = min(self.max_interval, self.interval * self.factor)
+        self.last_poll = now
+        self.next_poll = now + self.interval
+        self.num_polls += 1
+        self._log(
+            "changed" if changed else "unchanged", last_interval, self.interval
+        )
+
+    def speed_up(self, reason, now=None):
+        """
+        Falls back to min_interval because something else changed. The next
+        poll is due min_interval after the last poll.
+        """
+        if self.interval <= self.min_interval:
+            return
+        now = time.monotonic() if now is None else now
+        last_interval = self.interval
+        self.interval = self.min_interval
+        if self.last_poll is None:
+            self.next_poll = now
+        else:
+            self.next_poll = min(
+                self.next_poll, self.last_poll + self.min_interval
+            )
+        self._log("sped up by " + reason, last_interval, self.interval)
+
+    def due_now(self, reason, now=None):
+        """
+        Makes the next poll due now and falls back to min_interval, e.g.
+        because the watcher found new results.
+        """
+        now = time.monotonic() if now is None else now
+        last_interval = self.interval
+        self.interval = self.min_interval
+        self.next_poll = now
+        self._log("due now by " + reason, last_interval, self.interval)
+
+    def _log(self, decision, last_interval, interval):
+        if self.logger is None:
+            return
+        self.logger.debug(
+            "Cadence {:s}: poll {:d} {:s}, "
+            "interval {:.3f}s -> {:.3f}s".format(
+                self.name, self.num_polls, decision, last_interval, interval
+            )
+        )
+
+    def __repr__(self):
+        return "{:s}(name={:s}, interval={:f})".format(
+            self.__class__.__name__, repr(self.name), self.interval
+        )
+
+
+def wait(cadences, watcher=None, wake_up=None):
+    """
+    Waits until the first of the cadences is due. When a watcher is given,
+    see watching.Watcher, and it wakes up because new results were
+    written, the cadences in wake_up are due now.
+    """
+    timeout = min(cadence.seconds_until_due() for cadence in cadences)
+    if watcher is None:
+        time.sleep(timeout)
+        return
+    if watcher.wait(timeout=timeout):
+        for cadence in wake_up or []:
+            cadence.due_now(reason="watcher")
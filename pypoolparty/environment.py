@@ -0,0 +1,64 @@
+"""
+The environment variables of the process calling map() are exported into
+the jobs on the worker-nodes. Instead of writing each variable into the
+worker-node's script, a snapshot of the variables is written only once per
+session into the work_dir as a compact json-file. The worker-node only sets
+the variables which differ from its own environment, see
+worker_runtime.apply_environ().
+"""
+
+import fnmatch
+import json
+import os
+from . import utils
+
+
+def environ_path(work_dir):
+    return os.path.join(work_dir, "environ.json")
+
+
+def snapshot(environ=None, allowlist=None, denylist=None):
+    """
+    Returns a dict of the environment variables to be exported into the
+    jobs on the worker-nodes.
+
+    Parameters
+    ----------
+    environ : dict or None
+        The environment variables. Default is os.environ.
+    allowlist : list of str or None
+        If provided, only the variables with a name matching at least one
+        of these patterns are exported, e.g. ["PATH", "OMP_*"].
+        See fnmatch.fnmatchcase().
+    denylist : list of str or None
+        The variables with a name matching at least one of these patterns
+        are not exported, e.g. ["SLURM_*", "SSH_*"].
+    """
+    if environ is None:
+        environ = os.environ
+
+    out = {}
+    for key in environ:
+        if allowlist is not None and not _matches_any(key, allowlist):
+            continue
+        if denylist is not None and _matches_any(key, denylist):
+            continue
+        out[key] = environ[key]
+    return out
+
+
+def _matches_any(key, patterns):
+    for pattern in patterns:
+        if fnmatch.fnmatchcase(key, pattern):
+            return True
+    return False
+
+
+def write(path, environ):
+    """
+    Writes the environment variables into a compact json-file at path.
+    Returns the size of the file in bytes.
+    """
+    content = json.dumps(environ, separators=(",", ":"), sort_keys=True)
+    utils.write_text(path=path, content=content)
+    return len(content.encode())
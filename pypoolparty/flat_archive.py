@@ -0,0 +1,145 @@
+"""
+A flat archive is a single data-file with the payloads written one after
+another, and an index-file with one fixed-width entry per payload.
+The i-th entry in the index holds the key, the offset, and the size of the
+i-th payload. Reading the i-th payload takes one small read in the index and
+one read in the data-file, independent of the number of payloads.
+Other than zip-files, there is no central directory to be parsed.
+"""
+
+import os
+import struct
+import mmap
+
+INDEX_ENTRY = struct.Struct("<QQQ")
+
+
+def index_path(path):
+    return os.path.splitext(path)[0] + ".idx"
+
+
+class Writer:
+    """
+    Appends payloads to a flat archive. While writing, the files have the
+    suffix '.part'. They are moved in place when the writer is closed, and
+    are removed when the writer is aborted, e.g. when an exception is
+    raised within its context.
+    """
+
+    def __init__(self, path, alignment=None):
+        """
+        Parameters
+        ----------
+        path : str
+            Path of the data-file. The index-file is next to it.
+        alignment : int or None
+            If provided, each payload starts at a multiple of alignment
+            within the data-file.
+        """
+        self.path = path
+        self.alignment = alignment
+        self.index_path = index_path(path)
+        self.fdata = open(self.path + ".part", "wb")
+        self.findex = open(self.index_path + ".part", "wb")
+        self.offset = 0
+        self.num = 0
+
+    def append(self, key, payload):
+        """
+        Parameters
+        ----------
+        key : int
+            A non negative integer to identify the payload, e.g. the task_id.
+        payload : bytes-like, or list of bytes-like
+            The payload. A list of chunks is written one after another
+            without joining the chunks first.
+        """
+        if self.alignment:
+            padding = (-self.offset) % self.alignment
+            self.fdata.write(bytes(padding))
+            self.offset += padding
+
+        chunks = payload if isinstance(payload, list) else [payload]
+        size = 0
+        for chunk in chunks:
+            size += self.fdata.write(chunk)
+        self.findex.write(INDEX_ENTRY.pack(key, self.offset, size))
+        self.offset += size
+        self.num += 1
+
+    def close(self):
+        self.fdata.close()
+        self.findex.close()
+        os.rename(self.path + ".part", self.path)
+        os.rename(self.index_path + ".part", self.index_path)
+
+    def abort(self):
+        self.fdata.close()
+        self.findex.close()
+        os.remove(self.path + ".part")
+        os.remove(self.index_path + ".part")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        if type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def __repr__(self):
+        return "{:s}(path={:s})".format(
+            self.__class__.__name__, repr(self.path)
+        )
+
+
+def read_index_entry(path, position):
+    """
+    Returns the (key, offset, size) of the payload at position.
+    """
+    with open(index_path(path), "rb", buffering=0) as f:
+        f.seek(position * INDEX_ENTRY.size)
+        entry = f.read(INDEX_ENTRY.size)
+    if len(entry) != INDEX_ENTRY.size:
+        raise KeyError(
+            "No position {:d} in index of {:s}.".format(position, path)
+        )
+    return INDEX_ENTRY.unpack(entry)
+
+
+def read(path, position):
+    """
+    Returns the key and the payload at position.
+    """
+    key, offset, size = read_index_entry(path=path, position=position)
+    with open(path, "rb") as f:
+        f.seek(offset)
+        payload = f.read(size)
+    return key, payload
+
+
+def read_view(path, position):
+    """
+    Returns the key and a memoryview of the payload at position.
+    The data-file is mapped into memory (copy on write) and the payload is
+    not copied.
+    """
+    key, offset, size = read_index_entry(path=path, position=position)
+    with open(path, "rb") as f:
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    return key, memoryview(mm)[offset : offset + size]
+
+
+def read_all(path):
+    """
+    Returns a dict of all payloads with their keys.
+    """
+    out = {}
+    with open(index_path(path), "rb") as f:
+        index = f.read()
+    with open(path, "rb") as f:
+        for key, offset, size in INDEX_ENTRY.iter_unpack(index):
+            f.seek(offset)
+            out[key] = f.read(size)
+    return out
@@ -0,0 +1,134 @@
+"""
+An append-only journal of records in a file.
+
+Each record is written with a single write() to a file opened with
+O_APPEND and is flushed to disk with fsync() before the writer continues.
+A writer which gets killed, e.g. by a timeout of its job, may leave a torn
+record at the end of the journal. Readers stop in front of a torn record.
+A writer which continues a journal repairs it first.
+
+Appending from many nodes is not atomic on every shared filesystem, e.g.
+NFS, so records of different writers can interleave or get torn in the
+middle of the journal. Each record has a checksum, and readers skip over
+garbage to the next MAGIC. A torn record is only waited for while nothing
+follows it.
+
+Layout of a record
+------------------
+    header  : MAGIC, key, size of payload, crc32 of key, size and payload
+    payload
+"""
+
+import os
+import struct
+import zlib
+
+MAGIC = b"pppj"
+HEADER = struct.Struct("<4sQQI")
+_KEY_AND_SIZE = struct.Struct("<QQ")
+
+
+def checksum(key, payload):
+    """
+    Returns the crc32 of the key, the size of the payload, and the payload.
+    """
+    crc = zlib.crc32(_KEY_AND_SIZE.pack(int(key), len(payload)))
+    return zlib.crc32(payload, crc)
+
+
+def open_for_appending(path):
+    """
+    Returns the file-descriptor of the journal at path opened for
+    appending. The journal is created if it does not exist.
+    """
+    return os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+
+def append(fd, key, payload):
+    """
+    Appends one record to the journal and flushes it to disk.
+
+    Parameters
+    ----------
+    fd : int
+        File-descriptor, see open_for_appending().
+    key : int
+        The key of the record, e.g. the index of a task.
+    payload : bytes-like
+        The payload of the record.
+    """
+    payload = bytes(payload)
+    record = HEADER.pack(
+        MAGIC, int(key), len(payload), checksum(key=key, payload=payload)
+    )
+    record += payload
+    view = memoryview(record)
+    while len(view) > 0:
+        num = os.write(fd, view)
+        view = view[num:]
+    os.fsync(fd)
+
+
+def read(path, offset=0):
+    """
+    Returns the complete records in the journal at path which start at or
+    after offset.
+
+    Parameters
+    ----------
+    path : str
+        Path to the journal.
+    offset : int
+        Where to start reading, e.g. the offset returned by a previous call.
+
+    Returns
+    -------
+    (records, offset) : (list, int)
+        The records are tuples of (key, payload) where payload is a
+        writable memoryview. The offset is the end of the last complete
+        record, or the start of the garbage or the torn record behind it.
+        A journal which does not exist has no records.
+    """
+    try:
+        with open(path, "rb") as f:
+            f.seek(offset)
+            buff = bytearray(f.read())
+    except FileNotFoundError:
+        return [], offset
+    data = memoryview(buff)
+
+    records = []
+    pos = 0
+    end = 0
+    while pos + HEADER.size <= len(data):
+        magic, key, size, crc = HEADER.unpack_from(data, pos)
+        if magic == MAGIC:
+            start = pos + HEADER.size
+            if start + size <= len(data):
+                payload = data[start : start + size]
+                if checksum(key=key, payload=payload) == crc:
+                    records.append((key, payload))
+                    pos = start + size
+                    end = pos
+                    continue
+            elif buff.find(MAGIC, pos + 1) < 0:
+                # Torn, or still being written.
+                break
+        # Garbage, skip to the next record.
+        pos = buff.find(MAGIC, pos + 1)
+        if pos < 0:
+            break
+
+    return records, offset + end
+
+
+def repair(path):
+    """
+    Returns all complete records in the journal at path and truncates a torn
+    record at its end, if any. Call this before continuing to append to a
+    journal which might have been written by a writer who got killed.
+    """
+    records, offset = read(path=path)
+    if os.path.exists(path) and os.stat(path).st_size > offset:
+        os.truncate(path, offset)
+    return records
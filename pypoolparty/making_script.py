@@ -1,19 +1,36 @@
 import io
+from . import worker_runtime
 
 
 def make(
     func_module,
     func_name,
-    environ,
+    environ=None,
     shebang=None,
     unpack_task_with_asterisk=False,
+    oob_pickle=False,
+    with_shared=False,
+    num_cores=1,
+    with_environ_snapshot=False,
+    task_timeout=None,
+    task_max_memory=None,
 ):
     """
     Returns a string that is a python-script.
     This python-script will be executed on the worker-node.
-    In here, the environment variables are set explicitly.
+    In here, the environment variables are set explicitly, either from
+    'environ', or from the snapshot 'environ.json' next to the chunk.
     It reads the chunk of tasks, runs result = func(task), and writes the
-    results. The script is called on the worker-node with a single argument:
+    results. The result of each task is appended to the chunk's journal
+    '{ichunk:09d}.pkl.journal' as soon as the task returns, see journal.
+    When the script runs again, e.g. after a resubmission, the tasks which
+    are already in the journal are not run again. Finally, all results of
+    the chunk are written to '{ichunk:09d}.pkl.out' and the journal is
+    removed, so that the results are not stored twice.
+    Before running the tasks, the script writes the time it took to start,
+    see worker_runtime.seconds_since_process_start(), and its hostname into
+    '{ichunk:09d}.pkl.startup.json'.
+    The script is called on the worker-node with a single argument:
 
     python worker_node_script.py /path/to/work_dir/{ichunk:09d}.pkl
 
@@ -23,14 +40,38 @@ def make(
         The name of the python module containing the function to be executed.
     func_name : str
         The name of the function to be executed.
-    environ : dict
-        The envirionment variables to be set when the script is executed on the
-        worker node.
+    environ : dict or None
+        The envirionment variables to be written into the script and to be
+        set when the script is executed on the worker node.
     shebang : str (optional)
         The first line string pointing to the executable for this script.
         Example: '#!/path/to/executable'
     unpack_task_with_asterisk : bool
         If True, the task will be unpacked into func using an asterisk '*'.
+    oob_pickle : bool
+        If True, the results are pickled with out-of-band buffers.
+    with_shared : bool
+        If True, the shared object is read once from 'shared.pkl' next to
+        the chunk and is handed to func as 'func(task, shared=shared)'.
+    num_cores : int or str
+        The tasks of the chunk are run on this many cores by a local pool of
+        forked processes. When 'auto', the number of cores allotted to the
+        job is read on the worker-node, see
+        worker_runtime.num_cores_allotted().
+    with_environ_snapshot : bool
+        If True, the environment variables are read from the snapshot
+        'environ.json' next to the chunk, see environment. Only the
+        variables which differ from the worker-node's own environment are
+        set. This happens before func_module is imported.
+    task_timeout : float or None
+        If set, each task is run in a forked process which is killed when
+        the task runs longer than this many seconds. The task's result is
+        then None and the script moves on to the next task of the chunk.
+        See worker_runtime.run_with_limits().
+    task_max_memory : int or None
+        If set, each task is run in a forked process with its address space
+        limited to this many bytes. A task which runs out of memory is
+        handled the same way as one which runs out of time.
     """
     scr = io.StringIO()
     if shebang:
@@ -40,34 +81,93 @@ def make(
     scr.write("# I will be executed on the worker-nodes.\n")
     scr.write("import os\n")
     scr.write("import sys\n")
+    scr.write("import json\n")
     scr.write("import pickle\n")
-    scr.write("import pypoolparty as ppp\n")
-    scr.write("import {:s}\n".format(func_module))
     scr.write("\n")
-    scr.write(make_os_environ_string(environ=environ))
+    if environ is not None:
+        scr.write(make_os_environ_string(environ=environ))
+        scr.write("\n")
+    scr.write(worker_runtime.make_load_string(name="rt"))
     scr.write("\n")
     scr.write("assert(len(sys.argv) == 2)\n")
-    scr.write("chunk = ppp.utils.read_pickle(path=sys.argv[1])\n")
-    scr.write("task_results = []\n")
-    scr.write("for j, task in enumerate(chunk):\n")
-    scr.write("    try:\n")
-    scr.write(
-        "        task_result = {func_module:s}.{func_name:s}({asterisk_or_not:s}task)\n".format(
-            func_module=func_module,
-            func_name=func_name,
-            asterisk_or_not=asterisk_or_not,
+    scr.write("work_dir = os.path.dirname(sys.argv[1])\n")
+    if with_environ_snapshot:
+        scr.write(
+            'num_environ_set = rt.apply_environ(os.path.join(work_dir, "environ.json"))\n'
         )
+    else:
+        scr.write("num_environ_set = 0\n")
+    scr.write("import {:s}\n".format(func_module))
+    scr.write("\n")
+    scr.write("chunk = rt.read_pickle(path=sys.argv[1])\n")
+    if with_shared:
+        scr.write("shared = rt.read_pickle(\n")
+        scr.write('    path=os.path.join(work_dir, "shared.pkl")\n')
+        scr.write(")\n")
+    scr.write("rt.write_text(\n")
+    scr.write('    path=sys.argv[1] + ".startup.json",\n')
+    scr.write("    content=json.dumps(\n")
+    scr.write("        {\n")
+    scr.write('            "hostname": os.uname().nodename,\n')
+    scr.write('            "startup": rt.seconds_since_process_start(),\n')
+    scr.write('            "num_environ_set": num_environ_set,\n')
+    scr.write("        }\n")
+    scr.write("    ),\n")
+    scr.write(")\n")
+    dumps = "rt.oob_pickle.dumps" if oob_pickle else "pickle.dumps"
+    scr.write('journal_path = sys.argv[1] + ".journal"\n')
+    scr.write("task_results = [None for task in chunk]\n")
+    scr.write("returned = set()\n")
+    scr.write("for j, payload in rt.journal.repair(path=journal_path):\n")
+    scr.write("    task_results[j] = rt.oob_pickle.loads(payload)\n")
+    scr.write("    returned.add(j)\n")
+    scr.write("\n")
+    scr.write("\n")
+    scr.write("def run(j):\n")
+    scr.write("    try:\n")
+    call = "{func_module:s}.{func_name:s}({asterisk_or_not:s}chunk[j]{shared_or_not:s})".format(
+        func_module=func_module,
+        func_name=func_name,
+        asterisk_or_not=asterisk_or_not,
+        shared_or_not=", shared=shared" if with_shared else "",
     )
+    if task_timeout is None and task_max_memory is None:
+        scr.write("        task_result = {:s}\n".format(call))
+    else:
+        scr.write("        task_result = rt.run_with_limits(\n")
+        scr.write("            lambda: {:s},\n".format(call))
+        scr.write("            timeout={:s},\n".format(repr(task_timeout)))
+        scr.write(
+            "            max_memory={:s},\n".format(repr(task_max_memory))
+        )
+        scr.write("        )\n")
+    scr.write("        return j, {:s}(task_result)\n".format(dumps))
     scr.write("    except Exception as bad:\n")
     scr.write('        print("[task ", j, ", in chunk]", file=sys.stderr)\n')
     scr.write("        print(bad, file=sys.stderr)\n")
-    scr.write("        task_result = None\n")
-    scr.write("    task_results.append(task_result)\n")
+    scr.write("        return j, {:s}(None)\n".format(dumps))
+    scr.write("\n")
+    scr.write("\n")
+    scr.write(
+        "num_cores = rt.num_cores_allotted(num_cores={:s})\n".format(
+            repr(num_cores)
+        )
+    )
+    scr.write("js = [j for j in range(len(chunk)) if j not in returned]\n")
+    scr.write("journal = rt.journal.open_for_appending(path=journal_path)\n")
+    scr.write(
+        "for j, payload in rt.imap_unordered_on_cores(run, js, num_cores):\n"
+    )
+    scr.write("    rt.journal.append(fd=journal, key=j, payload=payload)\n")
+    scr.write("    task_results[j] = rt.oob_pickle.loads(payload)\n")
+    scr.write("os.close(journal)\n")
     scr.write("\n")
-    scr.write("ppp.utils.write_pickle(\n")
+    scr.write("rt.write_pickle(\n")
     scr.write('    path=sys.argv[1]+".out",\n')
     scr.write("    content=task_results,\n")
+    scr.write("    oob={:s},\n".format(repr(bool(oob_pickle))))
     scr.write(")\n")
+    scr.write("os.remove(journal_path)\n")
     scr.seek(0)
     return scr.read()
 
@@ -0,0 +1,250 @@
+"""
+Pickle with protocol 5 and out-of-band buffers.
+
+Large contiguous buffers, such as the data of numpy arrays, are not copied
+into the pickle-stream but are written next to it, each one aligned to
+ALIGNMENT bytes. A reader can mmap the file and rebuild the objects on top
+of the mapped buffers without copying them.
+
+Layout
+------
+    header       : MAGIC, size of pickle-stream, number of buffers
+    table        : (offset, size) of each buffer
+    pickle-stream
+    buffers      : each one starting at a multiple of ALIGNMENT
+
+All offsets are relative to the start of the header.
+Objects pickled without this module can still be read by loads() and read()
+as these fall back to pickle.loads() when MAGIC is missing.
+"""
+
+import pickle
+import struct
+import mmap
+import zipfile
+import time
+
+MAGIC = b"ppp-oob5"
+ALIGNMENT = 64
+HEADER = struct.Struct("<8sQQ")
+TABLE_ENTRY = struct.Struct("<QQ")
+
+# The fixed part of a zip-file's local file header, see section 4.3.7 of
+# PKWARE's APPNOTE.TXT. It is followed by the file name and the extra field.
+ZIP_LOCAL_FILE_HEADER_SIZE = 30
+
+
+def _padding(offset, alignment=ALIGNMENT):
+    return (-offset) % alignment
+
+
+def dumps_to_chunks(obj):
+    """
+    Returns a list of bytes-like chunks which, when written one after
+    another, are the serialized obj. The out-of-band buffers are not copied.
+    """
+    buffers = []
+    stream = pickle.dumps(obj, protocol=5, buffer_callback=buffers.append)
+    raws = [buffer.raw() for buffer in buffers]
+
+    offset = HEADER.size + TABLE_ENTRY.size * len(raws) + len(stream)
+    table = []
+    chunks = [None, None, stream]
+    for raw in raws:
+        padding = _padding(offset)
+        if padding:
+            chunks.append(bytes(padding))
+        offset += padding
+        table.append(TABLE_ENTRY.pack(offset, raw.nbytes))
+        chunks.append(raw)
+        offset += raw.nbytes
+
+    chunks[0] = HEADER.pack(MAGIC, len(stream), len(raws))
+    chunks[1] = b"".join(table)
+    return chunks
+
+
+def dumps(obj):
+    return b"".join(dumps_to_chunks(obj))
+
+
+def dump(obj, file):
+    for chunk in dumps_to_chunks(obj):
+        file.write(chunk)
+
+
+def is_oob(buffer):
+    return bytes(buffer[0 : len(MAGIC)]) == MAGIC
+
+
+def loads(buffer):
+    """
+    Returns the object in buffer. The out-of-band buffers of the object are
+    views into buffer and are not copied.
+    If buffer does not start with MAGIC, it is passed to pickle.loads().
+
+    Parameters
+    ----------
+    buffer : bytes-like
+        E.g. bytes, or a memoryview of a mmap.
+    """
+    if not is_oob(buffer):
+        return pickle.loads(buffer)
+
+    view = memoryview(buffer)
+    _, stream_size, num_buffers = HEADER.unpack_from(view, 0)
+    buffers = []
+    for i in range(num_buffers):
+        offset, size = TABLE_ENTRY.unpack_from(
+            view, HEADER.size + i * TABLE_ENTRY.size
+        )
+        buffers.append(view[offset : offset + size])
+
+    stream_start = HEADER.size + num_buffers * TABLE_ENTRY.size
+    stream = view[stream_start : stream_start + stream_size]
+    return pickle.loads(stream, buffers=buffers)
+
+
+def mmap_file(file):
+    """
+    Returns a writable copy-on-write mmap of the open file.
+    Objects rebuilt on top of it can be modified without touching the file.
+    """
+    return mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_COPY)
+
+
+def read(path):
+    """
+    Returns the object in the file at path. If the file was written with
+    dump(), it is mapped into memory and the out-of-band buffers are not
+    copied.
+    """
+    with open(path, "rb") as f:
+        magic = f.read(len(MAGIC))
+        if magic != MAGIC:
+            f.seek(0)
+            return pickle.loads(f.read())
+        mm = mmap_file(f)
+    return loads(memoryview(mm))
+
+
+def open_aligned_zip_member_for_writing(zout, name, alignment=ALIGNMENT):
+    """
+    Opens a new member in the zip-file for writing such that the member's
+    data starts at a multiple of alignment within the zip-file.
+    The member's local header is padded with an extra field.
+    Only makes sense for members which are not compressed.
+
+    Parameters
+    ----------
+    zout : zipfile.ZipFile
+        Opened for writing.
+    name : str
+        Name of the new member.
+    """
+    zinfo = zipfile.ZipInfo(
+        filename=name, date_time=time.localtime(time.time())[:6]
+    )
+    zinfo.compress_type = zout.compression
+    local_header_size = ZIP_LOCAL_FILE_HEADER_SIZE + len(name.encode("utf-8"))
+    extra_field_header_size = 4
+    try:
+        # The local header of the new member is written where the file
+        # currently is.
+        header_offset = zout.fp.tell()
+    except (AttributeError, OSError):
+        header_offset = None
+
+    if header_offset is None:
+        padding = 0
+    else:
+        start = header_offset + local_header_size + extra_field_header_size
+        padding = _padding(start, alignment=alignment)
+    zinfo.extra = struct.pack("<HH", 0xD935, padding) + bytes(padding)
+    return zout.open(zinfo, mode="w")
+
+
+def read_zip_member(path, zin, name):
+    """
+    Returns the object in the member of the zip-file. When the member is
+    not compressed, the zip-file is mapped into memory and the out-of-band
+    buffers are not copied.
+
+    Parameters
+    ----------
+    path : str
+        Path to the zip-file.
+    zin : zipfile.ZipFile
+        The zip-file opened for reading.
+    name : str
+        Name of the member.
+    """
+    zinfo = zin.getinfo(name)
+    if not _is_oob_zip_member(zin=zin, zinfo=zinfo):
+        return loads(zin.read(zinfo.filename))
+    with open(path, "rb") as f:
+        mm = mmap_file(f)
+    return _loads_zip_member(view=memoryview(mm), zin=zin, zinfo=zinfo)
+
+
+def read_all_zip_members(path, map_into_memory=True):
+    """
+    Returns a dict of the objects in all members of the zip-file.
+    When a member was written with dump() and is not compressed, the
+    zip-file is mapped into memory, only once, and the out-of-band buffers
+    are not copied.
+
+    Parameters
+    ----------
+    path : str
+        Path to the zip-file.
+    map_into_memory : bool
+        If False, the zip-file is not mapped and each member is read into
+        its own writable buffer. Use this when the zip-file is removed while
+        the objects are still in use. On NFS, a file which is still mapped
+        can not be removed.
+    """
+    out = {}
+    with open(path, "rb") as f, zipfile.ZipFile(f, "r") as zin:
+        zinfos = zin.infolist()
+        view = None
+        if map_into_memory and any(
+            _is_oob_zip_member(zin=zin, zinfo=zinfo) for zinfo in zinfos
+        ):
+            view = memoryview(mmap_file(f))
+
+        for zinfo in zinfos:
+            if view is None:
+                out[zinfo.filename] = loads(
+                    bytearray(zin.read(zinfo.filename))
+                )
+            else:
+                out[zinfo.filename] = _loads_zip_member(
+                    view=view, zin=zin, zinfo=zinfo
+                )
+    return out
+
+
+def _is_oob_zip_member(zin, zinfo):
+    if zinfo.compress_type != zipfile.ZIP_STORED:
+        return False
+    with zin.open(zinfo) as fin:
+        return is_oob(fin.read(len(MAGIC)))
+
+
+def _loads_zip_member(view, zin, zinfo):
+    if zinfo.compress_type != zipfile.ZIP_STORED:
+        return loads(zin.read(zinfo.filename))
+    start = member_data_offset(view=view, zinfo=zinfo)
+    return loads(view[start : start + zinfo.file_size])
+
+
+def member_data_offset(view, zinfo):
+    """
+    Returns the offset of the member's data in the zip-file.
+    The size of the extra field in the local header may differ from the one
+    in the central directory, so it is read from the local header.
+    """
+    offset = zinfo.header_offset
+    filename_size, extra_size = struct.unpack_from("<HH", view, offset + 26)
+    return offset + ZIP_LOCAL_FILE_HEADER_SIZE + filename_size + extra_size
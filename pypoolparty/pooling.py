@@ -1,7 +1,12 @@
 import os
 import stat
 import time
+import json
+import statistics
+import threading
 from . import utils
+from . import journal
+from . import oob_pickle
 
 
 def session_id_from_time_now():
@@ -22,23 +27,154 @@ def chunk_path(work_dir, ichunk):
     return os.path.join(work_dir, "{:09d}.pkl".format(ichunk))
 
 
-def map_tasks_into_work_dir(work_dir, tasks, chunks, session_id):
+def shared_path(work_dir):
+    return os.path.join(work_dir, "shared.pkl")
+
+
+def map_tasks_into_work_dir(
+    work_dir, tasks, chunks, session_id, oob_pickle=False
+):
     jobnames_in_session = set()
     for ichunk, chunk in enumerate(chunks):
-        jobname = make_jobname_from_ichunk(
-            session_id=session_id,
+        jobname = write_chunk_into_work_dir(
+            work_dir=work_dir,
+            tasks=tasks,
+            chunk=chunk,
             ichunk=ichunk,
+            session_id=session_id,
+            oob_pickle=oob_pickle,
         )
         jobnames_in_session.add(jobname)
-        chunk_payload = [tasks[itask] for itask in chunk]
-        utils.write_pickle(
-            path=chunk_path(work_dir, ichunk),
-            content=chunk_payload,
-        )
     return jobnames_in_session
 
 
-def reduce_task_results_from_work_dir(work_dir, chunks, logger):
+def write_chunk_into_work_dir(
+    work_dir, tasks, chunk, ichunk, session_id, oob_pickle=False
+):
+    """
+    Writes the tasks in the chunk into the work_dir and returns the
+    chunk's jobname.
+    """
+    chunk_payload = [tasks[itask] for itask in chunk]
+    utils.write_pickle(
+        path=chunk_path(work_dir, ichunk),
+        content=chunk_payload,
+        oob=oob_pickle,
+    )
+    return make_jobname_from_ichunk(session_id=session_id, ichunk=ichunk)
+
+
+def journal_path(work_dir, ichunk):
+    return chunk_path(work_dir, ichunk) + ".journal"
+
+
+def read_task_results_from_journals(
+    work_dir, chunks, task_results_by_ichunk, journal_offsets, chunks_done=None
+):
+    """
+    Reads the results of the tasks which were appended to the chunks'
+    journals since the last call. The worker-nodes append the result of
+    each task to the journal of its chunk as soon as the task returns.
+    So the results can be read while the chunks are still running.
+    Only the bytes behind a journal's offset are read, and the journals of
+    the chunks with all their results read, or in chunks_done, are not
+    opened anymore. When a chunk is done, its worker-node removes the
+    journal and its results are in '{ichunk:09d}.pkl.out', see
+    find_chunks_done() and reduce_task_results_from_work_dir().
+
+    Parameters
+    ----------
+    work_dir : str
+        Path to the session's work_dir.
+    chunks : list of lists
+        The indices of the tasks in each chunk.
+    task_results_by_ichunk : dict
+        Maps ichunk to a dict which maps the index of a task in its chunk to
+        the task's result. Is updated in place.
+    journal_offsets : dict
+        Maps ichunk to the (inode, offset) up to which its journal was read.
+        When the journal is gone, or was replaced, e.g. by a resubmission,
+        it is read again from its start. Is updated in place.
+    chunks_done : set or None
+        The ichunks whose journals are not read anymore.
+
+    Returns
+    -------
+    num_new : int
+        The number of results read in this call.
+    """
+    chunks_done = set() if chunks_done is None else chunks_done
+    num_new = 0
+    for ichunk, chunk in enumerate(chunks):
+        task_results = task_results_by_ichunk.setdefault(ichunk, {})
+        if len(task_results) == len(chunk) or ichunk in chunks_done:
+            continue
+        path = journal_path(work_dir, ichunk)
+        try:
+            journal_stat = os.stat(path)
+        except FileNotFoundError:
+            journal_offsets.pop(ichunk, None)
+            continue
+        inode, offset = journal_offsets.get(ichunk, (journal_stat.st_ino, 0))
+        if inode != journal_stat.st_ino or offset > journal_stat.st_size:
+            offset = 0
+        records, offset = journal.read(path=path, offset=offset)
+        journal_offsets[ichunk] = (journal_stat.st_ino, offset)
+        for j, payload in records:
+            if j not in task_results:
+                task_results[j] = oob_pickle.loads(payload)
+                num_new += 1
+    return num_new
+
+
+def find_chunks_done(work_dir, chunks, task_results_by_ichunk, chunks_done):
+    """
+    Adds the chunks which are done to chunks_done. A chunk is done when all
+    its results were read from its journal, or when its
+    '{ichunk:09d}.pkl.out' exists. The worker-node writes the '.pkl.out'
+    last and then removes the chunk's journal, so the '.pkl.out' is the
+    chunk's signal of completion.
+
+    Parameters
+    ----------
+    work_dir : str
+        Path to the session's work_dir.
+    chunks : list of lists
+        The indices of the tasks in each chunk.
+    task_results_by_ichunk : dict
+        See read_task_results_from_journals().
+    chunks_done : set
+        The ichunks which are done. Is updated in place.
+
+    Returns
+    -------
+    num_new : int
+        The number of chunks found to be done in this call.
+    """
+    num_new = 0
+    for ichunk, chunk in enumerate(chunks):
+        if ichunk in chunks_done:
+            continue
+        num_results = len(task_results_by_ichunk.get(ichunk, {}))
+        if num_results == len(chunk) or os.path.exists(
+            chunk_path(work_dir, ichunk) + ".out"
+        ):
+            chunks_done.add(ichunk)
+            num_new += 1
+    return num_new
+
+
+def reduce_task_results_from_work_dir(
+    work_dir, chunks, logger, task_results_by_ichunk=None
+):
+    """
+    Returns the results of all tasks. A chunk's results are taken from its
+    journal when the journal holds all of them, see
+    read_task_results_from_journals(), and from '{ichunk:09d}.pkl.out'
+    otherwise.
+    """
+    if task_results_by_ichunk is None:
+        task_results_by_ichunk = {}
     task_results = []
     task_results_are_incomplete = False
 
@@ -46,6 +182,11 @@ def reduce_task_results_from_work_dir(work_dir, chunks, logger):
         num_tasks_in_chunk = len(chunk)
         chunk_result_path = chunk_path(work_dir, ichunk) + ".out"
 
+        journaled = task_results_by_ichunk.get(ichunk, {})
+        if len(journaled) == num_tasks_in_chunk:
+            task_results += [journaled[j] for j in range(num_tasks_in_chunk)]
+            continue
+
         try:
             chunk_result = utils.read_pickle(path=chunk_result_path)
             for task_result in chunk_result:
@@ -55,11 +196,84 @@ def reduce_task_results_from_work_dir(work_dir, chunks, logger):
             logger.warning(
                 "Expected results in: {:s}".format(chunk_result_path)
             )
-            task_results += [None for i in range(num_tasks_in_chunk)]
+            task_results += [
+                journaled.get(j, None) for j in range(num_tasks_in_chunk)
+            ]
 
     return task_results_are_incomplete, task_results
 
 
+def job_ids_path(work_dir):
+    return os.path.join(work_dir, "job_ids.jsonl")
+
+
+_JOB_IDS_LOCK = threading.Lock()
+
+
+def append_job_id(work_dir, jobname, job_id):
+    """
+    Appends the job_id the scheduler assigned to the job with jobname.
+    A resubmitted job gets a new job_id which is appended as well.
+    The jobs are submitted by several threads, see submitting.
+    """
+    with _JOB_IDS_LOCK:
+        with open(job_ids_path(work_dir), "at") as f:
+            f.write(json.dumps({"jobname": jobname, "job_id": job_id}) + "\n")
+
+
+def read_job_ids(work_dir):
+    """
+    Returns the latest job_id of each jobname, see append_job_id().
+    """
+    job_ids = {}
+    try:
+        with open(job_ids_path(work_dir), "rt") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    job_ids[record["jobname"]] = record["job_id"]
+    except FileNotFoundError:
+        pass
+    return job_ids
+
+
+def startup_path(work_dir, ichunk):
+    return chunk_path(work_dir, ichunk) + ".startup.json"
+
+
+def summarize_worker_startups(work_dir, num_chunks):
+    """
+    Returns a one-line summary of the times the worker-nodes took to start
+    up, i.e. from the start of their python-process until they started to
+    run their first task, and of the number of environment variables they
+    had to set. See making_script.make().
+    """
+    startups = []
+    nums_environ_set = []
+    for ichunk in range(num_chunks):
+        try:
+            with open(startup_path(work_dir, ichunk), "rt") as f:
+                startup = json.loads(f.read())
+        except FileNotFoundError:
+            continue
+        if startup["startup"] is not None:
+            startups.append(startup["startup"])
+        nums_environ_set.append(startup["num_environ_set"])
+
+    if len(startups) == 0:
+        return "worker-node start-up: unknown"
+    return (
+        "worker-node start-up: num {:d}, min {:.3f}s, median {:.3f}s, "
+        "max {:.3f}s, median num. environment variables set {:.0f}".format(
+            len(startups),
+            min(startups),
+            statistics.median(startups),
+            max(startups),
+            statistics.median(nums_environ_set),
+        )
+    )
+
+
 def has_invalid_or_non_empty_stderr(
     work_dir, num_chunks, filter_stderr_func=None
 ):
@@ -3,17 +3,37 @@ from . import making_script
 from . import job_counter
 from . import pooling
 from . import chunking
+from . import staging
+from . import environment
+from . import watching
+from . import cadence
 
 import json_line_logger
 import os
 import shutil
-import time
 import json
+import functools
 
 
 class Pool:
     """
     A pool of compute resources on a distributed compute cluster.
+
+    The scheduler is called by these functions, each one also gets its
+    own **kwargs, see e.g. pypoolparty.slurm.Pool:
+
+    submit_func(jobname, script_path, script_arguments, stdout_path,
+        stderr_path, logger)
+        Submits a job and returns its job_id, or None.
+    status_func(jobnames, logger, job_ids)
+        Returns a dict with the lists of the 'running', 'pending', and
+        'error' jobs. A job is a dict with at least its 'name'. job_ids
+        are the job_ids returned by submit_func, or None.
+    delete_func(job, logger)
+        Deletes one job in an error state.
+    delete_many_func(jobs, logger)
+        Optional. Deletes all the jobs in an error state at once. When
+        it is None, delete_func is called for each job.
     """
 
     def __init__(
@@ -21,6 +41,9 @@ class Pool:
         num_chunks=None,
         python_path=None,
         polling_interval=5.0,
+        max_polling_interval=None,
+        reduction_interval=None,
+        max_reduction_interval=None,
         work_dir=None,
         keep_work_dir=False,
         max_num_resubmissions=10,
@@ -32,6 +55,18 @@ class Pool:
         delete_func=None,
         delete_func_kwargs=None,
         filter_stderr_func=None,
+        oob_pickle=False,
+        num_staging_threads=4,
+        max_num_chunks_in_flight=None,
+        num_cores_per_job=1,
+        task_timeout=None,
+        task_max_memory=None,
+        watch_work_dir=False,
+        environ_allowlist=None,
+        environ_denylist=None,
+        num_submit_threads=4,
+        max_submit_rate=None,
+        delete_many_func=None,
     ):
         """
         Parameters
@@ -46,9 +81,21 @@ class Pool:
         python_path : str or None
             The python path to be used on the computing-cluster's worker-nodes
             to execute the worker-node's python-script.
-        polling_interval : float or None
-            The time in seconds to wait before polling squeue again while
-            waiting for the jobs to finish.
+        polling_interval : float
+            The minimum time in seconds to wait before polling the scheduler
+            again while waiting for the jobs to finish.
+        max_polling_interval : float or None
+            While the polls of the scheduler do not find a change, the time
+            between them grows up to this many seconds. When the jobs change
+            or results arrive, it falls back to polling_interval. Default is
+            12 times polling_interval. See cadence.
+        reduction_interval : float or None
+            The minimum time in seconds to wait before reading new results
+            from the work_dir again. Default is polling_interval.
+        max_reduction_interval : float or None
+            While no new results are found, the time between reading the
+            work_dir grows up to this many seconds. Default is 12 times
+            reduction_interval.
         work_dir : str
             The directory path where the tasks, the results and the
             worker-node-script is stored.
@@ -59,12 +106,75 @@ class Pool:
             often to be resubmitted befor giving up on it.
         verbose : bool
             If true, the pool will print the state of its jobs to stdout.
+        oob_pickle : bool
+            If True, the chunks of tasks and their results are pickled with
+            protocol 5 and their large buffers, e.g. the data of numpy arrays,
+            are written out-of-band and aligned to 64 bytes. The files are
+            mapped into memory when read and the buffers are not copied.
+        num_staging_threads : int
+            The chunks of tasks are written into the work_dir by this many
+            threads, and each chunk is submitted as soon as it is written.
+        max_num_chunks_in_flight : int or None
+            Up to this many chunks are being written or are waiting to be
+            submitted at a time. Default is four times num_staging_threads.
+        num_cores_per_job : int or str
+            The tasks of a chunk are run on this many cores by a local pool
+            of forked processes on the worker-node. When 'auto', the number
+            of cores is read from 'SLURM_CPUS_PER_TASK' or 'NSLOTS' on the
+            worker-node. Default is 1, i.e. the tasks of a chunk are run one
+            after another.
+        task_timeout : float or None
+            If set, each task is run in a forked process on the worker-node
+            which is killed when the task runs longer than this many
+            seconds. The job then moves on to the next task of its chunk
+            and the task's result is None.
+        task_max_memory : int or None
+            If set, each task is run in a forked process on the worker-node
+            with its address space limited to this many bytes. A task which
+            runs out of memory is handled like one which runs out of time.
+        watch_work_dir : bool
+            If True, the work_dir is watched with inotify and the loop
+            which waits for the results wakes up as soon as a chunk's
+            results are written instead of sleeping until the next poll.
+            The chunk is then done, and the scheduler is polled right away
+            to find out whether all jobs have left the queue.
+            This falls back to polling when inotify is not available, or
+            when the work_dir is on a shared filesystem, e.g. NFS.
+            See watching.
+        environ_allowlist : list of str or None
+            If provided, only the environment variables with a name matching
+            one of these patterns are exported into the jobs, e.g.
+            ["PATH", "PYTHON*", "OMP_*"]. See fnmatch.fnmatchcase().
+            Default is to export all environment variables.
+        environ_denylist : list of str or None
+            The environment variables with a name matching one of these
+            patterns are not exported into the jobs, e.g. ["SSH_*"].
+        num_submit_threads : int
+            Up to this many jobs are submitted at the same time, i.e. this
+            many calls of e.g. 'sbatch' or 'qsub' run concurrently. Each
+            call keeps its own retries. The throughput is logged.
+        max_submit_rate : float or None
+            Up to this many submissions are started per second, so that the
+            scheduler is not flooded. None means no limit.
         """
         if python_path is None:
             self.python_path = utils.default_python_path()
         else:
             self.python_path = python_path
-        self.polling_interval = polling_interval
+        self.polling_interval = float(polling_interval)
+        assert self.polling_interval > 0.0
+        if max_polling_interval is None:
+            max_polling_interval = 12 * self.polling_interval
+        self.max_polling_interval = float(max_polling_interval)
+        assert self.max_polling_interval >= self.polling_interval
+        if reduction_interval is None:
+            reduction_interval = self.polling_interval
+        self.reduction_interval = float(reduction_interval)
+        assert self.reduction_interval > 0.0
+        if max_reduction_interval is None:
+            max_reduction_interval = 12 * self.reduction_interval
+        self.max_reduction_interval = float(max_reduction_interval)
+        assert self.max_reduction_interval >= self.reduction_interval
         self.work_dir = work_dir
         self.keep_work_dir = keep_work_dir
         self.max_num_resubmissions = max_num_resubmissions
@@ -74,10 +184,33 @@ class Pool:
         self.submit_func_kwargs = submit_func_kwargs
         self.delete_func = delete_func
         self.delete_func_kwargs = delete_func_kwargs
+        self.delete_many_func = delete_many_func
         self.status_func = status_func
         self.status_func_kwargs = status_func_kwargs
         self.filter_stderr_func = filter_stderr_func
         self.verbose = verbose
+        self.oob_pickle = bool(oob_pickle)
+        self.num_staging_threads = int(num_staging_threads)
+        assert self.num_staging_threads > 0
+        self.max_num_chunks_in_flight = max_num_chunks_in_flight
+        if num_cores_per_job != "auto":
+            num_cores_per_job = int(num_cores_per_job)
+            assert num_cores_per_job >= 1
+        self.num_cores_per_job = num_cores_per_job
+        self.task_timeout = (
+            None if task_timeout is None else float(task_timeout)
+        )
+        self.task_max_memory = (
+            None if task_max_memory is None else int(task_max_memory)
+        )
+        self.watch_work_dir = bool(watch_work_dir)
+        self.environ_allowlist = environ_allowlist
+        self.environ_denylist = environ_denylist
+        self.num_submit_threads = int(num_submit_threads)
+        assert self.num_submit_threads > 0
+        self.max_submit_rate = (
+            None if max_submit_rate is None else float(max_submit_rate)
+        )
 
     def __repr__(self):
         return self.__class__.__name__ + "()"
@@ -86,7 +219,12 @@ class Pool:
         print("[pypoolparty]", utils.time_now_iso8601(), msg)
 
     def map(
-        self, func, iterable, chunksize=None, _unpack_task_with_asterisk=False
+        self,
+        func,
+        iterable,
+        chunksize=None,
+        shared=None,
+        _unpack_task_with_asterisk=False,
     ):
         """
         Apply `func` to each element in `iterable`, collecting the results
@@ -102,6 +240,11 @@ class Pool:
             List of tasks. Each task must be a valid input to 'func'.
         chunksize : int
             Number of tasks to run sequentially in a single job.
+        shared : object or None
+            If provided, this object is written into the work_dir only once
+            and not into every chunk of tasks. It is read once by each job
+            and handed to func as 'func(task, shared=shared)'. Use this for
+            large objects which all tasks need, e.g. a lookup table.
 
         Returns
         -------
@@ -138,7 +281,16 @@ class Pool:
 
         sl.debug("Starting map()")
         sl.debug("python path: {:s}".format(self.python_path))
-        sl.debug("polling-interval: {:f}s".format(self.polling_interval))
+        sl.debug(
+            "polling-interval: {:f}s to {:f}s".format(
+                self.polling_interval, self.max_polling_interval
+            )
+        )
+        sl.debug(
+            "reduction-interval: {:f}s to {:f}s".format(
+                self.reduction_interval, self.max_reduction_interval
+            )
+        )
         sl.debug(
             "max. num. resubmissions: {:d}".format(self.max_num_resubmissions)
         )
@@ -149,13 +301,44 @@ class Pool:
         script_content = making_script.make(
             func_module=func.__module__,
             func_name=func.__name__,
-            environ=dict(os.environ),
+            with_environ_snapshot=True,
             shebang=shebang,
             unpack_task_with_asterisk=_unpack_task_with_asterisk,
+            oob_pickle=self.oob_pickle,
+            with_shared=shared is not None,
+            num_cores=self.num_cores_per_job,
+            task_timeout=self.task_timeout,
+            task_max_memory=self.task_max_memory,
         )
         utils.write_text(path=script_path, content=script_content)
+        sl.debug(
+            "worker-node-script size: {:d} bytes".format(
+                len(script_content.encode())
+            )
+        )
+
+        environ = environment.snapshot(
+            allowlist=self.environ_allowlist,
+            denylist=self.environ_denylist,
+        )
+        environ_size = environment.write(
+            path=environment.environ_path(swd), environ=environ
+        )
+        sl.debug(
+            "environment: {:d} variables, {:d} bytes".format(
+                len(environ), environ_size
+            )
+        )
         utils.make_path_executable(path=script_path)
 
+        if shared is not None:
+            sl.debug("Writing shared object into work_dir")
+            utils.write_pickle(
+                path=pooling.shared_path(swd),
+                content=shared,
+                oob=self.oob_pickle,
+            )
+
         sl.debug("Make chunks of tasks")
 
         chunks = chunking.assign_tasks_to_chunks(
@@ -163,105 +346,199 @@ class Pool:
             num_chunks=num_chunks,
         )
 
-        sl.debug("Mapping chunks of tasks into work_dir")
+        sl.debug("Writing chunks of tasks into work_dir and submitting jobs")
+
+        # The job_id of each jobname as reported by the scheduler. The status
+        # is queried for exactly these jobs.
+        job_ids = {}
 
-        jobnames_in_session = pooling.map_tasks_into_work_dir(
+        jobnames_in_session = staging.write_and_submit_chunks(
             work_dir=swd,
             tasks=tasks,
             chunks=chunks,
             session_id=session_id,
-        )
-
-        sl.debug("Submitting jobs")
-
-        for jobname in jobnames_in_session:
-            ichunk = pooling.make_ichunk_from_jobname(jobname=jobname)
-            self.submit_func(
-                jobname=jobname,
+            submit=functools.partial(
+                self._submit_chunk,
+                work_dir=swd,
                 script_path=script_path,
-                script_arguments=[pooling.chunk_path(swd, ichunk)],
-                stdout_path=pooling.chunk_path(swd, ichunk) + ".o",
-                stderr_path=pooling.chunk_path(swd, ichunk) + ".e",
                 logger=sl,
-                **self.submit_func_kwargs,
-            )
+                job_ids=job_ids,
+            ),
+            num_threads=self.num_staging_threads,
+            max_num_chunks_in_flight=self.max_num_chunks_in_flight,
+            oob_pickle=self.oob_pickle,
+            logger=sl,
+            num_submit_threads=self.num_submit_threads,
+            max_submit_rate=self.max_submit_rate,
+        )
 
         sl.debug("Waiting for jobs to finish")
 
         still_running = True
         num_resubmissions_by_ichunk = {}
+        task_results_by_ichunk = {}
+        journal_offsets = {}
+        chunks_done = set()
         last_job_count = job_counter.init()
-
-        while still_running:
-            job_stati = self.status_func(
-                jobnames=jobnames_in_session,
-                logger=sl,
-                **self.status_func_kwargs,
-            )
-            job_count = job_counter.estimate(
-                num_jobs_running=len(job_stati["running"]),
-                num_jobs_pending=len(job_stati["pending"]),
-                num_jobs_error=len(job_stati["error"]),
-                num_resubmissions_by_ichunk=num_resubmissions_by_ichunk,
-                max_num_resubmissions=self.max_num_resubmissions,
+        watcher = watching.Watcher(
+            path=swd, suffixes=[".pkl.out"], enabled=self.watch_work_dir
+        )
+        sl.debug(
+            "Waking up on results: {:s} ({:s})".format(
+                watcher.mode, watcher.reason
             )
+        )
+        scheduler = cadence.Cadence(
+            name="scheduler",
+            min_interval=self.polling_interval,
+            max_interval=self.max_polling_interval,
+            logger=sl,
+        )
+        reduction = cadence.Cadence(
+            name="reduction",
+            min_interval=self.reduction_interval,
+            max_interval=self.max_reduction_interval,
+            logger=sl,
+        )
 
-            if not job_counter.is_equal(job_count, last_job_count):
-                msg = job_counter.to_str(job_count)
-                sl.info(msg)
-                if self.verbose:
-                    self.print(msg)
-
-            last_job_count = job_count
-
-            for job in job_stati["error"]:
-                ichunk = pooling.make_ichunk_from_jobname(jobname=job["name"])
-                if ichunk in num_resubmissions_by_ichunk:
-                    num_resubmissions_by_ichunk[ichunk] += 1
-                else:
-                    num_resubmissions_by_ichunk[ichunk] = 1
+        while still_running:
+            if scheduler.is_due():
+                job_stati = self.status_func(
+                    jobnames=jobnames_in_session,
+                    logger=sl,
+                    job_ids=_job_ids_if_all_known(
+                        job_ids=job_ids, jobnames=jobnames_in_session
+                    ),
+                    **self.status_func_kwargs,
+                )
+                job_count = job_counter.estimate(
+                    num_jobs_running=len(job_stati["running"]),
+                    num_jobs_pending=len(job_stati["pending"]),
+                    num_jobs_error=len(job_stati["error"]),
+                    num_resubmissions_by_ichunk=num_resubmissions_by_ichunk,
+                    max_num_resubmissions=self.max_num_resubmissions,
+                )
 
-                job_id_str = "name {:s}, ichunk {:09d}".format(
-                    job["name"], ichunk
+                jobs_changed = not job_counter.is_equal(
+                    job_count, last_job_count
                 )
-                sl.warning("Found error-state in: {:s}".format(job_id_str))
-                sl.warning("Deleting: {:s}".format(job_id_str))
+                if jobs_changed:
+                    msg = job_counter.to_str(job_count)
+                    sl.info(msg)
+                    if self.verbose:
+                        self.print(msg)
 
-                self.delete_func(job=job, logger=sl, **self.delete_func_kwargs)
+                last_job_count = job_count
 
-                if (
-                    num_resubmissions_by_ichunk[ichunk]
-                    <= self.max_num_resubmissions
-                ):
+                if job_stati["error"]:
                     sl.warning(
-                        "Resubmitting {:d} of {:d}, jobname {:s}".format(
-                            num_resubmissions_by_ichunk[ichunk],
-                            self.max_num_resubmissions,
-                            job["name"],
+                        "Deleting {:d} jobs in error-state".format(
+                            len(job_stati["error"])
                         )
                     )
-                    self.submit_func(
-                        jobname=job["name"],
-                        script_path=script_path,
-                        script_arguments=[pooling.chunk_path(swd, ichunk)],
-                        stdout_path=pooling.chunk_path(swd, ichunk) + ".o",
-                        stderr_path=pooling.chunk_path(swd, ichunk) + ".e",
-                        logger=sl,
-                        **self.submit_func_kwargs,
+                    self._delete_jobs(jobs=job_stati["error"], logger=sl)
+
+                for job in job_stati["error"]:
+                    ichunk = pooling.make_ichunk_from_jobname(
+                        jobname=job["name"]
                     )
+                    if ichunk in num_resubmissions_by_ichunk:
+                        num_resubmissions_by_ichunk[ichunk] += 1
+                    else:
+                        num_resubmissions_by_ichunk[ichunk] = 1
 
-            if job_stati["error"]:
-                utils.write_text(
-                    path=os.path.join(swd, "num_resubmissions_by_ichunk.json"),
-                    content=json.dumps(num_resubmissions_by_ichunk, indent=4),
-                )
+                    job_id_str = "name {:s}, ichunk {:09d}".format(
+                        job["name"], ichunk
+                    )
+                    sl.warning("Found error-state in: {:s}".format(job_id_str))
+
+                    if (
+                        num_resubmissions_by_ichunk[ichunk]
+                        <= self.max_num_resubmissions
+                    ):
+                        sl.warning(
+                            "Resubmitting {:d} of {:d}, jobname {:s}".format(
+                                num_resubmissions_by_ichunk[ichunk],
+                                self.max_num_resubmissions,
+                                job["name"],
+                            )
+                        )
+                        self._submit_chunk(
+                            jobname=job["name"],
+                            ichunk=ichunk,
+                            work_dir=swd,
+                            script_path=script_path,
+                            logger=sl,
+                            job_ids=job_ids,
+                        )
+
+                if job_stati["error"]:
+                    utils.write_text(
+                        path=os.path.join(
+                            swd, "num_resubmissions_by_ichunk.json"
+                        ),
+                        content=json.dumps(
+                            num_resubmissions_by_ichunk, indent=4
+                        ),
+                    )
 
-            if job_count["running"] == 0 and job_count["pending"] == 0:
-                still_running = False
+                if job_count["running"] == 0 and job_count["pending"] == 0:
+                    still_running = False
 
-            time.sleep(self.polling_interval)
+                # When all chunks are done, only the jobs' exits are
+                # missing, so the scheduler is polled at its min_interval.
+                scheduler.polled(
+                    changed=jobs_changed or len(chunks_done) == len(chunks)
+                )
+                if jobs_changed:
+                    reduction.speed_up(reason="scheduler")
+
+            if reduction.is_due():
+                num_new = pooling.read_task_results_from_journals(
+                    work_dir=swd,
+                    chunks=chunks,
+                    task_results_by_ichunk=task_results_by_ichunk,
+                    journal_offsets=journal_offsets,
+                    chunks_done=chunks_done,
+                )
+                if num_new:
+                    sl.debug(
+                        "Read {:d} task results from journals".format(num_new)
+                    )
+                num_done = pooling.find_chunks_done(
+                    work_dir=swd,
+                    chunks=chunks,
+                    task_results_by_ichunk=task_results_by_ichunk,
+                    chunks_done=chunks_done,
+                )
+                if num_done:
+                    sl.debug(
+                        "Found {:d} more chunks done, {:d} of {:d}".format(
+                            num_done, len(chunks_done), len(chunks)
+                        )
+                    )
+                reduction.polled(changed=num_new > 0 or num_done > 0)
+                if num_done:
+                    scheduler.due_now(reason="chunks done")
+                elif num_new:
+                    scheduler.speed_up(reason="results")
+
+            if still_running:
+                cadence.wait(
+                    cadences=[scheduler, reduction],
+                    watcher=watcher,
+                    wake_up=[reduction],
+                )
 
+        watcher.close()
         sl.debug("Reducing results from work_dir")
+        pooling.read_task_results_from_journals(
+            work_dir=swd,
+            chunks=chunks,
+            task_results_by_ichunk=task_results_by_ichunk,
+            journal_offsets=journal_offsets,
+            chunks_done=chunks_done,
+        )
         (
             task_results_are_incomplete,
             task_results,
@@ -269,6 +546,13 @@ class Pool:
             work_dir=swd,
             chunks=chunks,
             logger=sl,
+            task_results_by_ichunk=task_results_by_ichunk,
+        )
+
+        sl.info(
+            pooling.summarize_worker_startups(
+                work_dir=swd, num_chunks=len(chunks)
+            )
         )
 
         has_stderr = pooling.has_invalid_or_non_empty_stderr(
@@ -296,7 +580,36 @@ class Pool:
 
         return task_results
 
-    def starmap(self, func, iterable, chunksize=None):
+    def _delete_jobs(self, jobs, logger):
+        if self.delete_many_func is not None:
+            self.delete_many_func(
+                jobs=jobs, logger=logger, **self.delete_func_kwargs
+            )
+        else:
+            for job in jobs:
+                self.delete_func(
+                    job=job, logger=logger, **self.delete_func_kwargs
+                )
+
+    def _submit_chunk(
+        self, jobname, ichunk, work_dir, script_path, logger, job_ids
+    ):
+        job_id = self.submit_func(
+            jobname=jobname,
+            script_path=script_path,
+            script_arguments=[pooling.chunk_path(work_dir, ichunk)],
+            stdout_path=pooling.chunk_path(work_dir, ichunk) + ".o",
+            stderr_path=pooling.chunk_path(work_dir, ichunk) + ".e",
+            logger=logger,
+            **self.submit_func_kwargs,
+        )
+        job_ids[jobname] = job_id
+        if job_id is not None:
+            pooling.append_job_id(
+                work_dir=work_dir, jobname=jobname, job_id=job_id
+            )
+
+    def starmap(self, func, iterable, chunksize=None, shared=None):
         """
         Like map() except that the elements of the iterable are expected
         to be iterables that are unpacked as arguments.
@@ -306,10 +619,26 @@ class Pool:
             func=func,
             iterable=tasks,
             chunksize=chunksize,
+            shared=shared,
             _unpack_task_with_asterisk=True,
         )
 
 
+def _job_ids_if_all_known(job_ids, jobnames):
+    """
+    Returns the job_ids of the jobnames, or None when the scheduler did not
+    report the job_id of at least one of them. Then the jobs are found by
+    their jobnames.
+    """
+    out = []
+    for jobname in jobnames:
+        job_id = job_ids.get(jobname)
+        if job_id is None:
+            return None
+        out.append(job_id)
+    return sorted(out)
+
+
 def _doc_retrun_statement():
     return """
         Returns
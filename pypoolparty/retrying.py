@@ -0,0 +1,290 @@
+"""
+The retries of the calls of the scheduler's executables, e.g. sbatch,
+squeue, scancel, qsub, qstat, and qdel.
+
+A RetryPolicy retries a failed call after a delay which grows exponentially
+from min_delay up to max_delay and is jittered, so that many pools do not
+retry in lockstep. A call gives up after max_num_retry retries or when its
+deadline has passed. The policy also is a circuit breaker: after
+max_num_consecutive_failures failed attempts in a row, across all the calls
+which share the policy, the circuit opens and no call is attempted for
+circuit_cooldown seconds. This gives the scheduler time to recover instead
+of being hammered by all the pools at once. Each call is logged with its
+latency and the counters of its name. A policy can be shared by threads.
+"""
+
+import random
+import threading
+import time
+
+
+class RetryError(RuntimeError):
+    """
+    A call failed and the policy does not allow to retry it any more.
+    """
+
+
+class RetryPolicy:
+    def __init__(
+        self,
+        max_num_retry=30,
+        min_delay=1.0,
+        max_delay=120.0,
+        factor=2.0,
+        jitter=0.5,
+        deadline=None,
+        max_num_consecutive_failures=5,
+        circuit_cooldown=60.0,
+    ):
+        """
+        Parameters
+        ----------
+        max_num_retry : int or None
+            A call is retried up to this many times. None means no limit.
+        min_delay : float
+            The delay in seconds before the first retry.
+        max_delay : float
+            The delay grows by factor for each retry up to this many
+            seconds.
+        factor : float
+            The growth of the delay.
+        jitter : float
+            The delay is multiplied by a random number between 1 - jitter
+            and 1 + jitter.
+        deadline : float or None
+            A call gives up after this many seconds. None means no limit.
+        max_num_consecutive_failures : int or None
+            After this many failed attempts in a row, the circuit opens.
+            None disables the circuit breaker.
+        circuit_cooldown : float
+            While the circuit is open, no call is attempted for this many
+            seconds. Then one attempt is made, and the circuit closes again
+            when it succeeds.
+        """
+        self.max_num_retry = max_num_retry
+        if self.max_num_retry is not None:
+            self.max_num_retry = int(max_num_retry)
+            assert self.max_num_retry >= 0
+        self.min_delay = float(min_delay)
+        assert self.min_delay >= 0.0
+        self.max_delay = float(max_delay)
+        assert self.max_delay >= self.min_delay
+        self.factor = float(factor)
+        assert self.factor >= 1.0
+        self.jitter = float(jitter)
+        assert 0.0 <= self.jitter <= 1.0
+        self.deadline = None if deadline is None else float(deadline)
+        self.max_num_consecutive_failures = max_num_consecutive_failures
+        self.circuit_cooldown = float(circuit_cooldown)
+        assert self.circuit_cooldown >= 0.0
+
+        self.num_consecutive_failures = 0
+        self.circuit_opened = None
+        self.metrics = {}
+        self._lock = threading.Lock()
+
+    def __getstate__(self):
+        state = dict(self.__dict__)
+        del state["_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def budget(self):
+        """
+        Returns a new budget of retries. Calls which share a budget, e.g.
+        the groups of one bulk deletion, share max_num_retry and deadline.
+        """
+        return {"num_retries": 0, "start": time.monotonic()}
+
+    def delay(self, num_retries):
+        """
+        Returns the delay in seconds before the retry number num_retries,
+        starting at 1.
+        """
+        delay = self.min_delay * self.factor ** (num_retries - 1)
+        delay = min(self.max_delay, delay)
+        return delay * random.uniform(1.0 - self.jitter, 1.0 + self.jitter)
+
+    def call(self, func, name, logger=None, budget=None):
+        """
+        Returns func() and retries it when it raises an Exception.
+
+        Parameters
+        ----------
+        func : function
+            The call, e.g. of squeue.
+        name : str
+            The name in the log and in the metrics, e.g. 'squeue'.
+        logger : logging.Logger or None
+            The latency and the counters of each call, and each failure are
+            logged.
+        budget : dict or None
+            See budget(). Default is a new budget for this call.
+
+        Raises
+        ------
+        RetryError
+            When the call failed and may not be retried any more. The last
+            exception of func is its __cause__.
+        """
+        if budget is None:
+            budget = self.budget()
+        with self._lock:
+            metric = self.metrics.setdefault(name, _metric_init())
+            metric["num_calls"] += 1
+        start = time.monotonic()
+
+        while True:
+            self._wait_while_circuit_is_open(
+                name=name, budget=budget, logger=logger
+            )
+            attempt_start = time.monotonic()
+            try:
+                out = func()
+            except KeyboardInterrupt:
+                raise
+            except Exception as bad:
+                with self._lock:
+                    metric["num_failures"] += 1
+                    self._failed(name=name, logger=logger)
+                if logger is not None:
+                    logger.warning(
+                        "Problem in {:s}: {:s}".format(name, str(bad))
+                    )
+
+                budget["num_retries"] += 1
+                delay = self.delay(num_retries=budget["num_retries"])
+                reason = self._reason_to_give_up(budget=budget, delay=delay)
+                if reason is not None:
+                    with self._lock:
+                        metric["num_give_ups"] += 1
+                    msg = "Aborting {:s}. {:s}".format(name, reason)
+                    if logger is not None:
+                        logger.critical(msg)
+                    raise RetryError(msg) from bad
+
+                with self._lock:
+                    metric["num_retries"] += 1
+                if logger is not None:
+                    logger.warning(
+                        "Retrying {:s} in {:.3f}s".format(name, delay)
+                    )
+                time.sleep(delay)
+                continue
+
+            latency = time.monotonic() - attempt_start
+            with self._lock:
+                self.num_consecutive_failures = 0
+                self.circuit_opened = None
+                metric["latency_sum"] += latency
+                metric["latency_max"] = max(metric["latency_max"], latency)
+            self._log_call(
+                name=name,
+                latency=latency,
+                duration=time.monotonic() - start,
+                logger=logger,
+            )
+            return out
+
+    def _reason_to_give_up(self, budget, delay):
+        if self.max_num_retry is not None:
+            if budget["num_retries"] > self.max_num_retry:
+                return "Too many retries."
+        if self.deadline is not None:
+            elapsed = time.monotonic() - budget["start"]
+            if elapsed + delay > self.deadline:
+                return "Deadline of {:.1f}s passed.".format(self.deadline)
+        return None
+
+    def _failed(self, name, logger):
+        self.num_consecutive_failures += 1
+        if self.max_num_consecutive_failures is None:
+            return
+        if self.num_consecutive_failures < self.max_num_consecutive_failures:
+            return
+        self.circuit_opened = time.monotonic()
+        self.num_consecutive_failures = 0
+        self.metrics[name]["num_circuit_opens"] += 1
+        if logger is not None:
+            logger.warning(
+                "Circuit opened by {:s} for {:.1f}s".format(
+                    name, self.circuit_cooldown
+                )
+            )
+
+    def _wait_while_circuit_is_open(self, name, budget, logger):
+        circuit_opened = self.circuit_opened
+        if circuit_opened is None:
+            return
+        remaining = circuit_opened + self.circuit_cooldown
+        remaining -= time.monotonic()
+        if remaining <= 0.0:
+            return
+        if self.deadline is not None:
+            elapsed = time.monotonic() - budget["start"]
+            if elapsed + remaining > self.deadline:
+                with self._lock:
+                    self.metrics[name]["num_give_ups"] += 1
+                msg = "Aborting {:s}. Circuit is open beyond deadline.".format(
+                    name
+                )
+                if logger is not None:
+                    logger.critical(msg)
+                raise RetryError(msg)
+        if logger is not None:
+            logger.warning(
+                "Circuit is open, {:s} waits {:.3f}s".format(name, remaining)
+            )
+        time.sleep(remaining)
+
+    def _log_call(self, name, latency, duration, logger):
+        if logger is None:
+            return
+        m = self.metrics[name]
+        logger.debug(
+            "Call {:s}: latency {:.3f}s, duration {:.3f}s, "
+            "calls {:d}, failures {:d}, retries {:d}, "
+            "mean latency {:.3f}s, max latency {:.3f}s".format(
+                name,
+                latency,
+                duration,
+                m["num_calls"],
+                m["num_failures"],
+                m["num_retries"],
+                m["latency_sum"] / max(1, m["num_calls"] - m["num_give_ups"]),
+                m["latency_max"],
+            )
+        )
+
+    def __repr__(self):
+        return "{:s}(max_num_retry={:s}, max_delay={:f})".format(
+            self.__class__.__name__, str(self.max_num_retry), self.max_delay
+        )
+
+
+def _metric_init():
+    return {
+        "num_calls": 0,
+        "num_failures": 0,
+        "num_retries": 0,
+        "num_give_ups": 0,
+        "num_circuit_opens": 0,
+        "latency_sum": 0.0,
+        "latency_max": 0.0,
+    }
+
+
+def default_policy(timecooldown=120.0, max_num_retry=30):
+    """
+    Returns the RetryPolicy which corresponds to the former arguments
+    timecooldown and max_num_retry of the calls. The delays grow up to
+    timecooldown.
+    """
+    return RetryPolicy(
+        max_num_retry=max_num_retry,
+        min_delay=min(1.0, timecooldown),
+        max_delay=timecooldown,
+    )
@@ -4,6 +4,7 @@ from . import calling
 from . import organizing_jobs
 from .. import proto_pool
 from .. import utils
+from .. import retrying
 
 
 @utils.add_doc(
@@ -16,6 +17,14 @@ from .. import utils
             Path to the 'squeue' executable used to query the state of jobs.
         scancel_path : str
             Path to the 'scancel' executable used to delete/remove jobs.
+        status_cache_ttl : float or None
+            If not None, the status of the queue is shared with all other
+            pools of the user on this host for this many seconds, so that
+            only one of them calls 'squeue' at a time. See status_cache.
+        retry_policy : retrying.RetryPolicy or None
+            How the failed calls of the scheduler are retried. All the calls
+            of the pool share the policy and its circuit breaker. Default is
+            retrying.RetryPolicy().
     """
     + proto_pool._doc_retrun_statement()
 )
@@ -23,36 +32,76 @@ def Pool(
     num_chunks=None,
     python_path=None,
     polling_interval=5.0,
+    max_polling_interval=None,
+    reduction_interval=None,
+    max_reduction_interval=None,
     work_dir=None,
     keep_work_dir=False,
     max_num_resubmissions=10,
     verbose=False,
+    oob_pickle=False,
+    num_staging_threads=4,
+    max_num_chunks_in_flight=None,
+    num_cores_per_job=1,
+    task_timeout=None,
+    task_max_memory=None,
+    watch_work_dir=False,
+    environ_allowlist=None,
+    environ_denylist=None,
+    num_submit_threads=4,
+    max_submit_rate=None,
     # slurm specific
     # --------------
     sbatch_path="sbatch",
     clusters=None,
     squeue_path="squeue",
     scancel_path="scancel",
+    status_cache_ttl=None,
+    retry_policy=None,
 ):
+    if retry_policy is None:
+        retry_policy = retrying.RetryPolicy()
+
     return proto_pool.Pool(
         num_chunks=num_chunks,
         python_path=python_path,
         polling_interval=polling_interval,
+        max_polling_interval=max_polling_interval,
+        reduction_interval=reduction_interval,
+        max_reduction_interval=max_reduction_interval,
         work_dir=work_dir,
         keep_work_dir=keep_work_dir,
         max_num_resubmissions=max_num_resubmissions,
         verbose=verbose,
+        oob_pickle=oob_pickle,
+        num_staging_threads=num_staging_threads,
+        max_num_chunks_in_flight=max_num_chunks_in_flight,
+        num_cores_per_job=num_cores_per_job,
+        task_timeout=task_timeout,
+        task_max_memory=task_max_memory,
+        watch_work_dir=watch_work_dir,
+        environ_allowlist=environ_allowlist,
+        environ_denylist=environ_denylist,
+        num_submit_threads=num_submit_threads,
+        max_submit_rate=max_submit_rate,
         submit_func=submit,
         submit_func_kwargs={
             "sbatch_path": sbatch_path,
             "clusters": clusters,
+            "retry_policy": retry_policy,
         },
         status_func=status,
         status_func_kwargs={
             "squeue_path": squeue_path,
+            "status_cache_ttl": status_cache_ttl,
+            "retry_policy": retry_policy,
         },
         delete_func=delete,
-        delete_func_kwargs={"scancel_path": scancel_path},
+        delete_many_func=delete_many,
+        delete_func_kwargs={
+            "scancel_path": scancel_path,
+            "retry_policy": retry_policy,
+        },
         filter_stderr_func=filter_stderr,
     )
 
@@ -68,6 +117,7 @@ def submit(
     # --------------
     sbatch_path="sbatch",
     clusters=None,
+    retry_policy=None,
 ):
     return calling.sbatch(
         script_path=script_path,
@@ -78,6 +128,7 @@ def submit(
         logger=logger,
         clusters=clusters,
         sbatch_path=sbatch_path,
+        retry_policy=retry_policy,
     )
 
 
@@ -87,21 +138,28 @@ def status(
     # slurm specific
     # --------------
     squeue_path,
+    status_cache_ttl=None,
+    job_ids=None,
+    retry_policy=None,
 ):
-    all_jobs = calling.squeue(
+    columns = calling.squeue_columns(
         squeue_path=squeue_path,
         logger=logger,
+        cache_ttl=status_cache_ttl,
+        job_ids=job_ids,
+        retry_policy=retry_policy,
     )
-    our_jobs = organizing_jobs.filter_jobs_by_jobnames(
-        jobs=all_jobs,
+    ours = organizing_jobs.filter_columns_by_jobnames(
+        columns=columns,
         jobnames=jobnames,
     )
     (
         running,
         pending,
         error,
-    ) = organizing_jobs.split_jobs_in_running_pending_error(
-        jobs=our_jobs,
+    ) = organizing_jobs.split_columns_in_running_pending_error(
+        columns=columns,
+        indices=ours,
         logger=logger,
     )
     out = {
@@ -109,11 +167,11 @@ def status(
         "pending": [],
         "error": [],
     }
-    for job in running:
+    for job in calling.columns_to_jobs(columns=columns, indices=running):
         out["running"].append(_make_job(slurm_job=job))
-    for job in pending:
+    for job in calling.columns_to_jobs(columns=columns, indices=pending):
         out["pending"].append(_make_job(slurm_job=job))
-    for job in error:
+    for job in calling.columns_to_jobs(columns=columns, indices=error):
         out["error"].append(_make_job(slurm_job=job))
     return out
 
@@ -124,17 +182,44 @@ def delete(
     # slurm specific
     # --------------
     scancel_path,
+    retry_policy=None,
+):
+    return delete_many(
+        jobs=[job],
+        logger=logger,
+        scancel_path=scancel_path,
+        retry_policy=retry_policy,
+    )
+
+
+def delete_many(
+    jobs,
+    logger,
+    # slurm specific
+    # --------------
+    scancel_path,
+    retry_policy=None,
 ):
-    return calling.scancel(
-        jobname=job["name"],
+    calling.scancel_many(
+        jobids=[job["id"] for job in jobs if job.get("id")],
         scancel_path=scancel_path,
         logger=logger,
+        retry_policy=retry_policy,
     )
+    for job in jobs:
+        if not job.get("id"):
+            calling.scancel(
+                jobname=job["name"],
+                scancel_path=scancel_path,
+                logger=logger,
+                retry_policy=retry_policy,
+            )
 
 
 def _make_job(slurm_job):
     return {
         "name": slurm_job["name"],
+        "id": slurm_job["jobid"],
     }
 
 
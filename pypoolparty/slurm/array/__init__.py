@@ -1,11 +1,16 @@
 from . import making_script
 from . import mapping
+from . import compressing
 from . import reducing
 from . import polling
 from . import utils
 from . import debugging
+from . import ranges
 from .. import calling
 from ... import utils as general_utils
+from ... import watching
+from ... import cadence
+from ... import retrying
 from .. import organizing_jobs
 
 import json_line_logger
@@ -28,6 +33,9 @@ class Pool:
         num_simultaneously_running_tasks=None,
         python_path=None,
         polling_interval=5.0,
+        max_polling_interval=None,
+        reduction_interval=None,
+        max_reduction_interval=None,
         work_dir=None,
         keep_work_dir=False,
         verbose=False,
@@ -36,18 +44,46 @@ class Pool:
         sbatch_path="sbatch",
         squeue_path="squeue",
         scancel_path="scancel",
+        num_tasks_per_batch=None,
+        task_store="zip",
+        num_task_shards=None,
+        oob_pickle=False,
+        compression=None,
+        num_pickling_processes=None,
+        max_num_tasks_in_flight=None,
+        num_cores_per_job=1,
+        task_timeout=None,
+        task_max_memory=None,
+        watch_work_dir=False,
+        status_cache_ttl=None,
+        retry_policy=None,
     ):
         """
         Parameters
         ----------
         num_simultaneously_running_tasks : int or None
-            Up to this many tasks will run in parallel.
+            Up to this many tasks will run in parallel. This is the limit
+            '%N' of each call of 'sbatch --array'. When num_tasks_per_batch
+            is set, each batch and each resubmission is its own job-array,
+            so up to this many tasks of each of them can run in parallel.
         python_path : str or None
             The python path to be used on the computing-cluster's worker-nodes
             to execute the worker-node's python-script.
-        polling_interval : float or None
-            The time in seconds to wait before polling squeue again while
-            waiting for the jobs to finish.
+        polling_interval : float
+            The minimum time in seconds to wait before polling squeue again
+            while waiting for the jobs to finish.
+        max_polling_interval : float or None
+            While the polls of squeue do not find a change, the time
+            between them grows up to this many seconds. When the jobs change
+            or results arrive, it falls back to polling_interval. Default is
+            12 times polling_interval. See cadence.
+        reduction_interval : float or None
+            The minimum time in seconds to wait before reducing new results
+            from the work_dir again. Default is polling_interval.
+        max_reduction_interval : float or None
+            While no new results are found, the time between reducing the
+            work_dir grows up to this many seconds. Default is 12 times
+            reduction_interval.
         work_dir : str
             The directory path where the tasks, the results and the
             worker-node-script is stored.
@@ -60,6 +96,84 @@ class Pool:
         max_num_resubmissions : None
             In case of error like states, the job will be tried this
             often to be resubmitted befor giving up on it.
+        num_tasks_per_batch : int or None
+            If provided, map() pulls the tasks from the iterable in batches of
+            this many tasks. Each batch is written into the work_dir and
+            submitted right away, so the first tasks are already being
+            computed while later tasks are still being generated.
+            Only one task at a time is held in memory. This way the iterable
+            can also be a generator of unknown length. Note that
+            num_simultaneously_running_tasks applies to each batch.
+        task_store : str
+            The format to write the tasks into the work_dir. Either 'zip' or
+            'flat'. With 'zip', all tasks go into one zip-file and each
+            worker-node has to parse the zip-file's central directory to
+            find its task. With 'flat', the tasks go into one data-file next
+            to an index with a fixed-width entry for each task. A worker-node
+            finds its task with two small reads, independent of the number of
+            tasks.
+        num_task_shards : int or None
+            If provided, the tasks are spread over this many files (shards)
+            with the shard of a task being 'task_id % num_task_shards'.
+            The shards are written in parallel, and each worker-node only
+            opens the shard holding its task. This avoids that all
+            worker-nodes hit the same file on the shared filesystem at the
+            same time. There are never more shards than tasks, or than
+            num_tasks_per_batch.
+        oob_pickle : bool
+            If True, the tasks and the results are pickled with protocol 5
+            and their large buffers, e.g. the data of numpy arrays, are
+            written out-of-band and aligned to 64 bytes. The files are mapped
+            into memory when read and the buffers are not copied. The
+            results are only mapped when the work_dir is kept, otherwise
+            they are read into memory before the work_dir is removed.
+        compression : dict or None
+            The codecs to compress the zip-files in the work_dir. Maps the
+            name of an archive, i.e. 'tasks', 'results', 'stdout', 'stderr',
+            or 'exceptions', to either the name of a codec, or a tuple of the
+            name and the compression level, e.g.
+            {"stderr": "lzma", "results": ("deflate", 6)}.
+            The codecs are 'stored', 'deflate', 'bzip2', and 'lzma'.
+            Archives which are not mentioned are not compressed.
+            The 'flat' task_store is never compressed.
+        num_pickling_processes : int or None
+            If provided, the tasks are pickled in parallel by this many
+            forked processes while one writer writes them into the work_dir
+            in the order of their task_id. Only for tasks which are a
+            sequence, or when num_tasks_per_batch is set.
+        max_num_tasks_in_flight : int or None
+            When pickling in processes, up to this many tasks are being
+            pickled or are waiting to be written at a time.
+            Default is 1024 times num_pickling_processes.
+        num_cores_per_job : int or str
+            When map() runs the tasks in chunks, the tasks of a chunk are
+            run on this many cores by a local pool of forked processes on
+            the worker-node. When 'auto', the number of cores is read from
+            'SLURM_CPUS_PER_TASK' on the worker-node. Default is 1, i.e. the
+            tasks of a chunk are run one after another.
+        task_timeout : float or None
+            If set, each task is run in a forked process on the worker-node
+            which is killed when the task runs longer than this many
+            seconds. The array element then moves on to its next task and
+            the task's exception is a 'TaskTimeout'.
+        task_max_memory : int or None
+            If set, each task is run in a forked process on the worker-node
+            with its address space limited to this many bytes. A task which
+            runs out of memory gets a 'TaskMemoryExceeded' exception.
+        watch_work_dir : bool
+            If True, the work_dir is watched with inotify and the loop
+            which waits for the results wakes up as soon as a result is
+            written instead of sleeping until the next poll. This falls
+            back to polling when inotify is not available, or when the
+            work_dir is on a shared filesystem, e.g. NFS. See watching.
+        status_cache_ttl : float or None
+            If not None, the output of squeue is shared with all other
+            pools of the user on this host for this many seconds, so that
+            only one of them calls squeue at a time. See status_cache.
+        retry_policy : retrying.RetryPolicy or None
+            How the failed calls of sbatch, squeue, and scancel are retried.
+            All the calls of the pool share the policy and its circuit
+            breaker. Default is retrying.RetryPolicy().
 
         Returns
         -------
@@ -75,6 +189,18 @@ class Pool:
         self.work_dir = work_dir
         self.polling_interval = float(polling_interval)
         assert self.polling_interval > 0.0
+        if max_polling_interval is None:
+            max_polling_interval = 12 * self.polling_interval
+        self.max_polling_interval = float(max_polling_interval)
+        assert self.max_polling_interval >= self.polling_interval
+        if reduction_interval is None:
+            reduction_interval = self.polling_interval
+        self.reduction_interval = float(reduction_interval)
+        assert self.reduction_interval > 0.0
+        if max_reduction_interval is None:
+            max_reduction_interval = 12 * self.reduction_interval
+        self.max_reduction_interval = float(max_reduction_interval)
+        assert self.max_reduction_interval >= self.reduction_interval
         self.keep_work_dir = bool(keep_work_dir)
         self.num_simultaneously_running_tasks = (
             num_simultaneously_running_tasks
@@ -89,6 +215,47 @@ class Pool:
         self.squeue_path = squeue_path
         self.scancel_path = scancel_path
 
+        if num_tasks_per_batch is None:
+            self.num_tasks_per_batch = None
+        else:
+            self.num_tasks_per_batch = int(num_tasks_per_batch)
+            assert self.num_tasks_per_batch > 0
+
+        assert task_store in mapping.TASK_STORES
+        self.task_store = task_store
+
+        if num_task_shards is None:
+            self.num_task_shards = None
+        else:
+            self.num_task_shards = int(num_task_shards)
+            assert self.num_task_shards > 0
+
+        self.oob_pickle = bool(oob_pickle)
+        self.compression = compressing.init(compression)
+
+        if num_pickling_processes is None:
+            self.num_pickling_processes = None
+        else:
+            self.num_pickling_processes = int(num_pickling_processes)
+            assert self.num_pickling_processes > 0
+        self.max_num_tasks_in_flight = max_num_tasks_in_flight
+
+        if num_cores_per_job != "auto":
+            num_cores_per_job = int(num_cores_per_job)
+            assert num_cores_per_job >= 1
+        self.num_cores_per_job = num_cores_per_job
+        self.task_timeout = (
+            None if task_timeout is None else float(task_timeout)
+        )
+        self.task_max_memory = (
+            None if task_max_memory is None else int(task_max_memory)
+        )
+        self.watch_work_dir = bool(watch_work_dir)
+        self.status_cache_ttl = status_cache_ttl
+        if retry_policy is None:
+            retry_policy = retrying.RetryPolicy()
+        self.retry_policy = retry_policy
+
     def __repr__(self):
         return self.__class__.__name__ + "()"
 
@@ -96,7 +263,12 @@ class Pool:
         print("[pypoolparty]", general_utils.time_now_iso8601(), msg)
 
     def map(
-        self, func, iterable, chunksize=None, _unpack_task_with_asterisk=False
+        self,
+        func,
+        iterable,
+        chunksize=None,
+        shared=None,
+        _unpack_task_with_asterisk=False,
     ):
         """
         Apply `func` to each element in `iterable`, collecting the results
@@ -110,8 +282,20 @@ class Pool:
             func.__name__
         iterable : list
             List of tasks. Each task must be a valid input to 'func'.
-        chunksize : int
-            This is ignored for the SLURM array.
+            When the pool has 'num_tasks_per_batch', this can be any
+            iterable such as a generator.
+        chunksize : int or None
+            If None, each task runs in its own array element. Else each
+            array element runs a chunk of this many tasks one after another
+            in the same process, so the start-up of the interpreter and the
+            import of func are paid once per chunk. The stdout and stderr of
+            each task still go into the task's own files. When the pool has
+            'num_tasks_per_batch', it must be a multiple of chunksize.
+        shared : object or None
+            If provided, this object is written into the work_dir only once
+            and not into every task. A worker-node reads it once and hands
+            it to func as 'func(task, shared=shared)'. Use this for large
+            objects which all tasks need, e.g. a lookup table.
 
         Returns
         -------
@@ -127,8 +311,28 @@ class Pool:
 
         tasks = iterable  # to be consistent with multiprocessing's pool.map.
 
-        if len(tasks) == 0:
-            return []
+        if chunksize is not None:
+            chunksize = int(chunksize)
+            assert chunksize >= 1
+            if self.num_tasks_per_batch is not None:
+                assert self.num_tasks_per_batch % chunksize == 0, (
+                    "Expected num_tasks_per_batch to be a multiple "
+                    "of chunksize."
+                )
+
+        if self.num_tasks_per_batch is None:
+            if len(tasks) == 0:
+                return []
+
+        # A shard can not hold less than one task.
+        num_task_shards = self.num_task_shards
+        if num_task_shards is not None:
+            if self.num_tasks_per_batch is None:
+                num_task_shards = min(num_task_shards, len(tasks))
+            else:
+                num_task_shards = min(
+                    num_task_shards, self.num_tasks_per_batch
+                )
 
         ## START UP
         ## ========
@@ -164,6 +368,15 @@ class Pool:
             shebang="#!{:s}".format(self.python_path),
             work_dir=work_dir,
             unpack_task_with_asterisk=_unpack_task_with_asterisk,
+            num_tasks_per_batch=self.num_tasks_per_batch,
+            task_store=self.task_store,
+            num_task_shards=num_task_shards,
+            oob_pickle=self.oob_pickle,
+            with_shared=shared is not None,
+            chunksize=chunksize,
+            num_cores=self.num_cores_per_job,
+            task_timeout=self.task_timeout,
+            task_max_memory=self.task_max_memory,
         )
         general_utils.write_text(
             path=opj(work_dir, "script.py"), content=script_content
@@ -171,94 +384,204 @@ class Pool:
         general_utils.make_path_executable(path=opj(work_dir, "script.py"))
         logger.debug("Making script: done.")
 
-        # writing the tasks into the work_dir
-        # -----------------------------------
-        logger.debug("Mapping {:d} tasks...".format(len(tasks)))
-        mapping.write_tasks_to_work_dir(work_dir=work_dir, tasks=tasks)
-        logger.debug("Mapping {:d} tasks: done.".format(len(tasks)))
+        if shared is not None:
+            logger.debug("Writing shared object...")
+            general_utils.write_pickle(
+                path=mapping.shared_path(work_dir),
+                content=shared,
+                oob=self.oob_pickle,
+            )
+            logger.debug("Writing shared object: done.")
+
+        # writing the tasks into the work_dir and calling sbatch --array
+        # ---------------------------------------------------------------
+        if self.num_tasks_per_batch is None:
+            len_tasks = len(tasks)
+            logger.debug("Mapping {:d} tasks...".format(len_tasks))
+            mapping.write_tasks_to_work_dir(
+                work_dir=work_dir,
+                tasks=tasks,
+                task_store=self.task_store,
+                num_shards=num_task_shards,
+                oob=self.oob_pickle,
+                codec=self.compression["tasks"],
+                num_processes=self.num_pickling_processes,
+                max_num_tasks_in_flight=self.max_num_tasks_in_flight,
+            )
+            logger.debug("Mapping {:d} tasks: done.".format(len_tasks))
 
-        # initial call of sbatch --array
-        # ------------------------------
-        logger.debug("Calling sbatch --array...")
-        calling.sbatch(
-            script_path=opj(work_dir, "script.py"),
-            stdout_path=opj(work_dir, "%a.stdout"),
-            stderr_path=opj(work_dir, "%a.stderr"),
-            jobname=jobname,
-            array=True,
-            array_start_task_id=0,
-            array_stop_task_id=len(iterable) - 1,
-            array_num_simultaneously_running_tasks=self.num_simultaneously_running_tasks,
-            logger=logger,
-            sbatch_path=self.sbatch_path,
-            timeout=self.slurm_call_timeout,
-        )
-        logger.debug("Calling sbatch --array: done.")
+            self._sbatch_tasks(
+                work_dir=work_dir,
+                jobname=jobname,
+                logger=logger,
+                start_task_id=0,
+                stop_task_id=len_tasks,
+                chunksize=chunksize,
+            )
+        else:
+            len_tasks = 0
+            if self.num_simultaneously_running_tasks is not None:
+                _throttle_msg = (
+                    "num_simultaneously_running_tasks={:d} limits each "
+                    "batch of {:d} tasks on its own, not all batches "
+                    "together.".format(
+                        self.num_simultaneously_running_tasks,
+                        self.num_tasks_per_batch,
+                    )
+                )
+                logger.warning(_throttle_msg)
+                if self.verbose:
+                    self.print(_throttle_msg)
+            logger.debug(
+                "Mapping tasks in batches of {:d}...".format(
+                    self.num_tasks_per_batch
+                )
+            )
+            for (
+                start_task_id,
+                stop_task_id,
+            ) in mapping.write_tasks_to_work_dir_in_batches(
+                work_dir=work_dir,
+                tasks=tasks,
+                num_tasks_per_batch=self.num_tasks_per_batch,
+                task_store=self.task_store,
+                num_shards=num_task_shards,
+                oob=self.oob_pickle,
+                codec=self.compression["tasks"],
+                num_processes=self.num_pickling_processes,
+                max_num_tasks_in_flight=self.max_num_tasks_in_flight,
+            ):
+                logger.debug(
+                    "Mapped tasks {:d} to {:d}.".format(
+                        start_task_id, stop_task_id - 1
+                    )
+                )
+                self._sbatch_tasks(
+                    work_dir=work_dir,
+                    jobname=jobname,
+                    logger=logger,
+                    start_task_id=start_task_id,
+                    stop_task_id=stop_task_id,
+                    chunksize=chunksize,
+                )
+                len_tasks = stop_task_id
+            logger.debug("Mapping {:d} tasks: done.".format(len_tasks))
+
+            if len_tasks == 0:
+                logger.debug("No tasks in iterable.")
+                general_utils.shutdown_logger(logger=logger)
+                del logger
+                shutil.rmtree(work_dir)
+                return []
 
         ## WAITING FOR TASKS TO RETURN A.K.A. BABYSITTING SLURM
         ## ====================================================
         logger.debug("Preparing reduction of results...")
-        with reducing.Reducer(work_dir=work_dir) as reducer:
+        with reducing.Reducer(
+            work_dir=work_dir, codecs=self.compression
+        ) as reducer, watching.Watcher(
+            path=work_dir,
+            suffixes=[os.path.basename(reducer.completions_path)],
+            enabled=self.watch_work_dir,
+        ) as watcher:
             logger.debug("Preparing reduction of results: done.")
+            logger.debug(
+                "Waking up on results: {:s} ({:s})".format(
+                    watcher.mode, watcher.reason
+                )
+            )
 
             logger.debug("Waiting for tasks to return...")
 
             num_resubmissions_by_array_task_id = {}
-            last_poll = polling.init(len_tasks=len(tasks))
+            last_poll = polling.init(len_tasks=len_tasks)
+            scheduler = cadence.Cadence(
+                name="squeue",
+                min_interval=self.polling_interval,
+                max_interval=self.max_polling_interval,
+                logger=logger,
+            )
+            reduction = cadence.Cadence(
+                name="reduction",
+                min_interval=self.reduction_interval,
+                max_interval=self.max_reduction_interval,
+                logger=logger,
+            )
 
             while True:
                 # Collecting/reducing task results written by the worker nodes
                 # ------------------------------------------------------------
-                reducer.reduce()
+                if reduction.is_due():
+                    num_returned = len(reducer.tasks_returned)
+                    reducer.reduce()
+                    num_new = len(reducer.tasks_returned) - num_returned
+                    reduction.polled(changed=num_new > 0)
+                    if num_new > 0:
+                        scheduler.speed_up(reason="results")
 
                 # Babysitting SLURM
                 # -----------------
-                (
-                    num_resubmissions_by_array_task_id,
-                    jobs,
-                ) = self.resubmit_jobs_which_indicate_errors_and_might_profit_from_a_resubmission(
-                    num_resubmissions_by_array_task_id=num_resubmissions_by_array_task_id,
-                    work_dir=work_dir,
-                    jobname=jobname,
-                    logger=logger,
-                )
+                if scheduler.is_due():
+                    (
+                        num_resubmissions_by_array_task_id,
+                        jobs,
+                    ) = self.resubmit_jobs_which_indicate_errors_and_might_profit_from_a_resubmission(
+                        num_resubmissions_by_array_task_id=num_resubmissions_by_array_task_id,
+                        work_dir=work_dir,
+                        jobname=jobname,
+                        logger=logger,
+                        chunksize=chunksize,
+                        tasks_returned=reducer.tasks_returned,
+                    )
 
-                # printing/logging current polling state
-                # --------------------------------------
-                poll = polling.init(
-                    len_tasks=len(tasks),
-                    reducer=reducer,
-                    jobs=jobs,
-                    num_resubmissions_by_array_task_id=num_resubmissions_by_array_task_id,
-                )
-                poll_msg = polling.to_str(poll=poll)
-                logger.debug(poll_msg)
-                if self.verbose:
-                    if not polling.is_eual(last_poll, poll):
+                    # printing/logging current polling state
+                    # --------------------------------------
+                    poll = polling.init(
+                        len_tasks=len_tasks,
+                        reducer=reducer,
+                        jobs=jobs,
+                        num_resubmissions_by_array_task_id=num_resubmissions_by_array_task_id,
+                    )
+                    poll_msg = polling.to_str(poll=poll)
+                    logger.debug(poll_msg)
+                    poll_changed = not polling.is_eual(last_poll, poll)
+                    if self.verbose and poll_changed:
                         self.print(poll_msg)
 
+                    scheduler.polled(changed=poll_changed)
+                    if poll_changed:
+                        reduction.speed_up(reason="scheduler")
+
+                    if (
+                        len(reducer.tasks_returned) != len_tasks
+                        and ranges.count(jobs["pending"]) == 0
+                        and ranges.count(jobs["running"]) == 0
+                        and len(jobs["error"]) == 0
+                    ):
+                        logger.warning(
+                            "Expected jobs to be either in "
+                            "'running', 'pending' or 'error' "
+                            "while not all tasks have returned yet."
+                        )
+                        logger.debug("Listing work_dir for lost completions.")
+                        reducer.rescan()
+
+                    last_poll = copy.deepcopy(poll)
+
                 # Checking breakout criteria
                 # --------------------------
-                if len(reducer.tasks_returned) == len(tasks):
+                if len(reducer.tasks_returned) == len_tasks:
                     logger.debug("All tasks returned.")
                     break
 
-                elif (
-                    len(jobs["pending"]) == 0
-                    and len(jobs["running"]) == 0
-                    and len(jobs["error"]) == 0
-                ):
-                    logger.warning(
-                        "Expected jobs to be either in "
-                        "'running', 'pending' or 'error' "
-                        "while not all tasks have returned yet."
-                    )
-
                 # Not all tasks have returned yet.
-                # Prepare to sleep until nex poll
+                # Sleep until the next poll is due
                 # --------------------------------
-                last_poll = copy.deepcopy(poll)
-                time.sleep(self.polling_interval)
+                cadence.wait(
+                    cadences=[scheduler, reduction],
+                    watcher=watcher,
+                    wake_up=[reduction],
+                )
 
             logger.debug("Waiting for tasks to return: done.")
 
@@ -277,7 +600,7 @@ class Pool:
             logger.debug("User wants to keep work_dir.")
             remove_this_work_dir = False
 
-        if len(reducer.tasks_returned) != len(tasks):
+        if len(reducer.tasks_returned) != len_tasks:
             logger.warning("Not all tasks have returned, will keep work_dir.")
             remove_this_work_dir = False
 
@@ -291,11 +614,14 @@ class Pool:
 
         # Reading task results into memory
         # --------------------------------
+        # A mapped 'tasks.results.zip' can not be removed on NFS, so the
+        # results are only mapped when the work_dir is kept.
         logger.debug("Reading results to return them...")
         task_results = reducing.read_task_results(
             work_dir=work_dir,
-            len_tasks=len(tasks),
+            len_tasks=len_tasks,
             logger=logger,
+            map_into_memory=not remove_this_work_dir,
         )
         logger.debug("Reading results to return them: done.")
 
@@ -310,7 +636,7 @@ class Pool:
 
         return task_results
 
-    def starmap(self, func, iterable, chunksize=None):
+    def starmap(self, func, iterable, chunksize=None, shared=None):
         """
         Like map() except that the elements of the iterable are expected
         to be iterables that are unpacked as arguments.
@@ -320,6 +646,7 @@ class Pool:
             func=func,
             iterable=tasks,
             chunksize=chunksize,
+            shared=shared,
             _unpack_task_with_asterisk=True,
         )
 
@@ -329,34 +656,53 @@ class Pool:
         work_dir,
         jobname,
         logger,
+        chunksize=None,
+        tasks_returned=None,
     ):
+        """
+        Deletes the array elements which are in an error state and submits
+        them again. When the tasks run in chunks, the array elements are the
+        chunks, and a chunk is submitted again with only its tasks which are
+        not in tasks_returned.
+        """
         opj = os.path.join
-        _jobs = calling.squeue(
+        # Without '--array', the pending elements are reported in a single
+        # line with a compact array_task_id, e.g. '5-99999%500'.
+        columns = calling.squeue_columns(
             squeue_path=self.squeue_path,
             jobname=jobname,
-            array=True,
+            array=False,
             timeout=self.slurm_call_timeout,
             logger=logger,
             debug_dump_path=opj(work_dir, "squeue.stdout.dump"),
+            cache_ttl=self.status_cache_ttl,
+            retry_policy=self.retry_policy,
         )
 
+        # The running and pending array_task_ids are kept as ranges. Only the
+        # jobs in error are expanded into one dict for each array element.
         jobs = {}
         (
-            jobs["running"],
-            jobs["pending"],
-            jobs["error"],
-        ) = organizing_jobs.split_jobs_in_running_pending_error(
-            jobs=_jobs, logger=logger
+            running,
+            pending,
+            error,
+        ) = organizing_jobs.split_columns_in_running_pending_error(
+            columns=columns, logger=logger
+        )
+        jobs["running"] = ranges.from_columns(columns=columns, indices=running)
+        jobs["pending"] = ranges.from_columns(columns=columns, indices=pending)
+        jobs["error"] = ranges.expand_jobs(
+            jobs=calling.columns_to_jobs(columns=columns, indices=error)
         )
 
         if len(jobs["error"]) > 0:
-            for job in jobs["error"]:
-                calling.scancel(
-                    scancel_path=self.scancel_path,
-                    jobid=job["jobid"],
-                    timeout=self.slurm_call_timeout,
-                    logger=logger,
-                )
+            calling.scancel_many(
+                jobids=ranges.compact_jobids(jobs=jobs["error"]),
+                scancel_path=self.scancel_path,
+                timeout=self.slurm_call_timeout,
+                logger=logger,
+                retry_policy=self.retry_policy,
+            )
 
             array_task_ids_to_be_resubmitted = []
             for job in jobs["error"]:
@@ -371,25 +717,47 @@ class Pool:
                 else:
                     msg = (
                         "Reached 'max_num_resubmissions' "
-                        f"for array_task_id={job['array_task_id']:d}."
+                        f"for array_task_id={job['array_task_id']:s}."
                     )
                     logger.debug(msg)
                     raise RuntimeError(msg)
 
-            logger.debug("Calling sbatch --array...")
-            calling.sbatch(
-                script_path=opj(work_dir, "script.py"),
-                stdout_path=opj(work_dir, "%a.stdout"),
-                stderr_path=opj(work_dir, "%a.stderr"),
-                jobname=jobname,
-                array=True,
-                array_task_ids=array_task_ids_to_be_resubmitted,
-                array_num_simultaneously_running_tasks=self.num_simultaneously_running_tasks,
-                logger=logger,
-                sbatch_path=self.sbatch_path,
-                timeout=self.slurm_call_timeout,
-            )
-            logger.debug("Calling sbatch --array: done.")
+            if chunksize is not None:
+                tasks_returned = set(tasks_returned or [])
+                chunks_to_be_resubmitted = []
+                for ichunk in array_task_ids_to_be_resubmitted:
+                    task_ids = mapping.read_chunk_task_ids(
+                        work_dir=work_dir,
+                        ichunk=int(ichunk),
+                        chunksize=chunksize,
+                    )
+                    remaining_task_ids = [
+                        task_id
+                        for task_id in task_ids
+                        if task_id not in tasks_returned
+                    ]
+                    if len(remaining_task_ids) == 0:
+                        logger.debug(
+                            "All tasks of chunk {:s} returned, "
+                            "not resubmitting it.".format(ichunk)
+                        )
+                        continue
+                    mapping.write_chunk_task_ids(
+                        work_dir=work_dir,
+                        ichunk=int(ichunk),
+                        task_ids=remaining_task_ids,
+                    )
+                    chunks_to_be_resubmitted.append(ichunk)
+                array_task_ids_to_be_resubmitted = chunks_to_be_resubmitted
+
+            if len(array_task_ids_to_be_resubmitted) > 0:
+                self._sbatch_array(
+                    work_dir=work_dir,
+                    jobname=jobname,
+                    logger=logger,
+                    task_ids=array_task_ids_to_be_resubmitted,
+                    chunksize=chunksize,
+                )
 
             for job in jobs["error"]:
                 general_utils.dict_increment(
@@ -402,3 +770,87 @@ class Pool:
             jf.write(json.dumps(num_resubmissions_by_array_task_id))
 
         return num_resubmissions_by_array_task_id, jobs
+
+    def _sbatch_tasks(
+        self,
+        work_dir,
+        jobname,
+        logger,
+        start_task_id,
+        stop_task_id,
+        chunksize=None,
+    ):
+        """
+        Submits the tasks from start_task_id to stop_task_id (exclusive).
+        """
+        if chunksize is None:
+            self._sbatch_array(
+                work_dir=work_dir,
+                jobname=jobname,
+                logger=logger,
+                start_task_id=start_task_id,
+                stop_task_id=stop_task_id - 1,
+            )
+            return
+
+        assert start_task_id % chunksize == 0
+        start_ichunk = start_task_id // chunksize
+        stop_ichunk = general_utils.int_ceil_division(
+            a=stop_task_id, b=chunksize
+        )
+        if stop_task_id % chunksize != 0:
+            last_ichunk = stop_ichunk - 1
+            mapping.write_chunk_task_ids(
+                work_dir=work_dir,
+                ichunk=last_ichunk,
+                task_ids=range(last_ichunk * chunksize, stop_task_id),
+            )
+        self._sbatch_array(
+            work_dir=work_dir,
+            jobname=jobname,
+            logger=logger,
+            start_task_id=start_ichunk,
+            stop_task_id=stop_ichunk - 1,
+            chunksize=chunksize,
+        )
+
+    def _sbatch_array(
+        self,
+        work_dir,
+        jobname,
+        logger,
+        start_task_id=None,
+        stop_task_id=None,
+        task_ids=None,
+        chunksize=None,
+    ):
+        opj = os.path.join
+        if chunksize is None:
+            # The array element's output is the task's output.
+            stdout_path = opj(work_dir, "%a.stdout")
+            stderr_path = opj(work_dir, "%a.stderr")
+        else:
+            # The array element is a chunk and the worker redirects the
+            # output of each task into the task's own files.
+            stdout_path = opj(work_dir, "%a.chunk.o")
+            stderr_path = opj(work_dir, "%a.chunk.e")
+
+        logger.debug("Calling sbatch --array...")
+        calling.sbatch(
+            script_path=opj(work_dir, "script.py"),
+            stdout_path=stdout_path,
+            stderr_path=stderr_path,
+            jobname=jobname,
+            array=True,
+            array_start_task_id=start_task_id,
+            array_stop_task_id=stop_task_id,
+            array_task_ids=task_ids,
+            array_num_simultaneously_running_tasks=self.num_simultaneously_running_tasks,
+            # for the telemetry's queue_latency
+            script_arguments=["{:f}".format(time.time())],
+            logger=logger,
+            sbatch_path=self.sbatch_path,
+            timeout=self.slurm_call_timeout,
+            retry_policy=self.retry_policy,
+        )
+        logger.debug("Calling sbatch --array: done.")
@@ -0,0 +1,74 @@
+"""
+The codecs to compress the zip-files (archives) in the work_dir.
+"""
+
+import zipfile
+
+CODECS = {
+    "stored": zipfile.ZIP_STORED,
+    "deflate": zipfile.ZIP_DEFLATED,
+    "bzip2": zipfile.ZIP_BZIP2,
+    "lzma": zipfile.ZIP_LZMA,
+}
+
+ARCHIVES = [
+    "tasks",
+    "results",
+    "stdout",
+    "stderr",
+    "exceptions",
+    "telemetry",
+]
+
+
+def init(compression=None):
+    """
+    Returns the codec of each archive.
+
+    Parameters
+    ----------
+    compression : dict or None
+        Maps the name of an archive to its codec. The names of the archives
+        are: 'tasks', 'results', 'stdout', 'stderr', 'exceptions', and
+        'telemetry'.
+        A codec is either the name of the codec, e.g. 'deflate', or a tuple
+        of the name and the compression level, e.g. ('deflate', 9).
+        The codecs are 'stored', 'deflate', 'bzip2', and 'lzma'.
+        Archives which are not mentioned are 'stored'.
+
+    Returns
+    -------
+    codecs : dict
+        Maps the name of each archive to a dict with the 'compression' and
+        the 'compresslevel' to be passed to zipfile.ZipFile().
+    """
+    if compression is None:
+        compression = {}
+
+    for archive in compression:
+        assert archive in ARCHIVES, "Unknown archive '{:s}'.".format(archive)
+
+    codecs = {}
+    for archive in ARCHIVES:
+        codecs[archive] = init_codec(compression.get(archive, "stored"))
+    return codecs
+
+
+def init_codec(codec):
+    if isinstance(codec, str):
+        name, level = codec, None
+    else:
+        name, level = codec
+
+    assert name in CODECS, "Unknown codec '{:s}'.".format(name)
+    if level is not None:
+        level = int(level)
+    return {"compression": CODECS[name], "compresslevel": level}
+
+
+def is_stored(codec):
+    return codec["compression"] == zipfile.ZIP_STORED
+
+
+def open_zip_for_writing(path, codec):
+    return zipfile.ZipFile(file=path, mode="w", **codec)
@@ -1,12 +1,15 @@
 import zipfile
 import os
 import glob
-import pickle
 import difflib
 import json_lines
 import io
+import json
 
 from . import reducing
+from . import mapping
+from . import telemetry
+from ... import oob_pickle
 
 
 class Debugging:
@@ -34,19 +37,23 @@ class Debugging:
             for log_item in jlin:
                 self.log.append(log_item)
 
-        self.tasks = read_items(
-            path=opj(work_dir, "tasks.zip"),
-            pattern=".pickle",
-        )
+        self.tasks = {}
+        for tasks_path in mapping.list_tasks_paths(work_dir=work_dir):
+            self.tasks.update(mapping.read_tasks_from_path(path=tasks_path))
         for i in self.tasks:
-            self.tasks[i] = pickle.loads(self.tasks[i])
+            self.tasks[i] = oob_pickle.loads(self.tasks[i])
+
+        if os.path.exists(mapping.shared_path(work_dir)):
+            self.shared = oob_pickle.read(path=mapping.shared_path(work_dir))
+        else:
+            self.shared = None
 
         self.results = read_items(
             path=path_fallback(opj(work_dir, "tasks.results.zip"), ".part"),
             pattern=".pickle",
         )
         for i in self.results:
-            self.results[i] = pickle.loads(self.results[i])
+            self.results[i] = oob_pickle.loads(self.results[i])
 
         # determine the completion status
         self.completion = {}
@@ -79,6 +86,25 @@ class Debugging:
             self.completion[task_id] = "incomplete"
         self.exceptions.update(left_over_exceptions)
 
+        if os.path.exists(telemetry.path(work_dir)):
+            self._telemetry = telemetry.read(path=telemetry.path(work_dir))
+        else:
+            self._telemetry = telemetry.init()
+        left_over_telemetry = read_glob(os.path.join(work_dir, "*.telemetry"))
+        for task_id in left_over_telemetry:
+            telemetry.append(
+                telemetry=self._telemetry,
+                record=json.loads(left_over_telemetry[task_id]),
+            )
+
+    @property
+    def telemetry(self):
+        """
+        The telemetry of the tasks as a dict of numpy arrays, one for each
+        column, see telemetry.COLUMNS. Requires numpy.
+        """
+        return telemetry.to_numpy(self._telemetry)
+
     def has_non_zero_stdout(self):
         out = set()
         for task_id in self.stdout:
@@ -99,6 +125,13 @@ class Debugging:
             out.add(task_id)
         return out
 
+    def has_exceeded_limits(self):
+        out = set()
+        for task_id in self.exceptions:
+            if exceeded_limit(self.exceptions[task_id]) is not None:
+                out.add(task_id)
+        return out
+
     def is_not_complete(self):
         out = set()
         for task_id in self.completion:
@@ -112,6 +145,7 @@ class Debugging:
             "has_exceptions",
             "has_non_zero_stdout",
             "has_non_zero_stderr",
+            "has_exceeded_limits",
             "is_not_complete",
         ]
         for key in keys:
@@ -141,6 +175,24 @@ class Debugging:
         return msg
 
 
+TASK_LIMITS = ["TaskTimeout", "TaskMemoryExceeded", "TaskKilled"]
+
+
+def exceeded_limit(exception):
+    """
+    Returns the name of the limit, see TASK_LIMITS, which the task with
+    this exception exceeded, or None when the task raised a regular
+    exception. See worker_runtime.run_with_limits().
+    """
+    if isinstance(exception, bytes):
+        exception = bytes.decode(exception)
+    lines = str.splitlines(exception.strip())
+    if len(lines) == 0:
+        return None
+    name = lines[-1].split(":")[0].split(".")[-1]
+    return name if name in TASK_LIMITS else None
+
+
 def path_fallback(path, extention):
     if os.path.exists(path):
         return path
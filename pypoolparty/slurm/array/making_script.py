@@ -1,4 +1,5 @@
 import io
+from ... import worker_runtime
 
 
 def make(
@@ -7,6 +8,15 @@ def make(
     work_dir,
     shebang=None,
     unpack_task_with_asterisk=False,
+    num_tasks_per_batch=None,
+    task_store="zip",
+    num_task_shards=None,
+    oob_pickle=False,
+    with_shared=False,
+    chunksize=None,
+    num_cores=1,
+    task_timeout=None,
+    task_max_memory=None,
 ):
     """
     Parameters
@@ -20,6 +30,38 @@ def make(
         Example: '#!/path/to/executable'
     unpack_task_with_asterisk : bool
         If True, the task will be unpacked into func using an asterisk '*'.
+    num_tasks_per_batch : int or None
+        If the tasks were written to the work_dir in batches, this is the
+        number of tasks in a batch. See mapping.write_tasks_to_work_dir().
+    task_store : str
+        The format the tasks were written in. Either 'zip' or 'flat'.
+    num_task_shards : int or None
+        The number of shards the tasks were written in.
+    oob_pickle : bool
+        If True, the result is pickled with out-of-band buffers.
+    with_shared : bool
+        If True, the shared object is read from the work_dir and is handed
+        to func as 'func(task, shared=shared)'.
+    chunksize : int or None
+        If None, an array element runs the task with the task_id equal to
+        its SLURM_ARRAY_TASK_ID. Else an array element runs the chunk of
+        tasks with ichunk equal to its SLURM_ARRAY_TASK_ID, see
+        mapping.read_chunk_task_ids(). The stdout and stderr of each task
+        are redirected into the task's own files.
+    num_cores : int or str
+        Only relevant when chunksize is not None. The tasks of the chunk
+        are run on this many cores by a local pool of forked processes.
+        When 'auto', the number of cores allotted to the array element is
+        read on the worker-node, see worker_runtime.num_cores_allotted().
+    task_timeout : float or None
+        If set, each task is run in a forked process which is killed when
+        the task runs longer than this many seconds, see
+        worker_runtime.run_with_limits(). The task's exception is then a
+        worker_runtime.TaskTimeout.
+    task_max_memory : int or None
+        If set, each task is run in a forked process with its address space
+        limited to this many bytes. The task's exception is then a
+        worker_runtime.TaskMemoryExceeded.
     """
     scr = io.StringIO()
     if shebang:
@@ -28,38 +70,131 @@ def make(
     scr.write("# I was generated automatically by pypoolparty.slurm.array.\n")
     scr.write("# I will be executed on the worker nodes.\n")
     scr.write("import os\n")
+    scr.write("import sys\n")
     scr.write("import traceback\n")
     scr.write("import pickle\n")
-    scr.write("import pypoolparty as ppp\n")
     scr.write("import {:s}\n".format(func_module))
     scr.write("\n")
+    scr.write(worker_runtime.make_load_string(name="rt"))
+    scr.write("\n")
     scr.write('work_dir = "{:s}"\n'.format(work_dir))
     scr.write("\n")
-    scr.write("try:\n")
-    scr.write('    task_id = int(os.environ["SLURM_ARRAY_TASK_ID"])\n')
-    scr.write("    task = ppp.slurm.array.mapping.read_task_from_work_dir(\n")
-    scr.write("        work_dir=work_dir,\n")
-    scr.write("        task_id=task_id,\n")
-    scr.write("    )\n")
+    scr.write("\n")
+    scr.write("def run(task_id, telemetry):\n")
+    scr.write("    try:\n")
+    scr.write("        with telemetry.io():\n")
+    scr.write("            task = rt.read_task_from_work_dir(\n")
+    scr.write("                work_dir=work_dir,\n")
+    scr.write("                task_id=task_id,\n")
     scr.write(
-        "    task_result = {:s}.{:s}({:s}task)\n".format(
-            func_module, func_name, asterisk_or_not
+        "                num_tasks_per_batch={:s},\n".format(
+            repr(num_tasks_per_batch)
         )
     )
-    scr.write("    ppp.utils.write_pickle(\n")
-    scr.write("        path=os.path.join(\n")
-    scr.write('            work_dir, "{:d}.pickle".format(task_id)\n')
-    scr.write("        ),\n")
-    scr.write("        content=task_result,\n")
-    scr.write("    )\n")
-    scr.write("except Exception:\n")
-    scr.write("    ppp.utils.write_text(\n")
+    scr.write("                task_store={:s},\n".format(repr(task_store)))
+    scr.write(
+        "                num_shards={:s},\n".format(repr(num_task_shards))
+    )
+    scr.write("            )\n")
+    if with_shared:
+        scr.write("            shared = rt.read_shared_from_work_dir(\n")
+        scr.write("                work_dir=work_dir\n")
+        scr.write("            )\n")
+    call = "{:s}.{:s}({:s}task{:s})".format(
+        func_module,
+        func_name,
+        asterisk_or_not,
+        ", shared=shared" if with_shared else "",
+    )
+    if task_timeout is None and task_max_memory is None:
+        scr.write("        task_result = {:s}\n".format(call))
+    else:
+        scr.write("        task_result = rt.run_with_limits(\n")
+        scr.write("            lambda: {:s},\n".format(call))
+        scr.write("            timeout={:s},\n".format(repr(task_timeout)))
+        scr.write(
+            "            max_memory={:s},\n".format(repr(task_max_memory))
+        )
+        scr.write("            telemetry=telemetry,\n")
+        scr.write("        )\n")
+    scr.write("        return task_result, None\n")
+    scr.write("    except Exception:\n")
+    scr.write("        return None, traceback.format_exc()\n")
+    scr.write("\n")
+    scr.write("\n")
+    scr.write("def write(task_id, task_result, exception):\n")
+    scr.write("    if exception is None:\n")
+    scr.write("        try:\n")
+    scr.write("            rt.write_pickle(\n")
+    scr.write("                path=os.path.join(\n")
+    scr.write('                    work_dir, "{:d}.pickle".format(task_id)\n')
+    scr.write("                ),\n")
+    scr.write("                content=task_result,\n")
+    scr.write("                oob={:s},\n".format(repr(bool(oob_pickle))))
+    scr.write("            )\n")
+    scr.write("            return True\n")
+    scr.write("        except Exception:\n")
+    scr.write("            exception = traceback.format_exc()\n")
+    scr.write("    rt.write_text(\n")
     scr.write("        path=os.path.join(\n")
     scr.write('            work_dir, "{:d}.exception".format(task_id)\n')
     scr.write("        ),\n")
-    scr.write("        content=traceback.format_exc(),\n")
+    scr.write("        content=exception,\n")
     scr.write("    )\n")
+    scr.write("    return False\n")
     scr.write("\n")
+    scr.write("\n")
+    scr.write("def run_and_write(task_id):\n")
+    scr.write(
+        "    telemetry = rt.TaskTelemetry(task_id, submit_time=submit_time)\n"
+    )
+    if chunksize is None:
+        scr.write("    task_result, exception = run(task_id, telemetry)\n")
+    else:
+        scr.write("    with rt.redirect_stdout_and_stderr(\n")
+        scr.write("        stdout_path=os.path.join(\n")
+        scr.write('            work_dir, "{:d}.stdout".format(task_id)\n')
+        scr.write("        ),\n")
+        scr.write("        stderr_path=os.path.join(\n")
+        scr.write('            work_dir, "{:d}.stderr".format(task_id)\n')
+        scr.write("        ),\n")
+        scr.write("    ):\n")
+        scr.write("        task_result, exception = run(task_id, telemetry)\n")
+    scr.write("    with telemetry.io():\n")
+    scr.write("        with_result = write(task_id, task_result, exception)\n")
+    scr.write(
+        "    rt.write_telemetry(work_dir=work_dir, telemetry=telemetry)\n"
+    )
+    # The outputs are complete before the completion is visible.
+    scr.write("    sys.stdout.flush()\n")
+    scr.write("    sys.stderr.flush()\n")
+    scr.write("    rt.append_completion(work_dir, task_id, with_result)\n")
+    scr.write("\n")
+    scr.write("\n")
+    scr.write("# The time the job was submitted is the script's argument.\n")
+    scr.write(
+        "submit_time = float(sys.argv[1]) if len(sys.argv) > 1 else None\n"
+    )
+    if chunksize is None:
+        scr.write(
+            'run_and_write(task_id=int(os.environ["SLURM_ARRAY_TASK_ID"]))\n'
+        )
+    else:
+        scr.write('ichunk = int(os.environ["SLURM_ARRAY_TASK_ID"])\n')
+        scr.write("task_ids = rt.read_chunk_task_ids(\n")
+        scr.write("    work_dir=work_dir,\n")
+        scr.write("    ichunk=ichunk,\n")
+        scr.write("    chunksize={:d},\n".format(chunksize))
+        scr.write(")\n")
+        scr.write(
+            "num_cores = rt.num_cores_allotted(num_cores={:s})\n".format(
+                repr(num_cores)
+            )
+        )
+        scr.write("for _ in rt.imap_unordered_on_cores(\n")
+        scr.write("    run_and_write, task_ids, num_cores\n")
+        scr.write("):\n")
+        scr.write("    pass\n")
 
     scr.seek(0)
     return scr.read()
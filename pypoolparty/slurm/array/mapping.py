@@ -1,21 +1,445 @@
 import os
 import zipfile
 import pickle
+import itertools
+import glob
+import json
+import queue
+import concurrent.futures
+import multiprocessing
+import contextlib
+import collections
+from ... import flat_archive
+from ... import oob_pickle
+from ... import utils
+from . import compressing
 
+# The worker-nodes read their tasks with the stdlib-only worker_runtime.
+from ...worker_runtime import (
+    TASK_STORES,
+    tasks_path,
+    shared_path,
+    read_shared_from_work_dir,
+    chunk_task_ids_path,
+    read_chunk_task_ids,
+    locate_task,
+    read_task_from_work_dir,
+)
 
-def read_task_from_work_dir(work_dir, task_id):
-    tasks_path = os.path.join(work_dir, "tasks.zip")
-    task_filename = "{:d}.pickle".format(task_id)
-    with zipfile.ZipFile(file=tasks_path, mode="r") as zin:
-        with zin.open(task_filename, "r") as f:
-            task = pickle.loads(f.read())
-    return task
 
+def write_chunk_task_ids(work_dir, ichunk, task_ids):
+    """
+    Writes an explicit list of the task_ids in the chunk. This is needed
+    when the chunk is not a full range of chunksize tasks, e.g. the last
+    chunk, or a chunk which is resubmitted with only the tasks which did not
+    return yet.
+    """
+    utils.write_text(
+        path=chunk_task_ids_path(work_dir=work_dir, ichunk=ichunk),
+        content=json.dumps([int(task_id) for task_id in task_ids]),
+    )
 
-def write_tasks_to_work_dir(work_dir, tasks):
-    tasks_path = os.path.join(work_dir, "tasks.zip")
-    with zipfile.ZipFile(file=tasks_path + ".part", mode="w") as zout:
-        for task_id in range(len(tasks)):
-            with zout.open(name="{:d}.pickle".format(task_id), mode="w") as f:
-                f.write(pickle.dumps(tasks[task_id]))
-    os.rename(tasks_path + ".part", tasks_path)
+
+def list_tasks_paths(work_dir):
+    """
+    Returns the paths of all files holding tasks in the work_dir.
+    """
+    out = []
+    for task_store in TASK_STORES:
+        extension = TASK_STORES[task_store]
+        for wildcard in ["tasks", "tasks.[0-9]*", "tasks.shard*"]:
+            paths = glob.glob(os.path.join(work_dir, wildcard + extension))
+            out += sorted(paths)
+    return out
+
+
+def read_tasks_from_path(path):
+    """
+    Returns a dict of all tasks, still pickled, in the file at path.
+    """
+    if path.endswith(TASK_STORES["flat"]):
+        return flat_archive.read_all(path=path)
+
+    out = {}
+    with zipfile.ZipFile(path, "r") as zin:
+        for fileitem in zin.filelist:
+            task_id = int(str.replace(fileitem.filename, ".pickle", ""))
+            out[task_id] = zin.read(name=fileitem.filename)
+    return out
+
+
+def write_tasks_to_work_dir(
+    work_dir,
+    tasks,
+    start_task_id=0,
+    ibatch=None,
+    task_store="zip",
+    num_shards=None,
+    oob=False,
+    codec=None,
+    num_processes=None,
+    max_num_tasks_in_flight=None,
+):
+    """
+    Writes the tasks into the work_dir.
+
+    Parameters
+    ----------
+    work_dir : str
+        Path to the work_dir.
+    tasks : iterable
+        The tasks. Only a few tasks are held in memory at a time.
+    start_task_id : int
+        The task_id of the first task in tasks.
+    ibatch : int or None
+        If None, the tasks are written to 'tasks.zip' or 'tasks.bin'.
+        Else they are written to the file of this batch.
+    task_store : str
+        Either 'zip' or 'flat'. See tasks_path().
+    num_shards : int or None
+        If provided, the tasks are spread over this many files (shards)
+        which are written in parallel. The shard of a task is
+        'task_id % num_shards'. A worker-node only has to open the shard
+        holding its task. This spreads the load on the filesystem's
+        metadata when many worker-nodes start at the same time.
+    oob : bool
+        If True, the tasks are pickled with protocol 5 and their large
+        buffers, e.g. numpy arrays, are written out-of-band and aligned.
+        A worker-node maps the tasks into memory and rebuilds the buffers
+        without copying them. See oob_pickle.
+    codec : dict or None
+        The codec to compress the zip-file(s). See compressing.init_codec().
+        Ignored by the 'flat' task_store. Default is not to compress.
+    num_processes : int or None
+        If provided, and if tasks is a sequence (has len() and []), the tasks
+        are pickled in parallel by this many forked processes. The
+        processes inherit the tasks from the fork and only return the
+        pickled bytes. The tasks are still written in the order of their
+        task_id by one writer. Otherwise the tasks are pickled one after
+        another.
+    max_num_tasks_in_flight : int or None
+        When pickling in processes, up to this many tasks are being pickled
+        or are waiting to be written at a time. This bounds the memory.
+        Default is 1024 times num_processes.
+
+    Returns
+    -------
+    num_tasks : int
+        Number of tasks written.
+    """
+    with _pickling_processes(tasks=tasks, num_processes=num_processes) as ex:
+        items = _enumerate_and_pickle(
+            tasks=tasks,
+            start_task_id=start_task_id,
+            oob=oob,
+            executor=ex,
+            num_processes=num_processes,
+            max_num_tasks_in_flight=max_num_tasks_in_flight,
+        )
+        return _write_pickled_tasks(
+            work_dir=work_dir,
+            items=items,
+            ibatch=ibatch,
+            task_store=task_store,
+            num_shards=num_shards,
+            oob=oob,
+            codec=codec,
+        )
+
+
+def _write_pickled_tasks(
+    work_dir, items, ibatch, task_store, num_shards, oob, codec
+):
+    if num_shards is None:
+        path = tasks_path(work_dir, ibatch=ibatch, task_store=task_store)
+        return _write_items(
+            path=path, items=items, task_store=task_store, oob=oob, codec=codec
+        )
+
+    num_shards = int(num_shards)
+    assert num_shards > 0
+
+    shard_queues = [queue.Queue(maxsize=16) for ishard in range(num_shards)]
+    num_tasks = 0
+    with concurrent.futures.ThreadPoolExecutor(max_workers=num_shards) as ex:
+        shard_writers = []
+        for ishard in range(num_shards):
+            path = tasks_path(
+                work_dir, ibatch=ibatch, task_store=task_store, ishard=ishard
+            )
+            shard_writer = ex.submit(
+                _write_items,
+                path=path,
+                items=_iter_queue(shard_queues[ishard]),
+                task_store=task_store,
+                oob=oob,
+                codec=codec,
+            )
+            shard_writers.append(shard_writer)
+
+        # The shard writers only move their shards in place when the end of
+        # their queue is reached. When pulling the items fails, the writers
+        # are aborted so that no incomplete shard is left.
+        end_of_queue = _ABORT
+        try:
+            for task_id, payload in items:
+                ishard = task_id % num_shards
+                _put_unless_consumer_failed(
+                    q=shard_queues[ishard],
+                    item=(task_id, payload),
+                    consumer=shard_writers[ishard],
+                )
+            end_of_queue = None
+        finally:
+            for ishard in range(num_shards):
+                _close_queue_unless_consumer_is_done(
+                    q=shard_queues[ishard],
+                    consumer=shard_writers[ishard],
+                    end_of_queue=end_of_queue,
+                )
+
+        for shard_writer in shard_writers:
+            num_tasks += shard_writer.result()
+
+    return num_tasks
+
+
+def _pickle(task, oob):
+    if oob:
+        return oob_pickle.dumps_to_chunks(task)
+    else:
+        return pickle.dumps(task)
+
+
+def _enumerate_and_pickle(
+    tasks,
+    start_task_id,
+    oob=False,
+    executor=None,
+    num_processes=None,
+    max_num_tasks_in_flight=None,
+):
+    if executor is None:
+        for j, task in enumerate(tasks):
+            yield (start_task_id + j, _pickle(task=task, oob=oob))
+        return
+
+    num_processes = int(num_processes)
+    if max_num_tasks_in_flight is None:
+        max_num_tasks_in_flight = 1024 * num_processes
+    max_num_tasks_in_flight = int(max_num_tasks_in_flight)
+    assert max_num_tasks_in_flight > 0
+    block_size = max(1, max_num_tasks_in_flight // (4 * num_processes))
+
+    block_starts = iter(range(0, len(tasks), block_size))
+    in_flight = collections.deque()
+    try:
+        while True:
+            while len(in_flight) * block_size < max_num_tasks_in_flight:
+                start = next(block_starts, None)
+                if start is None:
+                    break
+                stop = min(start + block_size, len(tasks))
+                block = executor.submit(_pickle_block, start, stop, oob)
+                in_flight.append((start, block))
+
+            if len(in_flight) == 0:
+                break
+
+            start, block = in_flight.popleft()
+            for j, payload in enumerate(block.result()):
+                yield (start_task_id + start + j, payload)
+    finally:
+        for _, block in in_flight:
+            block.cancel()
+
+
+# The tasks to be pickled by the forked processes. The processes inherit the
+# tasks when they are forked, so the tasks do not need to be sent to them.
+_tasks_to_be_pickled = None
+
+
+def _pickle_block(start, stop, oob):
+    out = []
+    for i in range(start, stop):
+        payload = _pickle(task=_tasks_to_be_pickled[i], oob=oob)
+        if oob:
+            payload = b"".join(payload)
+        out.append(payload)
+    return out
+
+
+@contextlib.contextmanager
+def _pickling_processes(tasks, num_processes):
+    """
+    Yields a pool of forked processes to pickle the tasks, or None when the
+    tasks are to be pickled in this process.
+    """
+    can_fork = "fork" in multiprocessing.get_all_start_methods()
+    is_sequence = hasattr(tasks, "__len__") and hasattr(tasks, "__getitem__")
+    if not num_processes or not can_fork or not is_sequence:
+        yield None
+        return
+
+    num_processes = int(num_processes)
+    assert num_processes > 0
+
+    global _tasks_to_be_pickled
+    _tasks_to_be_pickled = tasks
+    try:
+        with concurrent.futures.ProcessPoolExecutor(
+            max_workers=num_processes,
+            mp_context=multiprocessing.get_context("fork"),
+        ) as ex:
+            # Fork all processes now, before any writer-thread is started.
+            ex.submit(int).result()
+            yield ex
+    finally:
+        _tasks_to_be_pickled = None
+
+
+def _write_items(path, items, task_store, oob=False, codec=None):
+    num = 0
+    if task_store == "flat":
+        alignment = oob_pickle.ALIGNMENT if oob else None
+        with flat_archive.Writer(path=path, alignment=alignment) as fout:
+            for task_id, payload in items:
+                fout.append(key=task_id, payload=payload)
+                num += 1
+        return num
+
+    if codec is None:
+        codec = compressing.init_codec("stored")
+
+    try:
+        with compressing.open_zip_for_writing(path + ".part", codec) as zout:
+            for task_id, payload in items:
+                name = "{:d}.pickle".format(task_id)
+                if oob and compressing.is_stored(codec):
+                    f = oob_pickle.open_aligned_zip_member_for_writing(
+                        zout, name
+                    )
+                else:
+                    f = zout.open(name=name, mode="w")
+                with f:
+                    for chunk in (
+                        payload if isinstance(payload, list) else [payload]
+                    ):
+                        f.write(chunk)
+                num += 1
+    except BaseException:
+        if os.path.exists(path + ".part"):
+            os.remove(path + ".part")
+        raise
+    os.rename(path + ".part", path)
+    return num
+
+
+# Ends a queue of items and makes its consumer fail instead of finishing.
+_ABORT = object()
+
+
+def _iter_queue(q):
+    while True:
+        item = q.get()
+        if item is None:
+            break
+        if item is _ABORT:
+            raise RuntimeError("The producer of the items failed.")
+        yield item
+
+
+def _close_queue_unless_consumer_is_done(
+    q, consumer, timeout=1.0, end_of_queue=None
+):
+    while not consumer.done():
+        try:
+            q.put(end_of_queue, timeout=timeout)
+            return
+        except queue.Full:
+            pass
+
+
+def _put_unless_consumer_failed(q, item, consumer, timeout=1.0):
+    while True:
+        try:
+            q.put(item, timeout=timeout)
+            return
+        except queue.Full:
+            if consumer.done():
+                consumer.result()  # raises the consumer's exception
+                raise RuntimeError("Consumer stopped before end of queue.")
+
+
+def write_tasks_to_work_dir_in_batches(
+    work_dir,
+    tasks,
+    num_tasks_per_batch,
+    task_store="zip",
+    num_shards=None,
+    oob=False,
+    codec=None,
+    num_processes=None,
+    max_num_tasks_in_flight=None,
+):
+    """
+    Pulls the tasks from an iterator and writes them batch by batch into the
+    work_dir. Only one task is held in memory at a time. After a batch is
+    written, its range of task_ids is yielded so that it can be submitted
+    while the next batch is still being pulled from the iterator.
+
+    Parameters
+    ----------
+    work_dir : str
+        Path to the work_dir.
+    tasks : iterable
+        The tasks. E.g. a generator.
+    num_tasks_per_batch : int
+        The number of tasks in a batch.
+    task_store : str
+        Either 'zip' or 'flat'. See tasks_path().
+    num_shards : int or None
+        The number of shards in each batch. See write_tasks_to_work_dir().
+    oob : bool
+        Pickle with out-of-band buffers. See write_tasks_to_work_dir().
+    codec : dict or None
+        The codec to compress the zip-files. See write_tasks_to_work_dir().
+    num_processes : int or None
+        Pickle the tasks in parallel. See write_tasks_to_work_dir().
+        The tasks of a batch are pulled into a list first.
+    max_num_tasks_in_flight : int or None
+        See write_tasks_to_work_dir().
+
+    Yields
+    ------
+    (start_task_id, stop_task_id) : (int, int)
+        The range of task_ids in the batch, 'stop_task_id' is exclusive.
+    """
+    num_tasks_per_batch = int(num_tasks_per_batch)
+    assert num_tasks_per_batch > 0
+    tasks = iter(tasks)
+
+    ibatch = 0
+    while True:
+        start_task_id = ibatch * num_tasks_per_batch
+        batch = itertools.islice(tasks, num_tasks_per_batch)
+        peek = list(itertools.islice(batch, 1))
+        if len(peek) == 0:
+            break
+        batch = itertools.chain(peek, batch)
+        if num_processes:
+            batch = list(batch)
+        num_tasks = write_tasks_to_work_dir(
+            work_dir=work_dir,
+            tasks=batch,
+            start_task_id=start_task_id,
+            ibatch=ibatch,
+            task_store=task_store,
+            num_shards=num_shards,
+            oob=oob,
+            codec=codec,
+            num_processes=num_processes,
+            max_num_tasks_in_flight=max_num_tasks_in_flight,
+        )
+        yield (start_task_id, start_task_id + num_tasks)
+        ibatch += 1
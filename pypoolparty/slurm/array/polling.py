@@ -1,4 +1,5 @@
 from ... import utils as general_utils
+from . import ranges
 
 
 def init_negative_ones():
@@ -25,8 +26,8 @@ def init(
         assert num_resubmissions_by_array_task_id is None
     else:
         p["returned"] = len(reducer.tasks_returned)
-        p["running"] = len(jobs["running"])
-        p["pending"] = len(jobs["pending"])
+        p["running"] = ranges.count(jobs["running"])
+        p["pending"] = ranges.count(jobs["pending"])
         p["error"] = len(jobs["error"])
         p["exceptions"] = len(reducer.tasks_exceptions)
         p["stderr"] = len(reducer.tasks_with_stderr)
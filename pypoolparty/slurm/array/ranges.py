@@ -0,0 +1,137 @@
+"""
+Compact sets of array_task_ids.
+
+Without '--array', squeue reports the pending elements of a job-array in a
+single line with a compact array_task_id such as '5-99999%500' or
+'1,3,5-11:2'. Only the running elements and the elements in error states
+get a line of their own. The compact array_task_id is parsed into a list of
+python ranges, so the pending elements are never expanded one by one.
+"""
+
+import re
+from . import utils
+
+_TOKEN_RE = re.compile(r"^(\d+)(?:-(\d+)(?::(\d+))?)?$")
+
+
+def parse(array_task_id_str):
+    """
+    Returns the list of ranges of the array_task_ids in array_task_id_str.
+
+    Parameters
+    ----------
+    array_task_id_str : str
+        E.g. '13', '5-99999%500', or '1,3,5-11:2'. The limit of
+        simultaneously running tasks, e.g. '%500', is ignored. When the job
+        is not an array, squeue reports 'N/A' which has no array_task_ids.
+    """
+    s = array_task_id_str.strip()
+    if s.startswith("[") and s.endswith("]"):
+        s = s[1:-1]
+    s = s.split("%")[0]
+    if s in ("", "N/A"):
+        return []
+
+    out = []
+    for token in s.split(","):
+        match = _TOKEN_RE.match(token)
+        assert match is not None, "Bad array_task_id '{:s}'.".format(
+            array_task_id_str
+        )
+        start, stop, step = match.groups()
+        start = int(start)
+        stop = start if stop is None else int(stop)
+        step = 1 if step is None else int(step)
+        assert step > 0
+        out.append(range(start, stop + 1, step))
+    return out
+
+
+def to_str(ranges):
+    """
+    Returns the compact string of the ranges in squeue's notation, i.e. the
+    inverse of parse().
+    """
+    tokens = []
+    for r in ranges:
+        if len(r) == 0:
+            continue
+        elif len(r) == 1:
+            tokens.append("{:d}".format(r[0]))
+        elif r.step == 1:
+            tokens.append("{:d}-{:d}".format(r[0], r[-1]))
+        else:
+            tokens.append("{:d}-{:d}:{:d}".format(r[0], r[-1], r.step))
+    return ",".join(tokens)
+
+
+def compress(array_task_ids):
+    """
+    Returns the list of ranges with step 1 which cover the array_task_ids.
+    """
+    out = []
+    for array_task_id in sorted(set(int(i) for i in array_task_ids)):
+        if len(out) > 0 and out[-1].stop == array_task_id:
+            out[-1] = range(out[-1].start, array_task_id + 1)
+        else:
+            out.append(range(array_task_id, array_task_id + 1))
+    return out
+
+
+def count(ranges):
+    return sum(len(r) for r in ranges)
+
+
+def contains(ranges, array_task_id):
+    array_task_id = int(array_task_id)
+    for r in ranges:
+        if array_task_id in r:
+            return True
+    return False
+
+
+def from_columns(columns, indices):
+    """
+    Returns the list of ranges of the array_task_ids of the jobs at indices
+    in the columns of squeue, see calling.squeue_columns().
+    """
+    out = []
+    for i in indices:
+        out += parse(columns["array_task_id"][i])
+    return out
+
+
+def expand_jobs(jobs):
+    """
+    Returns one job for each array element in the jobs. A job which
+    reports a compact array_task_id, e.g. jobid '123_[5-9]', is expanded into
+    the jobs '123_5', '123_6', ..., '123_9'.
+    """
+    out = []
+    for job in jobs:
+        job_id = job["jobid"].split("_")[0]
+        for r in parse(job["array_task_id"]):
+            for array_task_id in r:
+                element = dict(job)
+                element["array_task_id"] = str(array_task_id)
+                element["jobid"] = utils.join_job_id_and_array_task_id(
+                    job_id=job_id, array_task_id=array_task_id
+                )
+                out.append(element)
+    return out
+
+
+def compact_jobids(jobs):
+    """
+    Returns the jobids of the array elements in the jobs in slurm's compact
+    notation with one jobid for each job-array, e.g. '123_[5-9,11]'.
+    """
+    array_task_ids = {}
+    for job in jobs:
+        job_id = job["jobid"].split("_")[0]
+        array_task_ids.setdefault(job_id, []).append(job["array_task_id"])
+
+    out = []
+    for job_id, ids in array_task_ids.items():
+        out.append("{:s}_[{:s}]".format(job_id, to_str(compress(ids))))
+    return out
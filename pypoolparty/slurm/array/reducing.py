@@ -1,73 +1,155 @@
 import os
-import zipfile
-import pickle
 import glob
 import re
 import json
 from ... import utils
+from ... import oob_pickle
+from ... import journal
+from ... import worker_runtime
+from . import compressing
+from . import telemetry
 
 
 class Reducer:
-    def __init__(self, work_dir):
-        zz = zipfile
+    def __init__(self, work_dir, codecs=None):
+        """
+        Parameters
+        ----------
+        work_dir : str
+            Path to the work_dir.
+        codecs : dict or None
+            The codecs to compress the archives of the results, stdout,
+            stderr, and exceptions. See compressing.init().
+        """
+        zz = compressing.open_zip_for_writing
         self.work_dir = work_dir
+        self.codecs = compressing.init() if codecs is None else codecs
 
         self.results_path = os.path.join(work_dir, "tasks.results.zip")
-        self.zip_results = zz.ZipFile(self.results_path + ".part", "w")
+        self.zip_results = zz(
+            self.results_path + ".part", self.codecs["results"]
+        )
 
         self.stdout_path = os.path.join(work_dir, "tasks.stdout.zip")
-        self.zip_stdout = zz.ZipFile(self.stdout_path + ".part", "w")
+        self.zip_stdout = zz(self.stdout_path + ".part", self.codecs["stdout"])
         self.missing_stdout = set()
 
         self.stderr_path = os.path.join(work_dir, "tasks.stderr.zip")
-        self.zip_stderr = zz.ZipFile(self.stderr_path + ".part", "w")
+        self.zip_stderr = zz(self.stderr_path + ".part", self.codecs["stderr"])
         self.missing_stderr = set()
 
         self.exceptions_path = os.path.join(work_dir, "tasks.exceptions.zip")
-        self.zip_exceptions = zz.ZipFile(self.exceptions_path + ".part", "w")
+        self.zip_exceptions = zz(
+            self.exceptions_path + ".part", self.codecs["exceptions"]
+        )
+
+        self.telemetry_path = telemetry.path(work_dir)
+        self.telemetry = telemetry.init()
+        self.missing_telemetry = set()
+
+        self.completions_path = worker_runtime.completions_path(work_dir)
+        self.completions_offset = 0
+        self.pending_completions = {}
 
         self.tasks_results = []
         self.tasks_exceptions = []
         self.tasks_with_stdout = []
         self.tasks_with_stderr = []
+        self._tasks_returned_set = set()
 
     @property
     def tasks_returned(self):
         return self.tasks_results + self.tasks_exceptions
 
     def reduce(self):
-        result_paths = glob.glob(os.path.join(self.work_dir, "*.pickle"))
-        for path in result_paths:
-            task_id = get_task_id_from_basename(os.path.basename(path))
-            self._reduce_result_of_task(task_id=task_id)
-            self.missing_stdout.add(task_id)
-            self.missing_stderr.add(task_id)
+        """
+        Reduces the tasks which completed since the last call. The tasks are
+        found in the work_dir's journal of completions, see
+        worker_runtime.append_completion(). Only the records which were
+        appended since the last call are read, so a poll does not list the
+        work_dir. The stdout, stderr, and telemetry of a task are picked up
+        together with its result, see _reduce_outputs_of_task().
+        """
+        records, self.completions_offset = journal.read(
+            path=self.completions_path, offset=self.completions_offset
+        )
+        for task_id, payload in records:
+            self.pending_completions[task_id] = bytes(payload)
+
+        # A completion can be visible before its file is, e.g. on NFS.
+        for task_id, kind in list(self.pending_completions.items()):
+            if kind == worker_runtime.COMPLETED_WITH_RESULT:
+                basename = "{:d}.pickle".format(task_id)
+            else:
+                basename = "{:d}.exception".format(task_id)
+            path = os.path.join(self.work_dir, basename)
+            if not os.path.exists(path):
+                if task_id in self._tasks_returned_set:
+                    self.pending_completions.pop(task_id)
+                continue
+            self.pending_completions.pop(task_id)
+            self._reduce_returned_task(task_id=task_id, path=path)
 
+    def rescan(self):
+        """
+        Lists the work_dir and reduces the results and exceptions which
+        were not found in the journal of completions. Appending to one
+        file from many nodes is not atomic on every shared filesystem, so
+        a record can get lost. Call this when no more jobs are in the queue
+        while not all tasks have returned.
+        """
+        result_paths = glob.glob(os.path.join(self.work_dir, "*.pickle"))
         exception_paths = glob.glob(os.path.join(self.work_dir, "*.exception"))
-        for path in exception_paths:
+        for path in result_paths + exception_paths:
             task_id = get_task_id_from_basename(os.path.basename(path))
+            self.pending_completions.pop(task_id, None)
+            self._reduce_returned_task(task_id=task_id, path=path)
+
+    def _reduce_returned_task(self, task_id, path):
+        if self._returned_already(task_id=task_id, path=path):
+            return
+        if path.endswith(".pickle"):
+            self._reduce_result_of_task(task_id=task_id)
+        else:
             self._reduce_exception_of_task(task_id=task_id)
-            self.missing_stdout.add(task_id)
-            self.missing_stderr.add(task_id)
-
-        self._try_reduce_missing_stdout()
-        self._try_reduce_missing_stderr()
-
-    def _try_reduce_missing_stdout(self):
-        for task_id in list(self.missing_stdout):
-            basename = "{:d}.stdout".format(task_id)
-            stdout_path = os.path.join(self.work_dir, basename)
-            if os.path.exists(stdout_path):
-                self._reduce_stdout_of_task(task_id=task_id)
-                self.missing_stdout.remove(task_id)
-
-    def _try_reduce_missing_stderr(self):
-        for task_id in list(self.missing_stderr):
-            basename = "{:d}.stderr".format(task_id)
-            stderr_path = os.path.join(self.work_dir, basename)
-            if os.path.exists(stderr_path):
-                self._reduce_stderr_of_task(task_id=task_id)
-                self.missing_stderr.remove(task_id)
+        self._reduce_outputs_of_task(task_id=task_id)
+
+    def _reduce_outputs_of_task(self, task_id):
+        """
+        The worker writes the stdout, stderr, and telemetry of a task before
+        it appends the task's completion. So they are read once together
+        with the task's result instead of being looked for in every poll.
+        What is not visible yet, e.g. on NFS, is reduced in
+        reduce_remaining_stdout_and_stderr_in_case_tasks_did_not_return().
+        """
+        for missing, reduce_output in [
+            (self.missing_stdout, self._reduce_stdout_of_task),
+            (self.missing_stderr, self._reduce_stderr_of_task),
+            (self.missing_telemetry, self._reduce_telemetry_of_task),
+        ]:
+            try:
+                reduce_output(task_id=task_id)
+            except FileNotFoundError:
+                missing.add(task_id)
+
+    def _returned_already(self, task_id, path):
+        """
+        A task can return twice when its chunk was resubmitted after the
+        task had returned. Only the first return is reduced.
+        """
+        if task_id in self._tasks_returned_set:
+            os.remove(path)
+            return True
+        self._tasks_returned_set.add(task_id)
+        return False
+
+    def _reduce_telemetry_of_task(self, task_id):
+        basename = "{:d}.telemetry".format(task_id)
+        path = os.path.join(self.work_dir, basename)
+        with open(path, "rt") as fin:
+            record = json.loads(fin.read())
+        telemetry.append(telemetry=self.telemetry, record=record)
+        os.remove(path)
 
     def _reduce_stderr_of_task(self, task_id):
         basename = "{:d}.stderr".format(task_id)
@@ -94,9 +176,14 @@ class Reducer:
     def _reduce_result_of_task(self, task_id):
         basename = "{:d}.pickle".format(task_id)
         path = os.path.join(self.work_dir, basename)
-        with open(path, "rb") as fin:
-            with self.zip_results.open(name=basename, mode="w") as fout:
-                fout.write(fin.read())
+        if compressing.is_stored(self.codecs["results"]):
+            fout = oob_pickle.open_aligned_zip_member_for_writing(
+                zout=self.zip_results, name=basename
+            )
+        else:
+            fout = self.zip_results.open(name=basename, mode="w")
+        with open(path, "rb") as fin, fout:
+            fout.write(fin.read())
         os.remove(path)
         self.tasks_results.append(task_id)
 
@@ -114,10 +201,17 @@ class Reducer:
         for path in stdout_paths:
             task_id = get_task_id_from_basename(os.path.basename(path))
             self._reduce_stdout_of_task(task_id=task_id)
+            self.missing_stdout.discard(task_id)
         stderr_paths = glob.glob(os.path.join(self.work_dir, "*.stderr"))
         for path in stderr_paths:
             task_id = get_task_id_from_basename(os.path.basename(path))
             self._reduce_stderr_of_task(task_id=task_id)
+            self.missing_stderr.discard(task_id)
+        telemetry_paths = glob.glob(os.path.join(self.work_dir, "*.telemetry"))
+        for path in telemetry_paths:
+            task_id = get_task_id_from_basename(os.path.basename(path))
+            self._reduce_telemetry_of_task(task_id=task_id)
+            self.missing_telemetry.discard(task_id)
 
     def close(self):
         self.zip_results.close()
@@ -128,6 +222,11 @@ class Reducer:
         os.rename(self.stdout_path + ".part", self.stdout_path)
         os.rename(self.stderr_path + ".part", self.stderr_path)
         os.rename(self.exceptions_path + ".part", self.exceptions_path)
+        telemetry.write(
+            path=self.telemetry_path,
+            telemetry=self.telemetry,
+            codec=self.codecs["telemetry"],
+        )
         if self.missing_stdout:
             self._write_json("missing_stdout.json", list(self.missing_stdout))
         if self.missing_stderr:
@@ -155,23 +254,33 @@ def get_task_id_from_basename(basename):
     return int(re.findall(r"\d+", basename)[0])
 
 
-def read_task_results_from_zip(path):
+def read_task_results_from_zip(path, map_into_memory=True):
     task_results = {}
-    with zipfile.ZipFile(path, "r") as zin:
-        infos = zin.infolist()
-        for info in infos:
-            task_id = get_task_id_from_basename(info.filename)
-            with zin.open(info.filename, "r") as fin:
-                task_result = pickle.loads(fin.read())
-                task_results[task_id] = task_result
+    for name, task_result in oob_pickle.read_all_zip_members(
+        path=path, map_into_memory=map_into_memory
+    ).items():
+        task_id = get_task_id_from_basename(name)
+        task_results[task_id] = task_result
     return task_results
 
 
-def read_task_results(work_dir, len_tasks, logger=None):
+def read_task_results(work_dir, len_tasks, logger=None, map_into_memory=True):
+    """
+    Returns the list of the results of the tasks. A task without result
+    has None.
+
+    Parameters
+    ----------
+    map_into_memory : bool
+        If True, the results written out-of-band are mapped into memory and
+        keep the 'tasks.results.zip' open. Set this to False when the
+        work_dir is removed afterwards.
+    """
     logger = utils.make_logger_to_stdout_if_none(logger)
 
     task_results = read_task_results_from_zip(
-        path=os.path.join(work_dir, "tasks.results.zip")
+        path=os.path.join(work_dir, "tasks.results.zip"),
+        map_into_memory=map_into_memory,
     )
     out = []
     for task_id in range(len_tasks):
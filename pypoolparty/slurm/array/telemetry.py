@@ -0,0 +1,121 @@
+"""
+The telemetry of the tasks, i.e. how long each task took, how much memory
+it used, and on which node it ran.
+
+The worker-node writes a small '{task_id}.telemetry' for each task, see
+worker_runtime.TaskTelemetry. The Reducer collects them into columns and
+writes the columns into the sidecar archive 'tasks.telemetry.zip'.
+The archive has one member for each column with the column's raw
+little-endian values, and a member 'hostnames.json' with the names of the
+hosts the column 'hostname' refers to.
+"""
+
+import array
+import json
+import os
+import sys
+import zipfile
+from . import compressing
+
+COLUMNS = {
+    "task_id": "q",
+    "start_time": "d",
+    "wall_time": "d",
+    "cpu_time": "d",
+    "io_time": "d",
+    "max_rss": "q",
+    "queue_latency": "d",
+    "hostname": "q",
+}
+
+NUMPY_DTYPES = {"q": "<i8", "d": "<f8"}
+
+
+def path(work_dir):
+    return os.path.join(work_dir, "tasks.telemetry.zip")
+
+
+def init():
+    """
+    Returns empty columns and an empty list of hostnames.
+    """
+    columns = {}
+    for key, typecode in COLUMNS.items():
+        columns[key] = array.array(typecode)
+    return {"columns": columns, "hostnames": []}
+
+
+def append(telemetry, record):
+    """
+    Appends the record of one task to the columns.
+
+    Parameters
+    ----------
+    telemetry : dict
+        See init().
+    record : dict
+        The telemetry of one task as written by the worker-node.
+    """
+    hostnames = telemetry["hostnames"]
+    hostname = record["hostname"]
+    if hostname not in hostnames:
+        hostnames.append(hostname)
+
+    for key in COLUMNS:
+        if key == "hostname":
+            value = hostnames.index(hostname)
+        else:
+            value = record[key]
+            if value is None:
+                value = float("nan") if COLUMNS[key] == "d" else -1
+        telemetry["columns"][key].append(value)
+
+
+def write(path, telemetry, codec=None):
+    """
+    Writes the columns into the zip-file at path.
+    """
+    if codec is None:
+        codec = compressing.init_codec("stored")
+    with compressing.open_zip_for_writing(path + ".part", codec) as zout:
+        for key, column in telemetry["columns"].items():
+            if sys.byteorder != "little":
+                column = array.array(column.typecode, column)
+                column.byteswap()
+            zout.writestr(key, column.tobytes())
+        zout.writestr("hostnames.json", json.dumps(telemetry["hostnames"]))
+    os.rename(path + ".part", path)
+
+
+def read(path):
+    """
+    Returns the columns and the hostnames in the zip-file at path.
+    """
+    telemetry = init()
+    with zipfile.ZipFile(path, "r") as zin:
+        for key, column in telemetry["columns"].items():
+            column.frombytes(zin.read(key))
+            if sys.byteorder != "little":
+                column.byteswap()
+        telemetry["hostnames"] = json.loads(zin.read("hostnames.json"))
+    return telemetry
+
+
+def to_numpy(telemetry):
+    """
+    Returns a dict of numpy arrays, one for each column. The column
+    'hostname' holds the names of the hosts.
+    """
+    import numpy as np
+
+    out = {}
+    for key, column in telemetry["columns"].items():
+        out[key] = np.frombuffer(
+            column.tobytes(), dtype=NUMPY_DTYPES[COLUMNS[key]]
+        ).copy()
+    hostnames = np.array(telemetry["hostnames"], dtype=str)
+    if len(hostnames) == 0:
+        out["hostname"] = np.array([], dtype=str)
+    else:
+        out["hostname"] = hostnames[out["hostname"]]
+    return out
@@ -1,4 +1,6 @@
 import pypoolparty
+import os
+import tempfile
 
 
 def test_split_job_id_and_array_task_id():
@@ -51,3 +53,19 @@ def test_resubmission_limit():
         num_resubmissions_by_array_task_id={"1": 4, "23": 1000, "100": 1},
         max_num_resubmissions=None,
     )
+
+
+def test_redirect_stdout_and_stderr():
+    with tempfile.TemporaryDirectory() as tmp:
+        opath = os.path.join(tmp, "0.stdout")
+        epath = os.path.join(tmp, "0.stderr")
+        with pypoolparty.slurm.array.utils.redirect_stdout_and_stderr(
+            stdout_path=opath, stderr_path=epath
+        ):
+            os.write(1, b"to stdout\n")
+            os.write(2, b"to stderr\n")
+
+        with open(opath, "rb") as f:
+            assert f.read() == b"to stdout\n"
+        with open(epath, "rb") as f:
+            assert f.read() == b"to stderr\n"
@@ -0,0 +1,50 @@
+import pypoolparty
+from pypoolparty.slurm.array import compressing
+from pypoolparty.slurm.array import mapping
+import tempfile
+import zipfile
+import os
+import pytest
+
+
+def test_default_is_stored():
+    codecs = compressing.init()
+    for archive in compressing.ARCHIVES:
+        assert compressing.is_stored(codecs[archive])
+
+
+def test_codec_with_level():
+    codecs = compressing.init({"stderr": ("deflate", 9), "results": "lzma"})
+    assert codecs["stderr"]["compression"] == zipfile.ZIP_DEFLATED
+    assert codecs["stderr"]["compresslevel"] == 9
+    assert codecs["results"]["compression"] == zipfile.ZIP_LZMA
+    assert codecs["results"]["compresslevel"] is None
+    assert compressing.is_stored(codecs["tasks"])
+
+
+def test_unknown_archive_or_codec():
+    with pytest.raises(AssertionError):
+        compressing.init({"nope": "deflate"})
+    with pytest.raises(AssertionError):
+        compressing.init({"tasks": "nope"})
+
+
+def test_write_and_read_compressed_tasks():
+    tasks = ["Hello {:d}".format(i) * 100 for i in range(100)]
+    for name in compressing.CODECS:
+        for oob in [False, True]:
+            codec = compressing.init_codec(name)
+            with tempfile.TemporaryDirectory() as tmp:
+                mapping.write_tasks_to_work_dir(
+                    work_dir=tmp, tasks=tasks, oob=oob, codec=codec
+                )
+                with zipfile.ZipFile(mapping.tasks_path(tmp), "r") as zin:
+                    for zinfo in zin.infolist():
+                        assert zinfo.compress_type == codec["compression"]
+
+                for task_id in range(len(tasks)):
+                    task = mapping.read_task_from_work_dir(
+                        work_dir=tmp,
+                        task_id=task_id,
+                    )
+                    assert tasks[task_id] == task
@@ -0,0 +1,126 @@
+import pypoolparty
+import json
+import os
+import tempfile
+
+ranges = pypoolparty.slurm.array.ranges
+
+
+def test_parse():
+    assert ranges.parse("13") == [range(13, 14)]
+    assert ranges.parse("5-99999%500") == [range(5, 100000)]
+    assert ranges.parse("[1,3,5-11:2]") == [
+        range(1, 2),
+        range(3, 4),
+        range(5, 12, 2),
+    ]
+    assert ranges.parse("N/A") == []
+    assert ranges.count(ranges.parse("5-99999%500")) == 99995
+    assert ranges.contains(ranges.parse("1,3,5-11:2"), 9)
+    assert not ranges.contains(ranges.parse("1,3,5-11:2"), 8)
+
+
+def test_to_str_and_compress():
+    assert ranges.to_str(ranges.compress([7, 1, 2, 3, 5, 6])) == "1-3,5-7"
+    assert ranges.to_str([range(5, 12, 2), range(20, 21)]) == "5-11:2,20"
+    for s in ["1-3,5-7", "5-11:2,20", "0"]:
+        assert ranges.to_str(ranges.parse(s)) == s
+
+
+def test_expand_jobs():
+    jobs = [
+        {"jobid": "123_[5-7%2]", "array_task_id": "5-7%2", "state": "PENDING"},
+        {"jobid": "123_13", "array_task_id": "13", "state": "PENDING"},
+    ]
+    elements = ranges.expand_jobs(jobs=jobs)
+    assert [e["jobid"] for e in elements] == [
+        "123_5",
+        "123_6",
+        "123_7",
+        "123_13",
+    ]
+    assert [e["array_task_id"] for e in elements] == ["5", "6", "7", "13"]
+    assert elements[0]["state"] == "PENDING"
+
+
+def test_dummy_squeue_reports_pending_elements_compact():
+    with tempfile.TemporaryDirectory(prefix="pypoolparty") as tmp:
+        qpaths = pypoolparty.slurm.testing.dummy_init(path=tmp)
+        pypoolparty.testing.dummy_init_queue_state(path=qpaths["queue_state"])
+
+        with open(qpaths["queue_state"], "rt") as f:
+            state = json.loads(f.read())
+        for array_task_id in range(100):
+            state["jobs"].append(
+                {
+                    "NAME": "abc",
+                    "JOBID": "123_{:d}".format(array_task_id),
+                    "STATE": "PENDING",
+                    "REASON": "foobar",
+                    "PRIORITY": "0.999",
+                    "ARRAY_TASK_ID": str(array_task_id),
+                    "_array_throttle": 10,
+                }
+            )
+        with open(qpaths["queue_state"], "wt") as f:
+            f.write(json.dumps(state))
+
+        # each call of the dummy squeue starts one pending job
+        columns = pypoolparty.slurm.calling.squeue_columns(
+            squeue_path=qpaths["squeue"], array=False
+        )
+        assert columns["jobid"] == ["123_0", "123_[1-99%10]"]
+        assert columns["state"] == ["RUNNING", "PENDING"]
+
+        running, pending, error = (
+            pypoolparty.slurm.organizing_jobs.split_columns_in_running_pending_error(
+                columns=columns
+            )
+        )
+        assert ranges.from_columns(columns, running) == [range(0, 1)]
+        assert ranges.from_columns(columns, pending) == [range(1, 100)]
+        assert len(error) == 0
+
+        columns = pypoolparty.slurm.calling.squeue_columns(
+            squeue_path=qpaths["squeue"], array=True
+        )
+        assert len(columns["jobid"]) == 100
+
+
+def test_scancel_many_in_compact_notation():
+    jobs = [
+        {"jobid": "123_5", "array_task_id": "5"},
+        {"jobid": "123_6", "array_task_id": "6"},
+        {"jobid": "123_9", "array_task_id": "9"},
+        {"jobid": "77_1", "array_task_id": "1"},
+    ]
+    jobids = ranges.compact_jobids(jobs=jobs)
+    assert jobids == ["123_[5-6,9]", "77_[1]"]
+
+    with tempfile.TemporaryDirectory(prefix="pypoolparty") as tmp:
+        qpaths = pypoolparty.slurm.testing.dummy_init(path=tmp)
+        pypoolparty.testing.dummy_init_queue_state(path=qpaths["queue_state"])
+        with open(qpaths["queue_state"], "rt") as f:
+            state = json.loads(f.read())
+        for array_task_id in range(10):
+            state["jobs"].append(
+                {"NAME": "abc", "JOBID": "123_{:d}".format(array_task_id)}
+            )
+        with open(qpaths["queue_state"], "wt") as f:
+            f.write(json.dumps(state))
+
+        # '77_[1]' is already gone which is not an error.
+        pypoolparty.slurm.calling.scancel_many(
+            jobids=jobids, scancel_path=qpaths["scancel"]
+        )
+        with open(qpaths["queue_state"], "rt") as f:
+            state = json.loads(f.read())
+        assert [job["JOBID"] for job in state["jobs"]] == [
+            "123_0",
+            "123_1",
+            "123_2",
+            "123_3",
+            "123_4",
+            "123_7",
+            "123_8",
+        ]
@@ -0,0 +1,130 @@
+from pypoolparty import worker_runtime
+from pypoolparty.slurm.array import reducing
+import tempfile
+import os
+
+
+def write_returned_task(work_dir, task_id, with_result=True, journal=True):
+    if with_result:
+        worker_runtime.write_pickle(
+            path=os.path.join(work_dir, "{:d}.pickle".format(task_id)),
+            content=task_id,
+        )
+    else:
+        worker_runtime.write_text(
+            path=os.path.join(work_dir, "{:d}.exception".format(task_id)),
+            content="Bad things happened.",
+        )
+    for ext in ["stdout", "stderr"]:
+        worker_runtime.write_text(
+            path=os.path.join(work_dir, "{:d}.{:s}".format(task_id, ext)),
+            content="",
+        )
+    if journal:
+        worker_runtime.append_completion(
+            work_dir=work_dir, task_id=task_id, with_result=with_result
+        )
+
+
+def test_reduce_reads_only_new_completions():
+    with tempfile.TemporaryDirectory(prefix="pypoolparty") as tmp:
+        with reducing.Reducer(work_dir=tmp) as reducer:
+            reducer.reduce()
+            assert reducer.tasks_returned == []
+
+            write_returned_task(tmp, task_id=0)
+            write_returned_task(tmp, task_id=1, with_result=False)
+            reducer.reduce()
+            assert reducer.tasks_results == [0]
+            assert reducer.tasks_exceptions == [1]
+            offset = reducer.completions_offset
+            assert offset == os.stat(reducer.completions_path).st_size
+
+            reducer.reduce()
+            assert reducer.completions_offset == offset
+            assert sorted(reducer.tasks_returned) == [0, 1]
+
+            write_returned_task(tmp, task_id=2)
+            reducer.reduce()
+            assert sorted(reducer.tasks_returned) == [0, 1, 2]
+            assert not reducer.missing_stdout
+            assert not reducer.missing_stderr
+
+        results = reducing.read_task_results(work_dir=tmp, len_tasks=3)
+        assert results == [0, None, 2]
+
+
+def test_completion_before_its_file_is_visible():
+    with tempfile.TemporaryDirectory(prefix="pypoolparty") as tmp:
+        with reducing.Reducer(work_dir=tmp) as reducer:
+            worker_runtime.append_completion(
+                work_dir=tmp, task_id=3, with_result=True
+            )
+            reducer.reduce()
+            assert reducer.tasks_returned == []
+            assert 3 in reducer.pending_completions
+
+            write_returned_task(tmp, task_id=3, journal=False)
+            reducer.reduce()
+            assert reducer.tasks_returned == [3]
+            assert not reducer.pending_completions
+
+
+def test_rescan_finds_lost_completions():
+    with tempfile.TemporaryDirectory(prefix="pypoolparty") as tmp:
+        with reducing.Reducer(work_dir=tmp) as reducer:
+            write_returned_task(tmp, task_id=0, journal=False)
+            write_returned_task(tmp, task_id=1)
+            reducer.reduce()
+            assert reducer.tasks_returned == [1]
+
+            reducer.rescan()
+            assert sorted(reducer.tasks_returned) == [0, 1]
+
+            # a task which returns again after a resubmission
+            write_returned_task(tmp, task_id=1)
+            reducer.reduce()
+            assert sorted(reducer.tasks_returned) == [0, 1]
+            assert not os.path.exists(os.path.join(tmp, "1.pickle"))
+
+
+def test_completions_behind_a_torn_record_are_reduced():
+    with tempfile.TemporaryDirectory(prefix="pypoolparty") as tmp:
+        with reducing.Reducer(work_dir=tmp) as reducer:
+            write_returned_task(tmp, task_id=0)
+            reducer.reduce()
+            assert reducer.tasks_returned == [0]
+
+            # an append of an other node got torn on NFS
+            with open(reducer.completions_path, "ab") as f:
+                f.write(b"pppj\x02\x00\x00")
+            write_returned_task(tmp, task_id=3)
+            write_returned_task(tmp, task_id=4)
+            reducer.reduce()
+            assert sorted(reducer.tasks_returned) == [0, 3, 4]
+
+
+def test_outputs_are_read_with_the_completion():
+    with tempfile.TemporaryDirectory(prefix="pypoolparty") as tmp:
+        with reducing.Reducer(work_dir=tmp) as reducer:
+            worker_runtime.write_pickle(
+                path=os.path.join(tmp, "5.pickle"), content=5
+            )
+            worker_runtime.append_completion(
+                work_dir=tmp, task_id=5, with_result=True
+            )
+            reducer.reduce()
+            assert reducer.tasks_returned == [5]
+            assert reducer.missing_stdout == {5}
+            assert reducer.missing_telemetry == {5}
+
+            # not looked for again in every poll
+            worker_runtime.write_text(
+                path=os.path.join(tmp, "5.stdout"), content="late"
+            )
+            reducer.reduce()
+            assert reducer.missing_stdout == {5}
+
+            reducer.reduce_remaining_stdout_and_stderr_in_case_tasks_did_not_return()
+            assert not reducer.missing_stdout
+            assert reducer.tasks_with_stdout == [5]
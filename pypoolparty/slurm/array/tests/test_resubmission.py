@@ -0,0 +1,81 @@
+import pypoolparty
+from pypoolparty.slurm.array import mapping
+import json_line_logger
+import tempfile
+
+
+def _mock_scheduler(monkeypatch, pool, error_array_task_ids):
+    calls = {"scancel": [], "sbatch": []}
+    columns = {
+        "jobid": ["123_" + i for i in error_array_task_ids],
+        "array_task_id": list(error_array_task_ids),
+        "state": ["FAILED" for i in error_array_task_ids],
+        "reason": ["" for i in error_array_task_ids],
+    }
+    monkeypatch.setattr(
+        pypoolparty.slurm.calling,
+        "squeue_columns",
+        lambda **kwargs: columns,
+    )
+    monkeypatch.setattr(
+        pypoolparty.slurm.organizing_jobs,
+        "split_columns_in_running_pending_error",
+        lambda columns, logger: (
+            [],
+            [],
+            list(range(len(error_array_task_ids))),
+        ),
+    )
+    monkeypatch.setattr(
+        pypoolparty.slurm.calling,
+        "scancel_many",
+        lambda jobids, **kwargs: calls["scancel"].append(jobids),
+    )
+    monkeypatch.setattr(
+        pool,
+        "_sbatch_array",
+        lambda task_ids, **kwargs: calls["sbatch"].append(list(task_ids)),
+    )
+    return calls
+
+
+def test_chunk_with_all_tasks_returned_is_not_resubmitted(monkeypatch):
+    pool = pypoolparty.slurm.array.Pool()
+    calls = _mock_scheduler(
+        monkeypatch=monkeypatch, pool=pool, error_array_task_ids=["0", "1"]
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        num, jobs = (
+            pool.resubmit_jobs_which_indicate_errors_and_might_profit_from_a_resubmission(
+                num_resubmissions_by_array_task_id={},
+                work_dir=tmp,
+                jobname="abc",
+                logger=json_line_logger.LoggerStdout(),
+                chunksize=3,
+                tasks_returned=[0, 1, 2, 4],
+            )
+        )
+        assert calls["scancel"] == [["123_[0-1]"]]
+        assert calls["sbatch"] == [["1"]]
+        assert mapping.read_chunk_task_ids(
+            work_dir=tmp, ichunk=1, chunksize=3
+        ) == [3, 5]
+        assert num == {"0": 1, "1": 1}
+
+
+def test_no_sbatch_when_all_chunks_returned(monkeypatch):
+    pool = pypoolparty.slurm.array.Pool()
+    calls = _mock_scheduler(
+        monkeypatch=monkeypatch, pool=pool, error_array_task_ids=["0", "1"]
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        pool.resubmit_jobs_which_indicate_errors_and_might_profit_from_a_resubmission(
+            num_resubmissions_by_array_task_id={},
+            work_dir=tmp,
+            jobname="abc",
+            logger=json_line_logger.LoggerStdout(),
+            chunksize=3,
+            tasks_returned=list(range(6)),
+        )
+        assert len(calls["scancel"]) == 1
+        assert calls["sbatch"] == []
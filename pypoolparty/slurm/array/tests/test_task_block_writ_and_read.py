@@ -1,7 +1,9 @@
 import pypoolparty
+from pypoolparty.slurm.array import mapping
 import tempfile
 import glob
 import os
+import pytest
 
 
 def test_one_big_task():
@@ -48,3 +50,229 @@ def test_many_small_tasks():
                 task_id=task_id,
             )
             assert tasks[task_id] == task
+
+
+def test_tasks_from_generator_in_batches():
+    num_tasks_per_batch = 7
+    tasks = ("Hello {:d}".format(i) for i in range(100))
+    with tempfile.TemporaryDirectory() as tmp:
+        ranges = []
+        for r in mapping.write_tasks_to_work_dir_in_batches(
+            work_dir=tmp,
+            tasks=tasks,
+            num_tasks_per_batch=num_tasks_per_batch,
+        ):
+            ranges.append(r)
+
+        assert len(ranges) == 15
+        assert ranges[0] == (0, 7)
+        assert ranges[-1] == (98, 100)
+        assert len(pypoolparty.slurm.array.mapping.list_tasks_paths(tmp)) == 15
+
+        for task_id in range(100):
+            task = pypoolparty.slurm.array.mapping.read_task_from_work_dir(
+                work_dir=tmp,
+                task_id=task_id,
+                num_tasks_per_batch=num_tasks_per_batch,
+            )
+            assert task == "Hello {:d}".format(task_id)
+
+
+def test_empty_generator_in_batches():
+    with tempfile.TemporaryDirectory() as tmp:
+        ranges = list(
+            pypoolparty.slurm.array.mapping.write_tasks_to_work_dir_in_batches(
+                work_dir=tmp,
+                tasks=iter([]),
+                num_tasks_per_batch=3,
+            )
+        )
+        assert len(ranges) == 0
+        assert len(os.listdir(tmp)) == 0
+
+
+def test_flat_task_store():
+    tasks = ["Hello {:d}".format(i) for i in range(100)]
+    with tempfile.TemporaryDirectory() as tmp:
+        pypoolparty.slurm.array.mapping.write_tasks_to_work_dir(
+            work_dir=tmp,
+            tasks=tasks,
+            task_store="flat",
+        )
+        assert os.path.exists(os.path.join(tmp, "tasks.bin"))
+        assert os.path.exists(os.path.join(tmp, "tasks.idx"))
+
+        for task_id in range(len(tasks)):
+            task = pypoolparty.slurm.array.mapping.read_task_from_work_dir(
+                work_dir=tmp,
+                task_id=task_id,
+                task_store="flat",
+            )
+            assert tasks[task_id] == task
+
+
+def test_flat_task_store_in_batches():
+    tasks = ("Hello {:d}".format(i) for i in range(100))
+    with tempfile.TemporaryDirectory() as tmp:
+        for _ in mapping.write_tasks_to_work_dir_in_batches(
+            work_dir=tmp,
+            tasks=tasks,
+            num_tasks_per_batch=33,
+            task_store="flat",
+        ):
+            pass
+
+        paths = pypoolparty.slurm.array.mapping.list_tasks_paths(tmp)
+        assert len(paths) == 4
+        for task_id in range(100):
+            task = pypoolparty.slurm.array.mapping.read_task_from_work_dir(
+                work_dir=tmp,
+                task_id=task_id,
+                num_tasks_per_batch=33,
+                task_store="flat",
+            )
+            assert task == "Hello {:d}".format(task_id)
+
+
+def test_sharded_task_stores():
+    for task_store in ["zip", "flat"]:
+        for num_shards in [1, 3, 13, 200]:
+            tasks = ["Hello {:d}".format(i) for i in range(100)]
+            with tempfile.TemporaryDirectory() as tmp:
+                num = pypoolparty.slurm.array.mapping.write_tasks_to_work_dir(
+                    work_dir=tmp,
+                    tasks=tasks,
+                    task_store=task_store,
+                    num_shards=num_shards,
+                )
+                assert num == len(tasks)
+                paths = pypoolparty.slurm.array.mapping.list_tasks_paths(tmp)
+                assert len(paths) == num_shards
+
+                for task_id in range(len(tasks)):
+                    task = pypoolparty.slurm.array.mapping.read_task_from_work_dir(
+                        work_dir=tmp,
+                        task_id=task_id,
+                        task_store=task_store,
+                        num_shards=num_shards,
+                    )
+                    assert tasks[task_id] == task
+
+
+def test_sharded_task_stores_in_batches():
+    for task_store in ["zip", "flat"]:
+        tasks = ("Hello {:d}".format(i) for i in range(100))
+        with tempfile.TemporaryDirectory() as tmp:
+            for _ in mapping.write_tasks_to_work_dir_in_batches(
+                work_dir=tmp,
+                tasks=tasks,
+                num_tasks_per_batch=17,
+                task_store=task_store,
+                num_shards=4,
+            ):
+                pass
+
+            for task_id in range(100):
+                task = pypoolparty.slurm.array.mapping.read_task_from_work_dir(
+                    work_dir=tmp,
+                    task_id=task_id,
+                    num_tasks_per_batch=17,
+                    task_store=task_store,
+                    num_shards=4,
+                )
+                assert task == "Hello {:d}".format(task_id)
+
+
+def _tasks_which_can_not_be_pickled():
+    yield "fine"
+    yield lambda x: x
+
+
+def test_sharded_task_store_raises_when_task_can_not_be_pickled():
+    for task_store in ["zip", "flat"]:
+        for num_shards in [None, 2]:
+            with tempfile.TemporaryDirectory() as tmp:
+                with pytest.raises(Exception):
+                    pypoolparty.slurm.array.mapping.write_tasks_to_work_dir(
+                        work_dir=tmp,
+                        tasks=_tasks_which_can_not_be_pickled(),
+                        task_store=task_store,
+                        num_shards=num_shards,
+                    )
+                # no incomplete task store is left behind
+                assert os.listdir(tmp) == []
+
+
+def test_pickling_in_processes():
+    tasks = [{"i": i, "payload": [i] * (i % 13)} for i in range(200)]
+    for task_store in ["zip", "flat"]:
+        for num_shards in [None, 3]:
+            for oob in [False, True]:
+                with tempfile.TemporaryDirectory() as tmp:
+                    num = mapping.write_tasks_to_work_dir(
+                        work_dir=tmp,
+                        tasks=tasks,
+                        task_store=task_store,
+                        num_shards=num_shards,
+                        oob=oob,
+                        num_processes=3,
+                        max_num_tasks_in_flight=20,
+                    )
+                    assert num == len(tasks)
+                    for task_id in range(len(tasks)):
+                        task = mapping.read_task_from_work_dir(
+                            work_dir=tmp,
+                            task_id=task_id,
+                            task_store=task_store,
+                            num_shards=num_shards,
+                        )
+                        assert tasks[task_id] == task
+
+
+def test_pickling_in_processes_in_batches():
+    tasks = ("Hello {:d}".format(i) for i in range(100))
+    with tempfile.TemporaryDirectory() as tmp:
+        ranges = list(
+            mapping.write_tasks_to_work_dir_in_batches(
+                work_dir=tmp,
+                tasks=tasks,
+                num_tasks_per_batch=30,
+                task_store="flat",
+                num_processes=2,
+            )
+        )
+        assert ranges[-1] == (90, 100)
+        for task_id in range(100):
+            task = mapping.read_task_from_work_dir(
+                work_dir=tmp,
+                task_id=task_id,
+                num_tasks_per_batch=30,
+                task_store="flat",
+            )
+            assert task == "Hello {:d}".format(task_id)
+
+
+def test_pickling_in_processes_raises_when_task_can_not_be_pickled():
+    tasks = list(range(100)) + [lambda x: x]
+    with tempfile.TemporaryDirectory() as tmp:
+        with pytest.raises(Exception):
+            mapping.write_tasks_to_work_dir(
+                work_dir=tmp,
+                tasks=tasks,
+                num_processes=2,
+            )
+
+
+def test_chunk_task_ids():
+    with tempfile.TemporaryDirectory() as tmp:
+        assert mapping.read_chunk_task_ids(
+            work_dir=tmp, ichunk=2, chunksize=5
+        ) == [10, 11, 12, 13, 14]
+
+        mapping.write_chunk_task_ids(work_dir=tmp, ichunk=2, task_ids=[11, 13])
+        assert mapping.read_chunk_task_ids(
+            work_dir=tmp, ichunk=2, chunksize=5
+        ) == [11, 13]
+        assert mapping.read_chunk_task_ids(
+            work_dir=tmp, ichunk=3, chunksize=5
+        ) == [15, 16, 17, 18, 19]
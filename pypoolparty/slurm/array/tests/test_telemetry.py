@@ -0,0 +1,58 @@
+from pypoolparty.slurm.array import telemetry
+from pypoolparty.slurm.array import compressing
+import tempfile
+import os
+import math
+import pytest
+
+
+def make_record(task_id, hostname="node-a", queue_latency=1.5):
+    return {
+        "task_id": task_id,
+        "start_time": 1e9 + task_id,
+        "wall_time": 0.25 * task_id,
+        "cpu_time": 0.125 * task_id,
+        "io_time": 0.01,
+        "max_rss": 1024 * task_id,
+        "queue_latency": queue_latency,
+        "hostname": hostname,
+    }
+
+
+def test_write_and_read():
+    tele = telemetry.init()
+    telemetry.append(tele, make_record(0))
+    telemetry.append(tele, make_record(1, hostname="node-b"))
+    telemetry.append(tele, make_record(2, queue_latency=None))
+
+    for codec in ["stored", "deflate"]:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = telemetry.path(tmp)
+            telemetry.write(
+                path=path, telemetry=tele, codec=compressing.init_codec(codec)
+            )
+            assert not os.path.exists(path + ".part")
+            back = telemetry.read(path=path)
+
+        assert back["hostnames"] == ["node-a", "node-b"]
+        assert list(back["columns"]["task_id"]) == [0, 1, 2]
+        assert list(back["columns"]["hostname"]) == [0, 1, 0]
+        assert list(back["columns"]["wall_time"]) == [0.0, 0.25, 0.5]
+        assert list(back["columns"]["max_rss"]) == [0, 1024, 2048]
+        assert math.isnan(back["columns"]["queue_latency"][2])
+
+
+def test_to_numpy():
+    np = pytest.importorskip("numpy")
+    tele = telemetry.init()
+    out = telemetry.to_numpy(tele)
+    assert len(out["task_id"]) == 0
+    assert len(out["hostname"]) == 0
+
+    telemetry.append(tele, make_record(3, hostname="node-b"))
+    telemetry.append(tele, make_record(4))
+    out = telemetry.to_numpy(tele)
+    assert out["task_id"].dtype == np.int64
+    assert out["wall_time"].dtype == np.float64
+    np.testing.assert_array_equal(out["hostname"], ["node-b", "node-a"])
+    np.testing.assert_array_equal(out["cpu_time"], [0.375, 0.5])
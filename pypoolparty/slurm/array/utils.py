@@ -1,3 +1,6 @@
+from ...worker_runtime import redirect_stdout_and_stderr
+
+
 def replace_array_task_id_format_with_integer_format(
     fmt,
     slurm_array_task_id_format="%a",
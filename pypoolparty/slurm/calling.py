@@ -6,6 +6,8 @@ import os
 import time
 import re
 from .. import utils
+from .. import status_cache
+from .. import retrying
 
 
 def sbatch(
@@ -25,11 +27,28 @@ def sbatch(
     timeout=None,
     timecooldown=120.0,
     max_num_retry=30,
+    retry_policy=None,
 ):
+    """
+    Call slurm's sbatch.
+
+    Parameters
+    ----------
+    retry_policy : retrying.RetryPolicy or None
+        How a failed call is retried. Default is
+        retrying.default_policy(timecooldown, max_num_retry).
+
+    Returns
+    -------
+    job_id : str or None
+        The id of the submitted job as reported by 'sbatch --parsable'.
+        None when sbatch did not report it.
+    """
     if logger is None:
         logger = json_line_logger.LoggerStdout()
 
     cmd = [sbatch_path]
+    cmd += ["--parsable"]
     if clusters:
         cmd += ["--clusters", str.join(",", clusters)]
 
@@ -49,22 +68,37 @@ def sbatch(
     for argument in script_arguments:
         cmd += [argument]
 
-    numtry = 0
-    while True:
-        utils.raise_if_too_often(
-            numtry=numtry, max_num_retry=max_num_retry, logger=logger
+    if retry_policy is None:
+        retry_policy = retrying.default_policy(
+            timecooldown=timecooldown, max_num_retry=max_num_retry
         )
-        try:
-            numtry += 1
-            logger.debug("calling sbatch, num. tries = {:d}".format(numtry))
-            subprocess.check_output(
-                cmd, stderr=subprocess.STDOUT, timeout=timeout
-            )
-            break
-        except Exception as bad:
-            logger.warning("Problem in sbatch()")
-            logger.warning(str(bad))
-            utils.random_sleep(timecooldown=timecooldown, logger=logger)
+
+    stdout = retry_policy.call(
+        func=lambda: subprocess.check_output(
+            cmd, stderr=subprocess.PIPE, timeout=timeout
+        ),
+        name="sbatch",
+        logger=logger,
+    )
+
+    job_id = _parse_sbatch_parsable_stdout(stdout.decode())
+    if job_id is None:
+        logger.warning("Can not find job_id in stdout of sbatch.")
+    else:
+        logger.debug("sbatch submitted job_id {:s}".format(job_id))
+    return job_id
+
+
+def _parse_sbatch_parsable_stdout(stdout):
+    """
+    Returns the job_id in the stdout of 'sbatch --parsable' which is
+    either 'job_id' or 'job_id;cluster_name', or None.
+    """
+    for line in reversed(stdout.splitlines()):
+        job_id = line.strip().split(";")[0]
+        if job_id.isdigit():
+            return job_id
+    return None
 
 
 def _make_sbatch_array_task_id_str(
@@ -146,6 +180,7 @@ def scancel(
     timecooldown=120.0,
     max_num_retry=30,
     logger=None,
+    retry_policy=None,
 ):
     if logger is None:
         logger = json_line_logger.LoggerStdout()
@@ -156,22 +191,86 @@ def scancel(
     if jobname is not None:
         cmd += ["--name", str(jobname)]
 
-    numtry = 0
-    while True:
-        utils.raise_if_too_often(
-            numtry=numtry, max_num_retry=max_num_retry, logger=logger
+    if retry_policy is None:
+        retry_policy = retrying.default_policy(
+            timecooldown=timecooldown, max_num_retry=max_num_retry
         )
-        try:
-            numtry += 1
-            logger.debug("calling scancel, num. tries = {:d}".format(numtry))
-            subprocess.check_output(
-                cmd, stderr=subprocess.STDOUT, timeout=timeout
-            )
-            break
-        except Exception as bad:
-            logger.warning("Problem in scancel()")
-            logger.warning(str(bad))
-            utils.random_sleep(timecooldown=timecooldown, logger=logger)
+
+    retry_policy.call(
+        func=lambda: subprocess.check_output(
+            cmd, stderr=subprocess.STDOUT, timeout=timeout
+        ),
+        name="scancel",
+        logger=logger,
+    )
+
+
+def scancel_many(
+    jobids,
+    scancel_path="scancel",
+    timeout=None,
+    timecooldown=120.0,
+    max_num_retry=30,
+    logger=None,
+    retry_policy=None,
+):
+    """
+    Cancels many jobs with as few calls of scancel as the limits of the
+    length of the arguments allow. All calls share one budget of
+    max_num_retry retries. Jobs which are already gone are not an error.
+
+    Parameters
+    ----------
+    jobids : list of str
+        The ids of the jobs. The elements of a job-array can be given in
+        slurm's compact notation, e.g. '123_[5-9,11]'.
+    retry_policy : retrying.RetryPolicy or None
+        How a failed call is retried. Default is
+        retrying.default_policy(timecooldown, max_num_retry).
+    """
+    if logger is None:
+        logger = json_line_logger.LoggerStdout()
+    if retry_policy is None:
+        retry_policy = retrying.default_policy(
+            timecooldown=timecooldown, max_num_retry=max_num_retry
+        )
+
+    utils.call_with_arguments_in_groups(
+        cmd=[scancel_path],
+        arguments=jobids,
+        logger=logger,
+        is_harmless=_scancel_output_is_harmless,
+        timeout=timeout,
+        retry_policy=retry_policy,
+    )
+
+
+def _scancel_output_is_harmless(output):
+    """
+    True when scancel only complains about jobs which are already gone.
+    """
+    harmless = ["Invalid job id", "already completing or completed"]
+    complaints = [line for line in output.splitlines() if "error" in line]
+    if len(complaints) == 0:
+        return False
+    for complaint in complaints:
+        if not any(h in complaint for h in harmless):
+            return False
+    return True
+
+
+# squeue --jobs is called with up to this many job_ids at once.
+MAX_NUM_JOB_IDS_PER_SQUEUE = 1000
+
+# The fields of a job which the pools need, and squeue's format for each.
+SQUEUE_FIELDS = {
+    "name": "%j",
+    "jobid": "%i",
+    "state": "%T",
+    "reason": "%r",
+    "priority": "%Q",
+    "array_task_id": "%K",
+}
 
 
 def squeue(
@@ -183,6 +282,7 @@ def squeue(
     max_num_retry=30,
     logger=None,
     debug_dump_path=None,
+    retry_policy=None,
 ):
     """
     Call slurm's squeue.
@@ -196,53 +296,222 @@ def squeue(
     timecooldown : float
         Time in seconds to wait before calling squeue again in case of a
         problem.
+    retry_policy : retrying.RetryPolicy or None
+        How a failed call is retried. Default is
+        retrying.default_policy(timecooldown, max_num_retry).
 
     Returns
     -------
     squeue : list of dicts
-        The jobs and their attributes
+        The jobs and their fields, see SQUEUE_FIELDS.
+    """
+    columns = squeue_columns(
+        squeue_path=squeue_path,
+        jobname=jobname,
+        array=array,
+        timeout=timeout,
+        timecooldown=timecooldown,
+        max_num_retry=max_num_retry,
+        logger=logger,
+        debug_dump_path=debug_dump_path,
+        retry_policy=retry_policy,
+    )
+    return columns_to_jobs(columns=columns)
+
+
+def squeue_columns(
+    squeue_path="squeue",
+    jobname=None,
+    array=False,
+    timeout=None,
+    timecooldown=120.0,
+    max_num_retry=30,
+    logger=None,
+    debug_dump_path=None,
+    cache_ttl=None,
+    cache_dir=None,
+    job_ids=None,
+    retry_policy=None,
+):
+    """
+    Call slurm's squeue and only query the fields in SQUEUE_FIELDS.
+    Same parameters as squeue().
+
+    Parameters
+    ----------
+    cache_ttl : float or None
+        If not None, the stdout of squeue is shared with all other
+        processes of the user on this host for cache_ttl seconds, see
+        status_cache.StatusCache. The shared query is not restricted to
+        jobname and job_ids, the jobs are filtered after parsing.
+    cache_dir : str or None
+        Where the shared stdout is written, see status_cache.
+    job_ids : list of str or None
+        If not None, only these jobs are queried with 'squeue --jobs'.
+        Up to MAX_NUM_JOB_IDS_PER_SQUEUE ids are queried in one call.
+
+    Returns
+    -------
+    columns : dict of lists
+        One list of strings for each field in SQUEUE_FIELDS. The i-th job
+        is in the i-th element of each list.
     """
     if logger is None:
         logger = json_line_logger.LoggerStdout()
+    if retry_policy is None:
+        retry_policy = retrying.default_policy(
+            timecooldown=timecooldown, max_num_retry=max_num_retry
+        )
+
+    format = "|".join(SQUEUE_FIELDS.values())
+
+    def squeue_once(jobname, job_ids):
+        return _squeue_stdout(
+            squeue_path=squeue_path,
+            jobname=jobname,
+            array=array,
+            timeout=timeout,
+            logger=logger,
+            format=format,
+            job_ids=job_ids,
+        )
+
+    def call_squeue(jobname, job_ids):
+        return retry_policy.call(
+            func=lambda: squeue_once(jobname=jobname, job_ids=job_ids),
+            name="squeue",
+            logger=logger,
+        )
 
-    numtry = 0
-    while True:
-        utils.raise_if_too_often(
-            numtry=numtry, max_num_retry=max_num_retry, logger=logger
+    if cache_ttl is not None:
+        command = [squeue_path, "--me", "--format", format]
+        if array:
+            command += ["--array"]
+        cache = status_cache.shared(
+            command=command, ttl=cache_ttl, cache_dir=cache_dir
         )
+        # The retries wait outside of the cache's lock.
+        stdouts = [
+            retry_policy.call(
+                func=lambda: cache.get(
+                    refresh=lambda: squeue_once(jobname=None, job_ids=None),
+                    logger=logger,
+                ),
+                name="squeue",
+                logger=logger,
+            )
+        ]
+    elif job_ids is not None:
+        job_ids = list(job_ids)
+        stdouts = []
+        for start in range(0, len(job_ids), MAX_NUM_JOB_IDS_PER_SQUEUE):
+            stop = start + MAX_NUM_JOB_IDS_PER_SQUEUE
+            stdouts.append(
+                call_squeue(jobname=jobname, job_ids=job_ids[start:stop])
+            )
+    else:
+        stdouts = [call_squeue(jobname=jobname, job_ids=None)]
+
+    logger.debug("parsing stdout into columns")
+
+    columns = {key: [] for key in SQUEUE_FIELDS}
+    for stdout in stdouts:
+        if job_ids is not None and cache_ttl is None and not stdout.strip():
+            # squeue --jobs fails when none of the jobs is known anymore.
+            continue
         try:
-            numtry += 1
-            logger.debug("calling squeue, num. tries = {:d}".format(numtry))
-            stdout = _squeue_format_all_stdout(
-                squeue_path=squeue_path,
-                jobname=jobname,
-                array=array,
-                timeout=timeout,
+            part = _parse_stdout_columns(
+                stdout=stdout,
+                keys=list(SQUEUE_FIELDS.keys()),
+                delimiter="|",
                 logger=logger,
             )
-            break
-        except Exception as bad:
-            logger.warning("problem in _squeue_format_all_stdout()")
-            logger.warning(str(bad))
-            utils.random_sleep(timecooldown=timecooldown, logger=logger)
-
-    logger.debug("parsing stdout into list of dicts")
-
-    try:
-        list_of_dicts = _parse_stdout_format_all(
-            stdout=stdout,
-            delimiter="|",
-            logger=logger,
+        except Exception as err:
+            logger.critical("Can not parse squeue's stdout.")
+            if debug_dump_path:
+                utils.write(path=debug_dump_path, content=stdout, mode="t")
+                logger.critical("Dump stdout to {:s}.".format(debug_dump_path))
+            raise err
+        for key in columns:
+            columns[key] += part[key]
+
+    if cache_ttl is not None and (jobname is not None or job_ids is not None):
+        indices = _filter_columns(
+            columns=columns, jobname=jobname, job_ids=job_ids
         )
-        logger.debug("num. jobs in squeue = {:d}".format(len(list_of_dicts)))
-    except Exception as err:
-        logger.critical("Can not parse squeue's stdout.")
-        if debug_dump_path:
-            utils.write(path=debug_dump_path, content=stdout, mode="t")
-            logger.critical("Dump stdout to {:s}.".format(debug_dump_path))
-        raise err
+        columns = {
+            key: [column[i] for i in indices]
+            for key, column in columns.items()
+        }
 
-    return list_of_dicts
+    logger.debug("num. jobs in squeue = {:d}".format(len(columns["jobid"])))
+    return columns
+
+
+def _filter_columns(columns, jobname=None, job_ids=None):
+    """
+    Returns the indices of the jobs with jobname and one of the job_ids.
+    The job_id of an array element, e.g. '123_4', is '123'.
+    """
+    job_ids = None if job_ids is None else set(job_ids)
+    indices = []
+    for i in range(len(columns["jobid"])):
+        if jobname is not None and columns["name"][i] != jobname:
+            continue
+        if job_ids is not None:
+            if columns["jobid"][i].split("_")[0] not in job_ids:
+                continue
+        indices.append(i)
+    return indices
+
+
+def _parse_stdout_columns(stdout, keys, delimiter="|", logger=None):
+    """
+    Returns the columns of squeue's stdout which has a header line and one
+    line for each job. The columns are transposed in bulk and only the
+    columns in keys are kept.
+    """
+    if logger is None:
+        logger = json_line_logger.LoggerStdout()
+
+    lines = str.splitlines(stdout)
+    header = [str.lower(key) for key in str.split(lines[0], delimiter)]
+    num_keys = len(header)
+
+    rows = [str.split(line, delimiter) for line in lines[1:]]
+    num_lines = len(rows)
+    rows = [row for row in rows if len(row) == num_keys]
+    if len(rows) != num_lines:
+        logger.debug(
+            "{:d} lines have not expected num. of tokens".format(
+                num_lines - len(rows)
+            )
+        )
+
+    if len(rows) == 0:
+        transposed = [() for key in header]
+    else:
+        transposed = list(zip(*rows))
+
+    # When a key occurs twice in the header, the last one wins.
+    index = {key: i for i, key in enumerate(header)}
+    columns = {}
+    for key in keys:
+        columns[key] = list(transposed[index[key]])
+    return columns
+
+
+def columns_to_jobs(columns, indices=None):
+    """
+    Returns the jobs in columns as a list of dicts. When indices is given,
+    only the jobs with these indices are returned.
+    """
+    keys = list(columns.keys())
+    if len(keys) == 0:
+        return []
+    if indices is None:
+        indices = range(len(columns[keys[0]]))
+    return [{key: columns[key][i] for key in keys} for i in indices]
 
 
 def _parse_stdout_format_all(stdout, delimiter="|", logger=None):
@@ -274,19 +543,27 @@ def _parse_stdout_format_all(stdout, delimiter="|", logger=None):
     return out
 
 
-def _squeue_format_all_stdout(
-    squeue_path="squeue", jobname=None, array=False, timeout=None, logger=None
+def _squeue_stdout(
+    squeue_path="squeue",
+    jobname=None,
+    array=False,
+    timeout=None,
+    logger=None,
+    format="%all",
+    job_ids=None,
 ):
     if logger is None:
         logger = json_line_logger.LoggerStdout()
 
     cmd = [squeue_path]
     cmd += ["--me"]
-    cmd += ["--format", "%all"]
+    cmd += ["--format", format]
     if array:
         cmd += ["--array"]
     if jobname is not None:
         cmd += ["--name", jobname]
+    if job_ids is not None:
+        cmd += ["--jobs", ",".join(job_ids)]
 
     with tempfile.TemporaryDirectory(prefix="slurmpypoolurm") as tmp:
         tmp_stdout_path = os.path.join(tmp, "stdout.txt")
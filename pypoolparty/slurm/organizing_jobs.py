@@ -1,5 +1,30 @@
 import json_line_logger
 import json
+import re
+
+# according to 'man squeue'
+STATES_FOR_RESUBMISSION = [
+    "BOOT_FAIL",
+    "NODE_FAIL",
+    "OUT_OF_MEMORY",
+    "TIMEOUT",
+]
+
+REASONS_FOR_RESUBMISSION = [
+    "admin",
+    "err",
+    "bad",
+    "fail",
+    "halt",
+    "held",
+]
+
+_STATES_FOR_RESUBMISSION_RE = re.compile(
+    "|".join(STATES_FOR_RESUBMISSION), flags=re.IGNORECASE
+)
+_REASONS_FOR_RESUBMISSION_RE = re.compile(
+    "|".join(REASONS_FOR_RESUBMISSION), flags=re.IGNORECASE
+)
 
 
 def filter_jobs_by_jobnames(jobs, jobnames):
@@ -40,47 +65,21 @@ def split_jobs_in_running_pending_error(jobs, logger=None):
 
 
 def job_is_in_state_which_might_be_solved_by_resubmission(job, logger):
-    # according to 'sman squeue'
-    states_for_resubmission = [
-        "BOOT_FAIL",
-        "NODE_FAIL",
-        "OUT_OF_MEMORY",
-        "TIMEOUT",
-    ]
-
-    reasons_for_resubmission = [
-        "admin",
-        "err",
-        "bad",
-        "fail",
-        "halt",
-        "held",
-    ]
-
-    low = str.lower
     job_should_be_resubmitted = False
 
-    if any([low(e) in low(job["state"]) for e in states_for_resubmission]):
+    if state_might_be_solved_by_resubmission(job["state"]):
         job_should_be_resubmitted = True
         logger.info(
             "job '{:s}' has STATE '{:s}'.".format(job["name"], job["state"])
         )
 
-    if any([low(e) in low(job["reason"]) for e in reasons_for_resubmission]):
+    if reason_might_be_solved_by_resubmission(job["reason"]):
         job_should_be_resubmitted = True
         logger.info(
             "job '{:s}' has REASON '{:s}'.".format(job["name"], job["reason"])
         )
 
-    job_priority_indicates_resubmission = False
-    if str_can_be_converted_to_float(job["priority"]):
-        priority = float(job["priority"])
-        if priority == 0.0:
-            job_priority_indicates_resubmission = True
-    else:
-        job_priority_indicates_resubmission = True
-
-    if job_priority_indicates_resubmission:
+    if priority_might_be_solved_by_resubmission(job["priority"]):
         job_should_be_resubmitted = True
         logger.info(
             "job '{:s}' has PRIORITY '{:s}''.".format(
@@ -91,6 +90,103 @@ def job_is_in_state_which_might_be_solved_by_resubmission(job, logger):
     return job_should_be_resubmitted
 
 
+def state_might_be_solved_by_resubmission(state):
+    return _STATES_FOR_RESUBMISSION_RE.search(state) is not None
+
+
+def reason_might_be_solved_by_resubmission(reason):
+    return _REASONS_FOR_RESUBMISSION_RE.search(reason) is not None
+
+
+def priority_might_be_solved_by_resubmission(priority):
+    if str_can_be_converted_to_float(priority):
+        return float(priority) == 0.0
+    return True
+
+
+def classify(state, reason, priority):
+    """
+    Returns the class of a job: 'running', 'pending', 'error', or 'odd'.
+    Jobs in 'error' might profit from a resubmission.
+    """
+    resub_might_help = (
+        state_might_be_solved_by_resubmission(state)
+        or reason_might_be_solved_by_resubmission(reason)
+        or priority_might_be_solved_by_resubmission(priority)
+    )
+    if state == "RUNNING" or state == "COMPLETING":
+        return "running"
+    elif state == "PENDING" and not resub_might_help:
+        return "pending"
+    elif resub_might_help:
+        return "error"
+    else:
+        return "odd"
+
+
+def classify_columns(columns):
+    """
+    Returns the class of each job in the columns, see classify(). In a
+    large queue, most jobs share the same few combinations of state, reason,
+    and priority. Each combination is classified only once and the jobs
+    are classified in bulk by looking up their combination.
+
+    Parameters
+    ----------
+    columns : dict of lists
+        With the keys 'state', 'reason', and 'priority'.
+        See calling.squeue_columns().
+    """
+    combinations = list(
+        zip(columns["state"], columns["reason"], columns["priority"])
+    )
+    lookup = {}
+    for combination in set(combinations):
+        lookup[combination] = classify(*combination)
+    return list(map(lookup.__getitem__, combinations))
+
+
+def split_columns_in_running_pending_error(columns, indices=None, logger=None):
+    """
+    Returns the indices of the jobs in columns which are running, pending,
+    and in error. The jobs which are in none of these are logged as odd.
+
+    Parameters
+    ----------
+    columns : dict of lists
+        See calling.squeue_columns().
+    indices : list of int or None
+        If given, only the jobs with these indices are considered.
+    """
+    if logger is None:
+        logger = json_line_logger.LoggerStdout()
+
+    classes = classify_columns(columns=columns)
+    if indices is None:
+        indices = range(len(classes))
+
+    out = {"running": [], "pending": [], "error": [], "odd": []}
+    for i in indices:
+        out[classes[i]].append(i)
+
+    for i in out["error"]:
+        job = {key: columns[key][i] for key in columns}
+        logger.info(make_log_msg_simple_job_state(job=job))
+    for i in out["odd"]:
+        job = {key: columns[key][i] for key in columns}
+        logger.debug(make_log_msg_full_job_state(job=job))
+
+    return out["running"], out["pending"], out["error"]
+
+
+def filter_columns_by_jobnames(columns, jobnames):
+    """
+    Returns the indices of the jobs in columns with one of the jobnames.
+    """
+    jobnames = set(jobnames)
+    return [i for i, name in enumerate(columns["name"]) if name in jobnames]
+
+
 def str_can_be_converted_to_float(s):
     try:
         _ = float(s)
@@ -1,4 +1,5 @@
 #!/usr/bin/env python3
+import fcntl
 import argparse
 import json
 import datetime
@@ -10,11 +11,19 @@ parser.add_argument("--array", type=str, help="array options")
 parser.add_argument("--output", type=str, help="stdout path")
 parser.add_argument("--error", type=str, help="stderr path")
 parser.add_argument("--job-name", type=str, help="jobname")
+parser.add_argument(
+    "--parsable", action="store_true", help="print only the jobid"
+)
 parser.add_argument("script_args", nargs="*", default=None)
 args = parser.parse_args()
 
 queue_state_path = None  #  <- REQUIRED
 
+# Like the real scheduler, the dummy can be called concurrently. The lock on
+# the queue's state is held until the process exits.
+queue_state_lock = open(queue_state_path + ".lock", "a")
+fcntl.flock(queue_state_lock, fcntl.LOCK_EX)
+
 with open(queue_state_path, "rt") as f:
     state = json.loads(f.read())
 
@@ -66,6 +75,8 @@ if args.array is not None:
         )
         job["NAME"] = args.job_name
         job["ARRAY_TASK_ID"] = str(array_task_id)
+        if "num_simultaneously_running_tasks" in array:
+            job["_array_throttle"] = array["num_simultaneously_running_tasks"]
         job["_opath"] = (
             pypoolparty.slurm.array.utils.replace_array_task_id_format_with_integer_format(
                 fmt=args.output
@@ -99,4 +110,9 @@ else:
 with open(queue_state_path, "wt") as f:
     f.write(json.dumps(state, indent=4))
 
+if args.parsable:
+    print(jobid)
+else:
+    print("Submitted batch job {:s}".format(jobid))
+
 sys.exit(0)
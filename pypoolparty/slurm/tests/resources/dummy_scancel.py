@@ -1,4 +1,5 @@
 #!/usr/bin/env python3
+import fcntl
 import sys
 import argparse
 import json
@@ -14,36 +15,55 @@ args = parser.parse_args()
 
 queue_state_path = None  #  <- REQUIRED
 
+# Like the real scheduler, the dummy can be called concurrently. The lock on
+# the queue's state is held until the process exits.
+queue_state_lock = open(queue_state_path + ".lock", "a")
+fcntl.flock(queue_state_lock, fcntl.LOCK_EX)
+
 if args.jobid and not args.name:
-    assert len(args.jobid) == 1
     match_key = "JOBID"
-    match = args.jobid[0]
-elif args.name and not agrs.jobid:
+    matches = []
+    for jobid in args.jobid:
+        # e.g. '123_[5-9,11]' for the elements of a job-array
+        if jobid.endswith("]"):
+            job_id, array_task_ids = jobid[:-1].split("_[")
+            for r in pypoolparty.slurm.array.ranges.parse(array_task_ids):
+                for array_task_id in r:
+                    matches.append("{:s}_{:d}".format(job_id, array_task_id))
+        else:
+            matches.append(jobid)
+elif args.name and not args.jobid:
     match_key = "NAME"
-    match = args.name
+    matches = [args.name]
 else:
     raise AssertionError("Either jobid or name. But not both.")
 
 with open(queue_state_path, "rt") as f:
     old_state = json.loads(f.read())
 
-found = False
+found = set()
 state = {
     "jobs": [],
     "evil_jobs": old_state["evil_jobs"],
 }
 
 for job in old_state["jobs"]:
-    if job[match_key] == match:
-        found = True
+    if job[match_key] in matches:
+        found.add(job[match_key])
     else:
         state["jobs"].append(job)
 
 with open(queue_state_path, "wt") as f:
     f.write(json.dumps(state, indent=4))
 
-if found == True:
+not_found = [match for match in matches if match not in found]
+for match in not_found:
+    print(
+        "scancel: error: Kill job error on job id {:s}: "
+        "Invalid job id specified".format(match)
+    )
+
+if len(not_found) == 0:
     sys.exit(0)
 else:
-    print("Can not find {:s}: {:s}".format(match_key, match))
     sys.exit(1)
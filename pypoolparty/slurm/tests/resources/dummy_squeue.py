@@ -1,4 +1,5 @@
 #!/usr/bin/env python3
+import fcntl
 import sys
 import argparse
 import re
@@ -27,10 +28,18 @@ parser.add_argument(
 parser.add_argument(
     "--name", metavar="JOB_NAME", type=str, required=False, default=""
 )
+parser.add_argument(
+    "--jobs", metavar="JOB_ID_LIST", type=str, required=False, default=None
+)
 args = parser.parse_args()
 
 queue_state_path = None  #  <- REQUIRED
 
+# Like the real scheduler, the dummy can be called concurrently. The lock on
+# the queue's state is held until the process exits.
+queue_state_lock = open(queue_state_path + ".lock", "a")
+fcntl.flock(queue_state_lock, fcntl.LOCK_EX)
+
 
 def eprint(*args, **kwargs):
     print(*args, file=sys.stderr, **kwargs)
@@ -54,10 +63,68 @@ def job_to_line(job, delimiter="|"):
     return line
 
 
-def state_to_table(state):
+def is_array_element(job):
+    return "_" in job["JOBID"]
+
+
+def job_is_compact(job):
+    # Like slurm, the pending elements of an array share a single line
+    # until an element gets a record of its own, e.g. when it is requeued.
+    return (
+        is_array_element(job)
+        and job["STATE"] == "PENDING"
+        and not job.get("_requeued", False)
+    )
+
+
+def compact_jobs(jobs):
+    groups = {}
+    for job in jobs:
+        job_id, _ = (
+            pypoolparty.slurm.array.utils.split_job_id_and_array_task_id(
+                job["JOBID"]
+            )
+        )
+        key = (job_id, job["NAME"], job["REASON"], job["PRIORITY"])
+        groups.setdefault(key, []).append(job)
+
+    out = []
+    for (job_id, _, _, _), elements in groups.items():
+        ranges = pypoolparty.slurm.array.ranges.compress(
+            [element["ARRAY_TASK_ID"] for element in elements]
+        )
+        array_task_id = pypoolparty.slurm.array.ranges.to_str(ranges)
+        if elements[0].get("_array_throttle"):
+            array_task_id += "%{:d}".format(elements[0]["_array_throttle"])
+        job = dict(elements[0])
+        job["JOBID"] = "{:s}_[{:s}]".format(job_id, array_task_id)
+        job["ARRAY_TASK_ID"] = array_task_id
+        out.append(job)
+    return out
+
+
+def job_is_selected(job):
+    if args.name and job["NAME"] != args.name:
+        return False
+    if args.jobs is not None:
+        job_id = job["JOBID"].split("_")[0]
+        if job_id not in args.jobs.split(","):
+            return False
+    return True
+
+
+def state_to_table(state, expand_array):
     lines = []
     lines.append(job_head_to_line())
+    compact = []
     for job in state["jobs"]:
+        if not job_is_selected(job):
+            continue
+        if not expand_array and job_is_compact(job):
+            compact.append(job)
+        else:
+            lines.append(job_to_line(job=job))
+    for job in compact_jobs(compact):
         lines.append(job_to_line(job=job))
     return str.join("\n", lines)
 
@@ -69,14 +136,12 @@ with open(queue_state_path, "rt") as f:
 
 evil_ids_num_fails = {}
 evil_ids_max_num_fails = {}
+array_evil_ids = set()
 for evil in state["evil_jobs"]:
     if "array_task_id" in evil:
         evil_id = evil["array_task_id"]
+        array_evil_ids.add(evil_id)
     elif "ichunk" in evil:
-        assert not args.array, (
-            "Expected evil jobs to identify using 'array_task_id'"
-            "in case of squeue --array is called."
-        )
         evil_id = evil["ichunk"]
     else:
         raise ValueError(
@@ -111,7 +176,7 @@ elif count_jobs(jobs=state["jobs"], state="PENDING") > 0:
 
     # identify evil
     # -------------
-    if args.array:
+    if is_array_element(job):
         (
             _,
             evil_id,
@@ -127,6 +192,7 @@ elif count_jobs(jobs=state["jobs"], state="PENDING") > 0:
         if evil_ids_num_fails[evil_id] < evil_ids_max_num_fails[evil_id]:
             job["STATE"] = "PENDING"
             job["REASON"] = "err"
+            job["_requeued"] = True
             state["jobs"].append(job)
             evil_ids_num_fails[evil_id] += 1
         else:
@@ -145,7 +211,7 @@ for evil_id in evil_ids_num_fails:
     evil_job = {}
     evil_job["num_fails"] = evil_ids_num_fails[evil_id]
     evil_job["max_num_fails"] = evil_ids_max_num_fails[evil_id]
-    if args.array:
+    if evil_id in array_evil_ids:
         evil_job["array_task_id"] = evil_id
     else:
         evil_job["ichunk"] = evil_id
@@ -157,7 +223,7 @@ state["evil_jobs"] = evil_jobs
 with open(queue_state_path, "wt") as f:
     f.write(json.dumps(state, indent=4))
 
-out_table = state_to_table(state)
+out_table = state_to_table(state, expand_array=args.array)
 print(out_table)
 
 sys.exit(0)
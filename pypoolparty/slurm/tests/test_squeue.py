@@ -1,6 +1,8 @@
 import pypoolparty
 import importlib
 import os
+import json
+import tempfile
 
 
 def test_parse_squeue():
@@ -21,3 +23,127 @@ def test_parse_squeue():
     print(d[18])
 
     assert len(d) == 231
+
+
+def test_parse_squeue_into_columns_and_classify():
+    pypoolparty_dir = pypoolparty.utils.resources_path()
+    stdout_path = os.path.join(
+        pypoolparty_dir,
+        "slurm",
+        "tests",
+        "resources",
+        "squeue_format_all.stdout",
+    )
+
+    with open(stdout_path) as f:
+        o = f.read()
+
+    keys = list(pypoolparty.slurm.calling.SQUEUE_FIELDS.keys())
+    columns = pypoolparty.slurm.calling._parse_stdout_columns(o, keys=keys)
+    jobs = pypoolparty.slurm.calling._parse_stdout_format_all(o)
+    assert len(columns["jobid"]) == len(jobs)
+    for key in keys:
+        assert columns[key] == [job[key] for job in jobs]
+
+    oj = pypoolparty.slurm.organizing_jobs
+    running, pending, error = oj.split_columns_in_running_pending_error(
+        columns=columns
+    )
+    expected = oj.split_jobs_in_running_pending_error(jobs=jobs)
+    for indices, expected_jobs in zip([running, pending, error], expected):
+        assert pypoolparty.slurm.calling.columns_to_jobs(
+            columns=columns, indices=indices
+        ) == [{key: job[key] for key in keys} for job in expected_jobs]
+    assert len(running) > 0
+    assert len(pending) > 0
+
+
+def test_parse_squeue_columns_without_jobs():
+    columns = pypoolparty.slurm.calling._parse_stdout_columns(
+        "NAME|JOBID|STATE\n", keys=["jobid", "name"]
+    )
+    assert columns == {"jobid": [], "name": []}
+    assert pypoolparty.slurm.calling.columns_to_jobs(columns) == []
+
+
+def test_squeue_columns_with_status_cache():
+    with tempfile.TemporaryDirectory(prefix="pypoolparty") as tmp:
+        qpaths = pypoolparty.slurm.testing.dummy_init(path=tmp)
+        pypoolparty.testing.dummy_init_queue_state(path=qpaths["queue_state"])
+        with open(qpaths["queue_state"], "rt") as f:
+            state = json.loads(f.read())
+        for name in ["abc#000000000", "abc#000000001"]:
+            state["jobs"].append(
+                {
+                    "NAME": name,
+                    "JOBID": str(len(state["jobs"])),
+                    "STATE": "PENDING",
+                    "REASON": "foobar",
+                    "PRIORITY": "0.999",
+                    "ARRAY_TASK_ID": "N/A",
+                }
+            )
+        with open(qpaths["queue_state"], "wt") as f:
+            f.write(json.dumps(state))
+
+        kwargs = {
+            "squeue_path": qpaths["squeue"],
+            "cache_ttl": 60.0,
+            "cache_dir": os.path.join(tmp, "cache"),
+        }
+        # the dummy starts one pending job on each call
+        a = pypoolparty.slurm.calling.squeue_columns(
+            jobname="abc#000000000", **kwargs
+        )
+        assert a["name"] == ["abc#000000000"]
+        assert a["state"] == ["RUNNING"]
+
+        # the cached snapshot is shared and filtered by jobname
+        x = pypoolparty.slurm.calling.squeue_columns(
+            jobname="abc#000000001", **kwargs
+        )
+        assert x["name"] == ["abc#000000001"]
+        assert x["state"] == ["PENDING"]
+
+
+def test_parse_sbatch_parsable_stdout():
+    parse = pypoolparty.slurm.calling._parse_sbatch_parsable_stdout
+    assert parse("123456\n") == "123456"
+    assert parse("123456;cluster_a\n") == "123456"
+    assert parse("sbatch: warning: foo\n123456\n") == "123456"
+    assert parse("Submitted batch job 123456\n") is None
+
+
+def test_squeue_columns_with_job_ids(monkeypatch):
+    with tempfile.TemporaryDirectory(prefix="pypoolparty") as tmp:
+        qpaths = pypoolparty.slurm.testing.dummy_init(path=tmp)
+        pypoolparty.testing.dummy_init_queue_state(path=qpaths["queue_state"])
+        with open(qpaths["queue_state"], "rt") as f:
+            state = json.loads(f.read())
+        for i in range(5):
+            state["jobs"].append(
+                {
+                    "NAME": "abc#{:09d}".format(i),
+                    "JOBID": str(100 + i),
+                    "STATE": "PENDING",
+                    "REASON": "foobar",
+                    "PRIORITY": "0.999",
+                    "ARRAY_TASK_ID": "N/A",
+                }
+            )
+        with open(qpaths["queue_state"], "wt") as f:
+            f.write(json.dumps(state))
+
+        # squeue --jobs is called in batches of job_ids
+        monkeypatch.setattr(
+            pypoolparty.slurm.calling, "MAX_NUM_JOB_IDS_PER_SQUEUE", 2
+        )
+        columns = pypoolparty.slurm.calling.squeue_columns(
+            squeue_path=qpaths["squeue"], job_ids=["101", "103", "104", "7"]
+        )
+        assert sorted(columns["jobid"]) == ["101", "103", "104"]
+
+        columns = pypoolparty.slurm.calling.squeue_columns(
+            squeue_path=qpaths["squeue"], job_ids=[]
+        )
+        assert columns["jobid"] == []
@@ -0,0 +1,146 @@
+"""
+Staging the chunks of tasks, i.e. writing them into the work_dir and
+submitting them as jobs, is done in a pipeline. The chunks are written by a
+pool of threads, and each chunk is submitted as soon as its file is on disk.
+So the first jobs are already in the queue while later chunks are still
+being written. The submissions themselves run concurrently and rate limited,
+see submitting.Submitter.
+"""
+
+import concurrent.futures
+from . import pooling
+from . import submitting
+
+
+def write_and_submit_chunks(
+    work_dir,
+    tasks,
+    chunks,
+    session_id,
+    submit,
+    num_threads=4,
+    max_num_chunks_in_flight=None,
+    oob_pickle=False,
+    logger=None,
+    num_submit_threads=1,
+    max_submit_rate=None,
+):
+    """
+    Writes the chunks of tasks into the work_dir and submits each chunk as
+    soon as it is written.
+
+    Parameters
+    ----------
+    work_dir : str
+        Path to the session's work_dir.
+    tasks : list
+        The tasks.
+    chunks : list of lists
+        The indices of the tasks in each chunk.
+    session_id : str
+        To make the jobnames.
+    submit : function
+        Called as submit(jobname=jobname, ichunk=ichunk) for each chunk
+        after its file was written. It is called from num_submit_threads
+        threads at the same time.
+    num_threads : int
+        Number of threads writing the chunks.
+    max_num_chunks_in_flight : int or None
+        Up to this many chunks are being written, or are written and wait
+        for their submission to return, at a time. This bounds the memory
+        and keeps the writers only a few chunks ahead of the submissions.
+        Default is four times num_threads.
+    oob_pickle : bool
+        Pickle the chunks with out-of-band buffers. See oob_pickle.
+    logger : logging.Logger or None
+        Logs the progress and the throughput of the submissions.
+    num_submit_threads : int
+        Up to this many chunks are submitted at the same time.
+    max_submit_rate : float or None
+        Up to this many submissions are started per second. None means no
+        limit.
+
+    Returns
+    -------
+    jobnames_in_session : set
+        The jobnames of all submitted chunks.
+
+    Raises
+    ------
+    The first exception raised while writing or submitting a chunk.
+    The chunks not yet written are not written anymore, but the chunks
+    already submitted stay submitted.
+    """
+    num_threads = int(num_threads)
+    assert num_threads > 0
+    if max_num_chunks_in_flight is None:
+        max_num_chunks_in_flight = 4 * num_threads
+    max_num_chunks_in_flight = int(max_num_chunks_in_flight)
+    assert max_num_chunks_in_flight > 0
+
+    jobnames_in_session = set()
+    ichunks = iter(range(len(chunks)))
+    all_chunks_started = False
+    in_flight = {}
+    submissions = set()
+    submitter = submitting.Submitter(
+        submit=submit,
+        num_threads=num_submit_threads,
+        max_rate=max_submit_rate,
+        logger=logger,
+    )
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=num_threads) as ex:
+        try:
+            while True:
+                while (
+                    len(in_flight) + len(submissions)
+                    < max_num_chunks_in_flight
+                ):
+                    ichunk = next(ichunks, None)
+                    if ichunk is None:
+                        all_chunks_started = True
+                        break
+                    future = ex.submit(
+                        pooling.write_chunk_into_work_dir,
+                        work_dir=work_dir,
+                        tasks=tasks,
+                        chunk=chunks[ichunk],
+                        ichunk=ichunk,
+                        session_id=session_id,
+                        oob_pickle=oob_pickle,
+                    )
+                    in_flight[future] = ichunk
+
+                if len(in_flight) == 0 and all_chunks_started:
+                    break
+
+                done, _ = concurrent.futures.wait(
+                    set(in_flight) | submissions,
+                    return_when=concurrent.futures.FIRST_COMPLETED,
+                )
+                written = [future for future in done if future in in_flight]
+                for future in sorted(written, key=lambda f: in_flight[f]):
+                    ichunk = in_flight.pop(future)
+                    jobname = future.result()
+                    submissions.add(
+                        submitter.submit(jobname=jobname, ichunk=ichunk)
+                    )
+                    jobnames_in_session.add(jobname)
+                submissions = {f for f in submissions if not f.done()}
+                submitter.raise_if_failed()
+
+            submitter.wait()
+        except BaseException:
+            for future in in_flight:
+                future.cancel()
+            submitter.close()
+            raise
+
+    if logger:
+        logger.debug(
+            "Written and submitted {:d} chunks.".format(
+                len(jobnames_in_session)
+            )
+        )
+    return jobnames_in_session
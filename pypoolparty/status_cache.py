@@ -0,0 +1,180 @@
+"""
+A snapshot of the scheduler's queue which is shared by all the pools of a
+user on a host.
+
+When many pools run on the same login-node, each one polls squeue or qstat
+on its own. With a StatusCache, the stdout of the query is kept in a file
+together with the time it was taken. A pool reads the snapshot as long as it
+is younger than the ttl. Only when it is older, the pool takes an exclusive
+fcntl lock and queries the scheduler again. The other pools wait for the
+lock and then read the new snapshot, so at most one query is in flight.
+The lock is only held for a single query. When it fails, the lock is
+released and the caller retries get() as a whole, so that the other pools
+do not wait for all the retries.
+"""
+
+import fcntl
+import hashlib
+import json
+import os
+import tempfile
+import time
+
+_SHARED = {}
+
+
+def default_cache_dir():
+    return os.path.join(
+        tempfile.gettempdir(),
+        "pypoolparty-status-cache-{:d}".format(os.getuid()),
+    )
+
+
+def shared(command, ttl, cache_dir=None):
+    """
+    Returns the StatusCache of the command. Within a process, the same
+    instance is returned for the same command so that its statistics add up.
+    """
+    cache = StatusCache(command=command, ttl=ttl, cache_dir=cache_dir)
+    if cache.path not in _SHARED:
+        _SHARED[cache.path] = cache
+    _SHARED[cache.path].ttl = cache.ttl
+    return _SHARED[cache.path]
+
+
+class StatusCache:
+    def __init__(self, command, ttl, cache_dir=None):
+        """
+        Parameters
+        ----------
+        command : list of str
+            The query of the scheduler, e.g. ['squeue', '--me', ...]. All
+            pools with the same command share the snapshot.
+        ttl : float
+            The time in seconds a snapshot is fresh.
+        cache_dir : str or None
+            Where the snapshots are written. Default is a directory of the
+            user in the host's tempdir.
+        """
+        self.command = [str(token) for token in command]
+        self.ttl = float(ttl)
+        assert self.ttl >= 0.0
+        self.cache_dir = (
+            default_cache_dir() if cache_dir is None else cache_dir
+        )
+
+        key = hashlib.sha1(json.dumps(self.command).encode()).hexdigest()
+        self.name = os.path.basename(self.command[0])
+        self.path = os.path.join(
+            self.cache_dir, "{:s}.{:s}.json".format(self.name, key[0:16])
+        )
+        self.lock_path = self.path + ".lock"
+
+        self.num_hits = 0
+        self.num_misses = 0
+        self.num_waits = 0
+
+    def get(self, refresh, logger=None):
+        """
+        Returns the stdout of the command. When the snapshot is not fresh,
+        refresh() is called to query the scheduler and its return value is
+        the new snapshot.
+
+        Parameters
+        ----------
+        refresh : callable
+            Returns the stdout (str) of the command. It is called at most
+            once and while the lock is held, so it should make a single
+            attempt. Its exception is raised.
+        logger : logging.Logger or None
+            Hits and misses are logged in debug.
+        """
+        snapshot = self._read()
+        if self._is_fresh(snapshot):
+            return self._hit(snapshot, logger=logger, waited=False)
+
+        _makedirs_private(self.cache_dir)
+        with open(self.lock_path, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                # An other process might have refreshed while we waited.
+                snapshot = self._read()
+                if self._is_fresh(snapshot):
+                    return self._hit(snapshot, logger=logger, waited=True)
+
+                stdout = refresh()
+                snapshot = {
+                    "time": time.time(),
+                    "command": self.command,
+                    "stdout": stdout,
+                }
+                with open(self.path + ".part", "wt") as f:
+                    f.write(json.dumps(snapshot))
+                os.rename(self.path + ".part", self.path)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+        self.num_misses += 1
+        self._log("miss", age=0.0, logger=logger)
+        return snapshot["stdout"]
+
+    def statistics(self):
+        return {
+            "hits": self.num_hits,
+            "misses": self.num_misses,
+            "waits": self.num_waits,
+        }
+
+    def _read(self):
+        try:
+            with open(self.path, "rt") as f:
+                snapshot = json.loads(f.read())
+        except (FileNotFoundError, ValueError):
+            return None
+        if snapshot.get("command") != self.command:
+            return None
+        return snapshot
+
+    def _is_fresh(self, snapshot):
+        if snapshot is None:
+            return False
+        age = time.time() - snapshot["time"]
+        return 0.0 <= age < self.ttl
+
+    def _hit(self, snapshot, logger, waited):
+        self.num_hits += 1
+        if waited:
+            self.num_waits += 1
+        self._log(
+            "hit after waiting" if waited else "hit",
+            age=time.time() - snapshot["time"],
+            logger=logger,
+        )
+        return snapshot["stdout"]
+
+    def _log(self, decision, age, logger):
+        if logger is None:
+            return
+        logger.debug(
+            "Status cache {:s}: {:s}, age {:.3f}s, "
+            "{:d} hits ({:d} after waiting), {:d} misses".format(
+                self.name,
+                decision,
+                age,
+                self.num_hits,
+                self.num_waits,
+                self.num_misses,
+            )
+        )
+
+    def __repr__(self):
+        return "{:s}(path={:s}, ttl={:f})".format(
+            self.__class__.__name__, repr(self.path), self.ttl
+        )
+
+
+def _makedirs_private(path):
+    os.makedirs(path, mode=0o700, exist_ok=True)
+    assert (
+        os.stat(path).st_uid == os.getuid()
+    ), "Expected the status cache '{:s}' to belong to the user.".format(path)
@@ -0,0 +1,166 @@
+"""
+The submission of the jobs, e.g. the calls of sbatch or qsub.
+
+Each submission is a blocking call of the scheduler which takes between a
+fraction of a second and a few seconds. A Submitter runs up to num_threads
+of them at the same time, and its RateLimiter keeps the start of the calls
+below max_rate per second so that the scheduler is not flooded. Each call
+keeps its own retries, see retrying. The throughput is logged when all
+jobs are submitted.
+"""
+
+import concurrent.futures
+import threading
+import time
+
+
+class RateLimiter:
+    def __init__(self, max_rate=None):
+        """
+        Parameters
+        ----------
+        max_rate : float or None
+            Up to this many calls are started per second. None means no
+            limit.
+        """
+        self.max_rate = None if max_rate is None else float(max_rate)
+        if self.max_rate is not None:
+            assert self.max_rate > 0.0
+        self.next_slot = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """
+        Blocks until the caller may start its call.
+        """
+        if self.max_rate is None:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self.next_slot)
+            self.next_slot = slot + 1.0 / self.max_rate
+        time.sleep(slot - now)
+
+    def __repr__(self):
+        return "{:s}(max_rate={:s})".format(
+            self.__class__.__name__, str(self.max_rate)
+        )
+
+
+class Submitter:
+    def __init__(self, submit, num_threads=1, max_rate=None, logger=None):
+        """
+        Parameters
+        ----------
+        submit : function
+            Called as submit(**kwargs) for each job, see submit().
+        num_threads : int
+            Up to this many calls of submit run at the same time.
+        max_rate : float or None
+            Up to this many calls of submit are started per second. None
+            means no limit.
+        logger : logging.Logger or None
+            The throughput is logged.
+        """
+        self._submit = submit
+        self.num_threads = int(num_threads)
+        assert self.num_threads > 0
+        self.rate_limiter = RateLimiter(max_rate=max_rate)
+        self.logger = logger
+
+        self.num_submitted = 0
+        self.latency_sum = 0.0
+        self.latency_max = 0.0
+        self.start = None
+        self.stop = None
+        self._futures = []
+        self._lock = threading.Lock()
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=self.num_threads
+        )
+
+    def submit(self, **kwargs):
+        """
+        Queues the call submit(**kwargs) and returns its future.
+        """
+        if self.start is None:
+            self.start = time.monotonic()
+        future = self._executor.submit(self._call, kwargs)
+        self._futures.append(future)
+        return future
+
+    def _call(self, kwargs):
+        self.rate_limiter.acquire()
+        start = time.monotonic()
+        out = self._submit(**kwargs)
+        latency = time.monotonic() - start
+        with self._lock:
+            self.num_submitted += 1
+            self.latency_sum += latency
+            self.latency_max = max(self.latency_max, latency)
+            self.stop = time.monotonic()
+        return out
+
+    def raise_if_failed(self):
+        """
+        Raises the exception of the first call which failed so far.
+        """
+        for future in self._futures:
+            if future.done() and future.exception() is not None:
+                raise future.exception()
+        self._futures = [f for f in self._futures if not f.done()]
+
+    def wait(self):
+        """
+        Waits for all the calls and logs the throughput.
+
+        Raises
+        ------
+        The exception of the first call which failed. The calls which did
+        not start yet are not made anymore.
+        """
+        try:
+            for future in self._futures:
+                future.result()
+        finally:
+            self.close()
+        self._futures = []
+        self._log()
+
+    def close(self):
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def statistics(self):
+        duration = 0.0
+        if self.start is not None and self.stop is not None:
+            duration = self.stop - self.start
+        return {
+            "num_submitted": self.num_submitted,
+            "duration": duration,
+            "rate": self.num_submitted / duration if duration > 0 else 0.0,
+            "latency_mean": self.latency_sum / max(1, self.num_submitted),
+            "latency_max": self.latency_max,
+        }
+
+    def _log(self):
+        if self.logger is None:
+            return
+        s = self.statistics()
+        self.logger.info(
+            "Submitted {:d} jobs in {:.3f}s, {:.2f} jobs/s, "
+            "mean latency {:.3f}s, max latency {:.3f}s, "
+            "{:d} threads, max rate {:s}".format(
+                s["num_submitted"],
+                s["duration"],
+                s["rate"],
+                s["latency_mean"],
+                s["latency_max"],
+                self.num_threads,
+                str(self.rate_limiter.max_rate),
+            )
+        )
+
+    def __repr__(self):
+        return "{:s}(num_threads={:d})".format(
+            self.__class__.__name__, self.num_threads
+        )
@@ -3,6 +3,7 @@ from . import calling
 from . import organizing_jobs
 from .. import proto_pool
 from .. import utils
+from .. import retrying
 
 
 @utils.add_doc(
@@ -15,6 +16,14 @@ from .. import utils
             Path to the 'qstat' executable used to query the state of jobs.
         qdel_path : str
             Path to the 'qdel' executable used to delete/remove jobs.
+        status_cache_ttl : float or None
+            If not None, the status of the queue is shared with all other
+            pools of the user on this host for this many seconds, so that
+            only one of them calls 'qstat' at a time. See status_cache.
+        retry_policy : retrying.RetryPolicy or None
+            How the failed calls of the scheduler are retried. All the calls
+            of the pool share the policy and its circuit breaker. Default is
+            retrying.RetryPolicy().
     """
     + proto_pool._doc_retrun_statement()
 )
@@ -22,10 +31,24 @@ def Pool(
     num_chunks=None,
     python_path=None,
     polling_interval=5.0,
+    max_polling_interval=None,
+    reduction_interval=None,
+    max_reduction_interval=None,
     work_dir=None,
     keep_work_dir=False,
     max_num_resubmissions=10,
     verbose=False,
+    oob_pickle=False,
+    num_staging_threads=4,
+    max_num_chunks_in_flight=None,
+    num_cores_per_job=1,
+    task_timeout=None,
+    task_max_memory=None,
+    watch_work_dir=False,
+    environ_allowlist=None,
+    environ_denylist=None,
+    num_submit_threads=4,
+    max_submit_rate=None,
     # sge specific
     # ------------
     qsub_path="qsub",
@@ -33,7 +56,12 @@ def Pool(
     qstat_path="qstat",
     error_state_indicator="E",
     qdel_path="qdel",
+    status_cache_ttl=None,
+    retry_policy=None,
 ):
+    if retry_policy is None:
+        retry_policy = retrying.RetryPolicy()
+
     if python_path is None:
         python_path = utils.default_python_path()
 
@@ -41,23 +69,44 @@ def Pool(
         num_chunks=num_chunks,
         python_path=python_path,
         polling_interval=polling_interval,
+        max_polling_interval=max_polling_interval,
+        reduction_interval=reduction_interval,
+        max_reduction_interval=max_reduction_interval,
         work_dir=work_dir,
         keep_work_dir=keep_work_dir,
         max_num_resubmissions=max_num_resubmissions,
         verbose=verbose,
+        oob_pickle=oob_pickle,
+        num_staging_threads=num_staging_threads,
+        max_num_chunks_in_flight=max_num_chunks_in_flight,
+        num_cores_per_job=num_cores_per_job,
+        task_timeout=task_timeout,
+        task_max_memory=task_max_memory,
+        watch_work_dir=watch_work_dir,
+        environ_allowlist=environ_allowlist,
+        environ_denylist=environ_denylist,
+        num_submit_threads=num_submit_threads,
+        max_submit_rate=max_submit_rate,
         submit_func=submit,
         submit_func_kwargs={
             "qsub_path": qsub_path,
             "queue_name": queue_name,
             "script_exe_path": python_path,
+            "retry_policy": retry_policy,
         },
         status_func=status,
         status_func_kwargs={
             "qstat_path": qstat_path,
             "error_state_indicator": error_state_indicator,
+            "status_cache_ttl": status_cache_ttl,
+            "retry_policy": retry_policy,
         },
         delete_func=delete,
-        delete_func_kwargs={"qdel_path": qdel_path},
+        delete_many_func=delete_many,
+        delete_func_kwargs={
+            "qdel_path": qdel_path,
+            "retry_policy": retry_policy,
+        },
     )
 
 
@@ -73,6 +122,7 @@ def submit(
     qsub_path,
     queue_name,
     script_exe_path,
+    retry_policy=None,
 ):
     return calling.qsub(
         qsub_path=qsub_path,
@@ -84,6 +134,7 @@ def submit(
         stdout_path=stdout_path,
         stderr_path=stderr_path,
         logger=logger,
+        retry_policy=retry_policy,
     )
 
 
@@ -94,16 +145,24 @@ def status(
     # ------------
     qstat_path,
     error_state_indicator,
+    status_cache_ttl=None,
+    job_ids=None,
+    retry_policy=None,
 ):
+    # 'qstat -j' only reports details but not the states of the jobs. So
+    # the listing of qstat is filtered for the job_ids.
     all_jobs_running, all_jobs_pending = calling.qstat(
         qstat_path=qstat_path,
         logger=logger,
+        cache_ttl=status_cache_ttl,
+        retry_policy=retry_policy,
     )
     running, pending, error = organizing_jobs.get_jobs_running_pending_error(
         JB_names_set=jobnames,
         all_jobs_running=all_jobs_running,
         all_jobs_pending=all_jobs_pending,
         error_state_indicator=error_state_indicator,
+        JB_job_numbers_set=None if job_ids is None else set(job_ids),
     )
     out = {
         "running": [],
@@ -125,11 +184,29 @@ def delete(
     # sge specific
     # ------------
     qdel_path,
+    retry_policy=None,
 ):
     return calling.qdel(
         JB_job_number=job["JB_job_number"],
         qdel_path=qdel_path,
         logger=logger,
+        retry_policy=retry_policy,
+    )
+
+
+def delete_many(
+    jobs,
+    logger,
+    # sge specific
+    # ------------
+    qdel_path,
+    retry_policy=None,
+):
+    return calling.qdel_many(
+        JB_job_numbers=[job["JB_job_number"] for job in jobs],
+        qdel_path=qdel_path,
+        logger=logger,
+        retry_policy=retry_policy,
     )
 
 
@@ -1,6 +1,10 @@
 import subprocess
+import json
+import re
 import qstat as external_qstat_call
-import time
+from .. import status_cache
+from .. import utils
+from .. import retrying
 
 
 def qsub(
@@ -13,7 +17,11 @@ def qsub(
     stdout_path,
     stderr_path,
     logger,
+    retry_policy=None,
 ):
+    if retry_policy is None:
+        retry_policy = retrying.RetryPolicy()
+
     cmd = [qsub_path]
     if queue_name:
         cmd += ["-q", queue_name]
@@ -25,15 +33,38 @@ def qsub(
     for argument in arguments:
         cmd += [argument]
 
+    stdout = retry_policy.call(
+        func=lambda: _qsub(cmd=cmd, logger=logger),
+        name="qsub",
+        logger=logger,
+    )
+
+    JB_job_number = _parse_qsub_stdout(stdout.decode())
+    if JB_job_number is None:
+        logger.warning("Can not find JB_job_number in stdout of qsub.")
+    return JB_job_number
+
+
+def _qsub(cmd, logger):
     try:
-        subprocess.check_output(cmd, stderr=subprocess.STDOUT)
+        return subprocess.check_output(cmd, stderr=subprocess.STDOUT)
     except subprocess.CalledProcessError as e:
-        logger.critical("Error in qsub()")
-        logger.critical("qsub() returncode: {:d}".format(e.returncode))
-        logger.critical(e.output)
+        logger.warning("qsub returncode: {:d}".format(e.returncode))
+        logger.warning("qsub stdout: {:s}".format(e.output.decode()))
         raise
 
 
+def _parse_qsub_stdout(stdout):
+    """
+    Returns the JB_job_number in the stdout of qsub, e.g.
+    'Your job 123456 ("name") has been submitted', or None.
+    """
+    match = re.search(r"Your job(?:-array)? (\d+)", stdout)
+    if match is None:
+        return None
+    return match.group(1)
+
+
 def _qdel(JB_job_number, qdel_path, logger):
     try:
         _ = subprocess.check_output(
@@ -41,38 +72,89 @@ def _qdel(JB_job_number, qdel_path, logger):
             stderr=subprocess.STDOUT,
         )
     except subprocess.CalledProcessError as e:
-        logger.critical("qdel returncode: {:s}".format(e.returncode))
-        logger.critical("qdel stdout: {:s}".format(e.output))
+        logger.warning("qdel returncode: {:d}".format(e.returncode))
+        logger.warning("qdel stdout: {:s}".format(e.output.decode()))
         raise
 
 
-def qdel(JB_job_number, qdel_path, logger):
-    while True:
-        try:
-            _qdel(JB_job_number, qdel_path, logger=logger)
-            break
-        except KeyboardInterrupt:
-            raise
-        except Exception as bad:
-            logger.warning("Problem in qdel()")
-            logger.warning(str(bad))
-            time.sleep(1)
+def qdel(JB_job_number, qdel_path, logger, retry_policy=None):
+    if retry_policy is None:
+        retry_policy = retrying.RetryPolicy()
+    retry_policy.call(
+        func=lambda: _qdel(JB_job_number, qdel_path, logger=logger),
+        name="qdel",
+        logger=logger,
+    )
+
+
+def qdel_many(JB_job_numbers, qdel_path, logger, retry_policy=None):
+    """
+    Deletes many jobs with as few calls of qdel as the limits of the
+    length of the arguments allow. All calls share one budget of retries
+    of the retry_policy. Jobs which are already gone are not an error.
+    """
+    utils.call_with_arguments_in_groups(
+        cmd=[qdel_path],
+        arguments=[str(n) for n in JB_job_numbers],
+        logger=logger,
+        is_harmless=_qdel_output_is_harmless,
+        retry_policy=retry_policy,
+    )
+
+
+def _qdel_output_is_harmless(output):
+    """
+    True when qdel only complains about jobs which are already gone while
+    it deleted all the others.
+    """
+    harmless = ["does not exist", "for deletion", "has deleted"]
+    lines = [line for line in output.splitlines() if line.strip()]
+    if len(lines) == 0:
+        return False
+    for line in lines:
+        if not any(h in line for h in harmless):
+            return False
+    return True
 
 
-def qstat(qstat_path, logger):
+def qstat(
+    qstat_path, logger, cache_ttl=None, cache_dir=None, retry_policy=None
+):
     """
     Return lists of running and pending jobs.
-    Try again in case of Failure.
-    Only except KeyboardInterrupt to stop.
+    Try again in case of Failure as the retry_policy allows, default is
+    retrying.RetryPolicy().
+
+    When cache_ttl is not None, the parsed output of qstat is shared with
+    all other processes of the user on this host for cache_ttl seconds, see
+    status_cache.StatusCache.
     """
-    while True:
-        try:
-            running, pending = external_qstat_call.qstat(qstat_path=qstat_path)
-            break
-        except KeyboardInterrupt:
-            raise
-        except Exception as bad:
-            logger.warning("Problem in qstat()")
-            logger.warning(str(bad))
-            time.sleep(1)
-    return running, pending
+    if retry_policy is None:
+        retry_policy = retrying.RetryPolicy()
+
+    if cache_ttl is None:
+        return retry_policy.call(
+            func=lambda: external_qstat_call.qstat(qstat_path=qstat_path),
+            name="qstat",
+            logger=logger,
+        )
+
+    cache = status_cache.shared(
+        command=[qstat_path, "-xml", "parsed-into-json"],
+        ttl=cache_ttl,
+        cache_dir=cache_dir,
+    )
+    # The retries wait outside of the cache's lock.
+    queue_info, job_info = json.loads(
+        retry_policy.call(
+            func=lambda: cache.get(
+                refresh=lambda: json.dumps(
+                    external_qstat_call.qstat(qstat_path=qstat_path)
+                ),
+                logger=logger,
+            ),
+            name="qstat",
+            logger=logger,
+        )
+    )
+    return queue_info, job_info
@@ -1,6 +1,17 @@
 def get_jobs_running_pending_error(
-    JB_names_set, error_state_indicator, all_jobs_running, all_jobs_pending
+    JB_names_set,
+    error_state_indicator,
+    all_jobs_running,
+    all_jobs_pending,
+    JB_job_numbers_set=None,
 ):
+    if JB_job_numbers_set is not None:
+        all_jobs_running = filter_jobs_by_JB_job_number(
+            all_jobs_running, JB_job_numbers_set
+        )
+        all_jobs_pending = filter_jobs_by_JB_job_number(
+            all_jobs_pending, JB_job_numbers_set
+        )
     jobs_running = filter_jobs_by_JB_name(all_jobs_running, JB_names_set)
     jobs_pending = filter_jobs_by_JB_name(all_jobs_pending, JB_names_set)
     return extract_error_from_running_pending(
@@ -39,3 +50,11 @@ def filter_jobs_by_JB_name(jobs, JB_names_set):
         if job["JB_name"] in JB_names_set:
             my_jobs.append(job)
     return my_jobs
+
+
+def filter_jobs_by_JB_job_number(jobs, JB_job_numbers_set):
+    my_jobs = []
+    for job in jobs:
+        if job["JB_job_number"] in JB_job_numbers_set:
+            my_jobs.append(job)
+    return my_jobs
@@ -1,4 +1,5 @@
 #!/usr/bin/env python3
+import fcntl
 import sys
 import json
 import datetime
@@ -6,30 +7,43 @@ from pypoolparty import sun_grid_engine
 
 queue_state_path = None  #  <- REQUIRED
 
+# Like the real scheduler, the dummy can be called concurrently. The lock on
+# the queue's state is held until the process exits.
+queue_state_lock = open(queue_state_path + ".lock", "a")
+fcntl.flock(queue_state_lock, fcntl.LOCK_EX)
+
 # dummy qdel
 # ==========
-assert len(sys.argv) == 2
-JB_job_number = sys.argv[1]
+assert len(sys.argv) >= 2
+JB_job_numbers = sys.argv[1:]
 
 with open(queue_state_path, "rt") as f:
     old_state = json.loads(f.read())
 
-found = False
+found = set()
 state = {
     "jobs": [],
     "evil_jobs": old_state["evil_jobs"],
 }
 for job in old_state["jobs"]:
-    if job["JB_job_number"] == JB_job_number:
-        found = True
+    if job["JB_job_number"] in JB_job_numbers:
+        found.add(job["JB_job_number"])
+        print(
+            "dummy_user has registered the job {:s} for deletion".format(
+                job["JB_job_number"]
+            )
+        )
     else:
         state["jobs"].append(job)
 
 with open(queue_state_path, "wt") as f:
     f.write(json.dumps(state, indent=4))
 
-if found == True:
+not_found = [n for n in JB_job_numbers if n not in found]
+for JB_job_number in not_found:
+    print('denied: job "{:s}" does not exist'.format(JB_job_number))
+
+if len(not_found) == 0:
     sys.exit(0)
 else:
-    print("Can not find ", JB_job_number)
     sys.exit(1)
@@ -1,4 +1,5 @@
 #!/usr/bin/env python3
+import fcntl
 import sys
 import json
 import datetime
@@ -7,6 +8,11 @@ import pypoolparty
 
 queue_state_path = None  #  <- REQUIRED
 
+# Like the real scheduler, the dummy can be called concurrently. The lock on
+# the queue's state is held until the process exits.
+queue_state_lock = open(queue_state_path + ".lock", "a")
+fcntl.flock(queue_state_lock, fcntl.LOCK_EX)
+
 
 def job_to_xml(job):
     jld = ""
@@ -1,4 +1,5 @@
 #!/usr/bin/env python3
+import fcntl
 import argparse
 import json
 import datetime
@@ -19,6 +20,11 @@ args = parser.parse_args()
 
 queue_state_path = None  #  <- REQUIRED
 
+# Like the real scheduler, the dummy can be called concurrently. The lock on
+# the queue's state is held until the process exits.
+queue_state_lock = open(queue_state_path + ".lock", "a")
+fcntl.flock(queue_state_lock, fcntl.LOCK_EX)
+
 assert len(args.script_args) == 2
 
 with open(queue_state_path, "rt") as f:
@@ -49,4 +55,8 @@ state["jobs"].append(job)
 with open(queue_state_path, "wt") as f:
     f.write(json.dumps(state, indent=4))
 
+print(
+    'Your job {:s} ("{:s}") has been submitted'.format(JB_job_number, args.N)
+)
+
 sys.exit(0)
@@ -0,0 +1,58 @@
+import pypoolparty
+import json_line_logger
+import tempfile
+import json
+
+
+def test_parse_qsub_stdout():
+    parse = pypoolparty.sun_grid_engine.calling._parse_qsub_stdout
+    assert parse('Your job 123456 ("abc") has been submitted\n') == "123456"
+    assert (
+        parse('Your job-array 42.1-10:1 ("abc") has been submitted\n') == "42"
+    )
+    assert parse("qsub: something else\n") is None
+
+
+def test_filter_jobs_by_JB_job_number():
+    oj = pypoolparty.sun_grid_engine.organizing_jobs
+    jobs = [
+        {"JB_job_number": "1", "JB_name": "a", "state": "r"},
+        {"JB_job_number": "2", "JB_name": "b", "state": "Eqw"},
+        {"JB_job_number": "3", "JB_name": "c", "state": "r"},
+    ]
+    running, pending, error = oj.get_jobs_running_pending_error(
+        JB_names_set={"a", "b", "c"},
+        error_state_indicator="E",
+        all_jobs_running=jobs[0:1] + jobs[2:3],
+        all_jobs_pending=jobs[1:2],
+        JB_job_numbers_set={"1", "2"},
+    )
+    assert [job["JB_name"] for job in running] == ["a"]
+    assert pending == []
+    assert [job["JB_name"] for job in error] == ["b"]
+
+
+def test_qdel_many():
+    with tempfile.TemporaryDirectory(prefix="pypoolparty") as tmp:
+        qpaths = pypoolparty.sun_grid_engine.testing.dummy_init(path=tmp)
+        pypoolparty.testing.dummy_init_queue_state(path=qpaths["queue_state"])
+        with open(qpaths["queue_state"], "rt") as f:
+            state = json.loads(f.read())
+        for i in range(5):
+            state["jobs"].append({"JB_job_number": str(i), "JB_name": "a"})
+        with open(qpaths["queue_state"], "wt") as f:
+            f.write(json.dumps(state))
+
+        # '7' is already gone which is not an error.
+        pypoolparty.sun_grid_engine.calling.qdel_many(
+            JB_job_numbers=["1", "3", "7"],
+            qdel_path=qpaths["qdel"],
+            logger=json_line_logger.LoggerStdout(),
+        )
+        with open(qpaths["queue_state"], "rt") as f:
+            state = json.loads(f.read())
+        assert [job["JB_job_number"] for job in state["jobs"]] == [
+            "0",
+            "2",
+            "4",
+        ]
@@ -2,6 +2,7 @@ import json
 import subprocess
 import os
 import tempfile
+import time
 from . import utils
 
 
@@ -26,6 +27,21 @@ def dummy_run_job(job):
         subprocess.call(cmd, stdout=o, stderr=e, env=special_env)
 
 
+def sum_plus_shared_offset(task, shared):
+    """
+    A func to test map() with a shared object.
+    """
+    return sum(task) + shared["offset"]
+
+
+def sleep_and_return(seconds):
+    """
+    A func to test the timeout of tasks. Sleeps and returns seconds.
+    """
+    time.sleep(seconds)
+    return seconds
+
+
 def read_shebang_path(path):
     txt = utils.read_text(path=path)
     lines = str.splitlines(txt)
@@ -0,0 +1,93 @@
+import pypoolparty as ppp
+
+
+class ListLogger:
+    def __init__(self):
+        self.msgs = []
+
+    def debug(self, msg):
+        self.msgs.append(msg)
+
+
+def test_backs_off_while_nothing_changes():
+    logger = ListLogger()
+    c = ppp.cadence.Cadence(
+        name="squeue", min_interval=1.0, max_interval=5.0, logger=logger
+    )
+    assert c.is_due()
+
+    c.polled(changed=False, now=0.0)
+    assert c.interval == 2.0
+    assert not c.is_due(now=1.9)
+    assert c.is_due(now=2.0)
+
+    c.polled(changed=False, now=2.0)
+    assert c.interval == 4.0
+    c.polled(changed=False, now=6.0)
+    assert c.interval == 5.0
+    assert c.seconds_until_due(now=8.0) == 3.0
+
+    c.polled(changed=True, now=11.0)
+    assert c.interval == 1.0
+    assert c.next_poll == 12.0
+
+    assert len(logger.msgs) == 4
+    assert "squeue" in logger.msgs[0]
+    assert "unchanged" in logger.msgs[0]
+
+
+def test_speed_up():
+    logger = ListLogger()
+    c = ppp.cadence.Cadence(
+        name="reduction", min_interval=1.0, max_interval=8.0, logger=logger
+    )
+    c.polled(changed=False, now=0.0)
+    c.polled(changed=False, now=2.0)
+    assert c.next_poll == 6.0
+
+    c.speed_up(reason="results", now=2.5)
+    assert c.interval == 1.0
+    assert c.next_poll == 3.0
+    assert "results" in logger.msgs[-1]
+
+    num_msgs = len(logger.msgs)
+    c.speed_up(reason="results", now=2.6)
+    assert len(logger.msgs) == num_msgs
+
+
+def test_fixed_interval():
+    c = ppp.cadence.Cadence(name="fixed", min_interval=0.5)
+    for i in range(5):
+        c.polled(changed=False, now=float(i))
+        assert c.interval == 0.5
+
+
+class WakingWatcher:
+    def wait(self, timeout):
+        return True
+
+
+def test_watcher_wake_makes_the_cadence_due():
+    reduction = ppp.cadence.Cadence(name="reduction", min_interval=5.0)
+    reduction.polled(changed=False)
+    assert not reduction.is_due()
+
+    ppp.cadence.wait(
+        cadences=[reduction],
+        watcher=WakingWatcher(),
+        wake_up=[reduction],
+    )
+    assert reduction.is_due()
+    assert reduction.interval == 5.0
+
+
+def test_due_now():
+    logger = ListLogger()
+    c = ppp.cadence.Cadence(
+        name="reduction", min_interval=1.0, max_interval=8.0, logger=logger
+    )
+    c.polled(changed=False, now=0.0)
+    c.due_now(reason="watcher", now=0.5)
+    assert c.interval == 1.0
+    assert c.is_due(now=0.5)
+    assert "watcher" in logger.msgs[-1]
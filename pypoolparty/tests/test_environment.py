@@ -0,0 +1,62 @@
+import pypoolparty as ppp
+import tempfile
+import os
+import json
+import subprocess
+
+
+def test_snapshot_allowlist_and_denylist():
+    environ = {"PATH": "/bin", "OMP_NUM_THREADS": "1", "SSH_AUTH": "x"}
+
+    s = ppp.environment.snapshot(environ=environ)
+    assert s == environ
+
+    s = ppp.environment.snapshot(environ=environ, allowlist=["PATH", "OMP_*"])
+    assert s == {"PATH": "/bin", "OMP_NUM_THREADS": "1"}
+
+    s = ppp.environment.snapshot(environ=environ, denylist=["SSH_*"])
+    assert s == {"PATH": "/bin", "OMP_NUM_THREADS": "1"}
+
+    s = ppp.environment.snapshot(
+        environ=environ, allowlist=["*"], denylist=["PATH"]
+    )
+    assert s == {"OMP_NUM_THREADS": "1", "SSH_AUTH": "x"}
+
+
+def test_worker_node_script_sets_environ_from_snapshot():
+    with tempfile.TemporaryDirectory(prefix="pypoolparty") as tmp:
+        chunk_path = os.path.join(tmp, "000000000.pkl")
+        ppp.utils.write_pickle(path=chunk_path, content=[["PPP_TEST_VAR"]])
+
+        environ = dict(os.environ)
+        environ["PPP_TEST_VAR"] = "quote ' \" and unicode ä"
+        size = ppp.environment.write(
+            path=ppp.environment.environ_path(tmp), environ=environ
+        )
+        assert size == os.stat(ppp.environment.environ_path(tmp)).st_size
+
+        script_str = ppp.making_script.make(
+            func_module="os",
+            func_name="getenv",
+            unpack_task_with_asterisk=True,
+            with_environ_snapshot=True,
+        )
+        ppp.utils.write_text(
+            path=os.path.join(tmp, "worker_node_script.py"),
+            content=script_str,
+        )
+        rc = subprocess.call(
+            ["python", os.path.join(tmp, "worker_node_script.py"), chunk_path]
+        )
+        assert rc == 0
+        result = ppp.utils.read_pickle(path=chunk_path + ".out")
+        assert result == [environ["PPP_TEST_VAR"]]
+
+        with open(chunk_path + ".startup.json", "rt") as f:
+            startup = json.loads(f.read())
+        assert startup["num_environ_set"] >= 1
+
+        summary = ppp.pooling.summarize_worker_startups(
+            work_dir=tmp, num_chunks=1
+        )
+        assert summary.startswith("worker-node start-up")
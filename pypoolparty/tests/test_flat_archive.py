@@ -0,0 +1,47 @@
+import pypoolparty as ppp
+import tempfile
+import os
+import pytest
+
+
+def test_write_and_read():
+    payloads = [os.urandom(i) for i in range(100)]
+    with tempfile.TemporaryDirectory(prefix="pypoolparty") as tmp:
+        path = os.path.join(tmp, "archive.bin")
+        with ppp.flat_archive.Writer(path=path) as fout:
+            for i, payload in enumerate(payloads):
+                fout.append(key=1000 + i, payload=payload)
+
+        assert os.path.exists(path)
+        assert os.path.exists(os.path.join(tmp, "archive.idx"))
+        assert not os.path.exists(path + ".part")
+
+        for i in reversed(range(len(payloads))):
+            key, payload = ppp.flat_archive.read(path=path, position=i)
+            assert key == 1000 + i
+            assert payload == payloads[i]
+
+        everything = ppp.flat_archive.read_all(path=path)
+        assert len(everything) == len(payloads)
+        for i, payload in enumerate(payloads):
+            assert everything[1000 + i] == payload
+
+
+def test_position_out_of_range():
+    with tempfile.TemporaryDirectory(prefix="pypoolparty") as tmp:
+        path = os.path.join(tmp, "archive.bin")
+        with ppp.flat_archive.Writer(path=path) as fout:
+            fout.append(key=0, payload=b"abc")
+
+        with pytest.raises(KeyError):
+            ppp.flat_archive.read(path=path, position=1)
+
+
+def test_abort_on_exception():
+    with tempfile.TemporaryDirectory(prefix="pypoolparty") as tmp:
+        path = os.path.join(tmp, "archive.bin")
+        with pytest.raises(KeyError):
+            with ppp.flat_archive.Writer(path=path) as fout:
+                fout.append(key=0, payload=b"abc")
+                raise KeyError()
+        assert os.listdir(tmp) == []
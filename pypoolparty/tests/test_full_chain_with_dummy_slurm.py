@@ -57,3 +57,151 @@ def test_run_with_failing_job(debug_dir):
 
         for i in range(NUM_JOBS):
             assert results[i] == sum(tasks[i])
+
+
+def test_run_with_out_of_band_pickles(debug_dir):
+    np = pytest.importorskip("numpy")
+    with pypoolparty.testing.DebugDirectory(
+        suffix="-slurm-oob", debug_dir=debug_dir
+    ) as tmp_dir:
+        work_dir = os.path.join(tmp_dir, "work_dir")
+        dummy_dir = os.path.join(tmp_dir, "dummy")
+
+        qpaths = pypoolparty.slurm.testing.dummy_init(path=dummy_dir)
+        pypoolparty.testing.dummy_init_queue_state(path=qpaths["queue_state"])
+
+        tasks = [np.arange(i, i + 1000, dtype=np.float64) for i in range(7)]
+
+        pool = pypoolparty.slurm.Pool(
+            polling_interval=0.1,
+            work_dir=work_dir,
+            sbatch_path=qpaths["sbatch"],
+            squeue_path=qpaths["squeue"],
+            scancel_path=qpaths["scancel"],
+            oob_pickle=True,
+        )
+        results = pool.map(func=np.cumsum, iterable=tasks, chunksize=2)
+        assert len(results) == len(tasks)
+        for i in range(len(tasks)):
+            np.testing.assert_array_equal(results[i], np.cumsum(tasks[i]))
+
+
+def test_run_with_shared_object(debug_dir):
+    with pypoolparty.testing.DebugDirectory(
+        suffix="-slurm-shared", debug_dir=debug_dir
+    ) as tmp_dir:
+        work_dir = os.path.join(tmp_dir, "work_dir")
+        dummy_dir = os.path.join(tmp_dir, "dummy")
+
+        qpaths = pypoolparty.slurm.testing.dummy_init(path=dummy_dir)
+        pypoolparty.testing.dummy_init_queue_state(path=qpaths["queue_state"])
+
+        tasks = [[i, i] for i in range(5)]
+
+        pool = pypoolparty.slurm.Pool(
+            polling_interval=0.1,
+            work_dir=work_dir,
+            sbatch_path=qpaths["sbatch"],
+            squeue_path=qpaths["squeue"],
+            scancel_path=qpaths["scancel"],
+        )
+        results = pool.map(
+            func=pypoolparty.testing.sum_plus_shared_offset,
+            iterable=tasks,
+            shared={"offset": 1000},
+            chunksize=2,
+        )
+        assert results == [1000 + 2 * i for i in range(5)]
+
+
+def test_run_watching_work_dir(debug_dir):
+    with pypoolparty.testing.DebugDirectory(
+        suffix="-slurm-watching", debug_dir=debug_dir
+    ) as tmp_dir:
+        work_dir = os.path.join(tmp_dir, "work_dir")
+        dummy_dir = os.path.join(tmp_dir, "dummy")
+
+        qpaths = pypoolparty.slurm.testing.dummy_init(path=dummy_dir)
+        pypoolparty.testing.dummy_init_queue_state(path=qpaths["queue_state"])
+
+        tasks = [[i, i] for i in range(5)]
+
+        pool = pypoolparty.slurm.Pool(
+            polling_interval=0.1,
+            work_dir=work_dir,
+            keep_work_dir=True,
+            sbatch_path=qpaths["sbatch"],
+            squeue_path=qpaths["squeue"],
+            scancel_path=qpaths["scancel"],
+            watch_work_dir=True,
+        )
+        results = pool.map(func=sum, iterable=tasks, chunksize=2)
+        assert results == [2 * i for i in range(5)]
+
+        session_dir = os.path.join(work_dir, os.listdir(work_dir)[0])
+        with open(os.path.join(session_dir, "log.jsonl"), "rt") as f:
+            assert "Waking up on results" in f.read()
+
+
+def test_run_with_status_cache(debug_dir):
+    with pypoolparty.testing.DebugDirectory(
+        suffix="-slurm-status-cache", debug_dir=debug_dir
+    ) as tmp_dir:
+        work_dir = os.path.join(tmp_dir, "work_dir")
+        dummy_dir = os.path.join(tmp_dir, "dummy")
+
+        qpaths = pypoolparty.slurm.testing.dummy_init(path=dummy_dir)
+        pypoolparty.testing.dummy_init_queue_state(path=qpaths["queue_state"])
+
+        tasks = [[i, i] for i in range(5)]
+
+        pool = pypoolparty.slurm.Pool(
+            polling_interval=0.1,
+            work_dir=work_dir,
+            keep_work_dir=True,
+            sbatch_path=qpaths["sbatch"],
+            squeue_path=qpaths["squeue"],
+            scancel_path=qpaths["scancel"],
+            status_cache_ttl=0.05,
+        )
+        results = pool.map(func=sum, iterable=tasks, chunksize=2)
+        assert results == [2 * i for i in range(5)]
+
+        session_dir = os.path.join(work_dir, os.listdir(work_dir)[0])
+        job_ids = pypoolparty.pooling.read_job_ids(work_dir=session_dir)
+        assert len(job_ids) == 3
+        with open(os.path.join(session_dir, "log.jsonl"), "rt") as f:
+            assert "Status cache dummy_squeue.py: miss" in f.read()
+
+
+def test_run_with_concurrent_rate_limited_submission(debug_dir):
+    with pypoolparty.testing.DebugDirectory(
+        suffix="-slurm-concurrent-submission", debug_dir=debug_dir
+    ) as tmp_dir:
+        work_dir = os.path.join(tmp_dir, "work_dir")
+        dummy_dir = os.path.join(tmp_dir, "dummy")
+
+        qpaths = pypoolparty.slurm.testing.dummy_init(path=dummy_dir)
+        pypoolparty.testing.dummy_init_queue_state(path=qpaths["queue_state"])
+
+        tasks = [[i, i] for i in range(12)]
+
+        pool = pypoolparty.slurm.Pool(
+            polling_interval=0.1,
+            work_dir=work_dir,
+            keep_work_dir=True,
+            sbatch_path=qpaths["sbatch"],
+            squeue_path=qpaths["squeue"],
+            scancel_path=qpaths["scancel"],
+            num_submit_threads=3,
+            max_submit_rate=20.0,
+        )
+        results = pool.map(func=sum, iterable=tasks)
+        assert results == [2 * i for i in range(12)]
+
+        session_dir = os.path.join(work_dir, os.listdir(work_dir)[0])
+        job_ids = pypoolparty.pooling.read_job_ids(work_dir=session_dir)
+        assert len(job_ids) == 12
+        assert len(set(job_ids.values())) == 12
+        with open(os.path.join(session_dir, "log.jsonl"), "rt") as f:
+            assert "Submitted 12 jobs" in f.read()
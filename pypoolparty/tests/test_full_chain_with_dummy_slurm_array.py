@@ -63,3 +63,434 @@ def test_run_with_failing_job(debug_dir):
         assert not results[1]
         assert results[2]
         assert results[3]
+
+
+def test_run_tasks_from_generator_in_batches(debug_dir):
+    with pypoolparty.testing.DebugDirectory(
+        suffix="-slurm-array-batches", debug_dir=debug_dir
+    ) as tmp_dir:
+        work_dir = os.path.join(tmp_dir, "work_dir")
+        dummy_dir = os.path.join(tmp_dir, "dummy")
+
+        qpaths = pypoolparty.slurm.testing.dummy_init(path=dummy_dir)
+        pypoolparty.testing.dummy_init_queue_state(path=qpaths["queue_state"])
+
+        NUM_JOBS = 23
+
+        def make_tasks():
+            for i in range(NUM_JOBS):
+                yield pypoolparty.utils.arange(start=i, stop=i + 10)
+
+        pool = pypoolparty.slurm.array.Pool(
+            polling_interval=0.1,
+            work_dir=work_dir,
+            keep_work_dir=True,
+            sbatch_path=qpaths["sbatch"],
+            squeue_path=qpaths["squeue"],
+            scancel_path=qpaths["scancel"],
+            num_tasks_per_batch=5,
+            task_store="flat",
+            num_task_shards=3,
+            verbose=True,
+        )
+
+        results = pool.map(func=sum, iterable=make_tasks())
+        assert len(results) == NUM_JOBS
+        for i, task in enumerate(make_tasks()):
+            assert results[i] == sum(task)
+
+        session_dirs = os.listdir(work_dir)
+        assert len(session_dirs) == 1
+        dbg = pypoolparty.slurm.array.debugging.Debugging(
+            work_dir=os.path.join(work_dir, session_dirs[0])
+        )
+        assert len(dbg.tasks) == NUM_JOBS
+        for i, task in enumerate(make_tasks()):
+            assert dbg.tasks[i] == task
+        assert len(dbg.is_not_complete()) == 0
+
+        results = pool.map(func=sum, iterable=iter([]))
+        assert results == []
+
+
+def test_run_tasks_in_batches_with_zip_task_store(debug_dir):
+    with pypoolparty.testing.DebugDirectory(
+        suffix="-slurm-array-batches-zip", debug_dir=debug_dir
+    ) as tmp_dir:
+        work_dir = os.path.join(tmp_dir, "work_dir")
+        dummy_dir = os.path.join(tmp_dir, "dummy")
+
+        qpaths = pypoolparty.slurm.testing.dummy_init(path=dummy_dir)
+        pypoolparty.testing.dummy_init_queue_state(path=qpaths["queue_state"])
+
+        NUM_JOBS = 13
+
+        def make_tasks():
+            for i in range(NUM_JOBS):
+                yield pypoolparty.utils.arange(start=i, stop=i + 10)
+
+        pool = pypoolparty.slurm.array.Pool(
+            polling_interval=0.1,
+            work_dir=work_dir,
+            keep_work_dir=True,
+            sbatch_path=qpaths["sbatch"],
+            squeue_path=qpaths["squeue"],
+            scancel_path=qpaths["scancel"],
+            num_tasks_per_batch=5,
+            task_store="zip",
+            num_task_shards=20,
+            num_simultaneously_running_tasks=2,
+        )
+
+        results = pool.map(func=sum, iterable=make_tasks())
+        assert len(results) == NUM_JOBS
+        for i, task in enumerate(make_tasks()):
+            assert results[i] == sum(task)
+
+        # no more shards than tasks in a batch
+        session_dir = os.path.join(work_dir, os.listdir(work_dir)[0])
+        for ibatch in range(3):
+            for ishard in range(20):
+                assert os.path.exists(
+                    pypoolparty.worker_runtime.tasks_path(
+                        work_dir=session_dir,
+                        ibatch=ibatch,
+                        task_store="zip",
+                        ishard=ishard,
+                    )
+                ) == (ishard < 5)
+        with open(os.path.join(session_dir, "log.jsonl"), "rt") as f:
+            assert "limits each batch of 5 tasks on its own" in f.read()
+
+
+def test_run_with_out_of_band_pickles(debug_dir):
+    np = pytest.importorskip("numpy")
+    with pypoolparty.testing.DebugDirectory(
+        suffix="-slurm-array-oob", debug_dir=debug_dir
+    ) as tmp_dir:
+        work_dir = os.path.join(tmp_dir, "work_dir")
+        dummy_dir = os.path.join(tmp_dir, "dummy")
+
+        qpaths = pypoolparty.slurm.testing.dummy_init(path=dummy_dir)
+        pypoolparty.testing.dummy_init_queue_state(path=qpaths["queue_state"])
+
+        tasks = [np.arange(i, i + 1000, dtype=np.float64) for i in range(7)]
+
+        for task_store in pypoolparty.slurm.array.mapping.TASK_STORES:
+            pool = pypoolparty.slurm.array.Pool(
+                polling_interval=0.1,
+                work_dir=os.path.join(work_dir, task_store),
+                sbatch_path=qpaths["sbatch"],
+                squeue_path=qpaths["squeue"],
+                scancel_path=qpaths["scancel"],
+                task_store=task_store,
+                oob_pickle=True,
+            )
+            results = pool.map(func=np.cumsum, iterable=tasks)
+            assert len(results) == len(tasks)
+            for i in range(len(tasks)):
+                np.testing.assert_array_equal(results[i], np.cumsum(tasks[i]))
+
+
+def test_run_with_shared_object(debug_dir):
+    with pypoolparty.testing.DebugDirectory(
+        suffix="-slurm-array-shared", debug_dir=debug_dir
+    ) as tmp_dir:
+        work_dir = os.path.join(tmp_dir, "work_dir")
+        dummy_dir = os.path.join(tmp_dir, "dummy")
+
+        qpaths = pypoolparty.slurm.testing.dummy_init(path=dummy_dir)
+        pypoolparty.testing.dummy_init_queue_state(path=qpaths["queue_state"])
+
+        tasks = [[i, i] for i in range(5)]
+        shared = {"offset": 1000, "table": list(range(10000))}
+
+        pool = pypoolparty.slurm.array.Pool(
+            polling_interval=0.1,
+            work_dir=work_dir,
+            keep_work_dir=True,
+            sbatch_path=qpaths["sbatch"],
+            squeue_path=qpaths["squeue"],
+            scancel_path=qpaths["scancel"],
+        )
+        results = pool.map(
+            func=pypoolparty.testing.sum_plus_shared_offset,
+            iterable=tasks,
+            shared=shared,
+        )
+        assert results == [1000 + 2 * i for i in range(5)]
+
+        session_dirs = os.listdir(work_dir)
+        assert len(session_dirs) == 1
+        dbg = pypoolparty.slurm.array.debugging.Debugging(
+            work_dir=os.path.join(work_dir, session_dirs[0])
+        )
+        assert dbg.shared == shared
+
+
+def test_run_with_compression(debug_dir):
+    with pypoolparty.testing.DebugDirectory(
+        suffix="-slurm-array-compression", debug_dir=debug_dir
+    ) as tmp_dir:
+        work_dir = os.path.join(tmp_dir, "work_dir")
+        dummy_dir = os.path.join(tmp_dir, "dummy")
+
+        qpaths = pypoolparty.slurm.testing.dummy_init(path=dummy_dir)
+        pypoolparty.testing.dummy_init_queue_state(path=qpaths["queue_state"])
+
+        tasks = [pypoolparty.utils.arange(start=i, stop=100) for i in range(7)]
+
+        pool = pypoolparty.slurm.array.Pool(
+            polling_interval=0.1,
+            work_dir=work_dir,
+            keep_work_dir=True,
+            sbatch_path=qpaths["sbatch"],
+            squeue_path=qpaths["squeue"],
+            scancel_path=qpaths["scancel"],
+            oob_pickle=True,
+            num_pickling_processes=2,
+            compression={
+                "tasks": "deflate",
+                "results": ("lzma", None),
+                "stdout": ("bzip2", 9),
+                "stderr": ("deflate", 1),
+            },
+        )
+        results = pool.map(func=sum, iterable=tasks)
+        assert results == [sum(task) for task in tasks]
+
+        session_dirs = os.listdir(work_dir)
+        assert len(session_dirs) == 1
+        dbg = pypoolparty.slurm.array.debugging.Debugging(
+            work_dir=os.path.join(work_dir, session_dirs[0])
+        )
+        assert len(dbg.is_not_complete()) == 0
+        for i in range(len(tasks)):
+            assert dbg.tasks[i] == tasks[i]
+            assert dbg.results[i] == results[i]
+
+
+def test_run_in_chunks_with_failing_job(debug_dir):
+    with pypoolparty.testing.DebugDirectory(
+        suffix="-slurm-array-chunks", debug_dir=debug_dir
+    ) as tmp_dir:
+        work_dir = os.path.join(tmp_dir, "work_dir")
+        dummy_dir = os.path.join(tmp_dir, "dummy")
+
+        qpaths = pypoolparty.slurm.testing.dummy_init(path=dummy_dir)
+
+        # the array elements are the chunks
+        pypoolparty.testing.dummy_init_queue_state(
+            path=qpaths["queue_state"],
+            evil_jobs=[
+                {"array_task_id": "3", "num_fails": 0, "max_num_fails": 2}
+            ],
+        )
+
+        NUM_JOBS = 30
+        tasks = ["task {:d}".format(i) for i in range(NUM_JOBS)]
+
+        pool = pypoolparty.slurm.array.Pool(
+            polling_interval=0.1,
+            work_dir=work_dir,
+            keep_work_dir=True,
+            max_num_resubmissions=10,
+            sbatch_path=qpaths["sbatch"],
+            squeue_path=qpaths["squeue"],
+            scancel_path=qpaths["scancel"],
+        )
+        results = pool.map(func=print, iterable=tasks, chunksize=4)
+        assert results == [None] * NUM_JOBS
+
+        session_dirs = os.listdir(work_dir)
+        assert len(session_dirs) == 1
+        session_dir = os.path.join(work_dir, session_dirs[0])
+        dbg = pypoolparty.slurm.array.debugging.Debugging(work_dir=session_dir)
+        assert len(dbg.is_not_complete()) == 0
+        for task_id in range(NUM_JOBS):
+            assert (
+                dbg.stdout[task_id] == "task {:d}\n".format(task_id).encode()
+            )
+            assert dbg.stderr[task_id] == b""
+
+        # the last chunk has only two tasks
+        assert pypoolparty.slurm.array.mapping.read_chunk_task_ids(
+            work_dir=session_dir, ichunk=7, chunksize=4
+        ) == [28, 29]
+
+        # starmap
+        # -------
+        results = pool.starmap(
+            func=operator.eq,
+            iterable=zip([1, 1, 1, 1, 1], [1, 0, 1, 1, 0]),
+            chunksize=2,
+        )
+        assert results == [True, False, True, True, False]
+
+
+def test_run_in_chunks_in_batches(debug_dir):
+    with pypoolparty.testing.DebugDirectory(
+        suffix="-slurm-array-chunks-batches", debug_dir=debug_dir
+    ) as tmp_dir:
+        work_dir = os.path.join(tmp_dir, "work_dir")
+        dummy_dir = os.path.join(tmp_dir, "dummy")
+
+        qpaths = pypoolparty.slurm.testing.dummy_init(path=dummy_dir)
+        pypoolparty.testing.dummy_init_queue_state(path=qpaths["queue_state"])
+
+        NUM_JOBS = 23
+
+        def make_tasks():
+            for i in range(NUM_JOBS):
+                yield pypoolparty.utils.arange(start=i, stop=i + 10)
+
+        pool = pypoolparty.slurm.array.Pool(
+            polling_interval=0.1,
+            work_dir=work_dir,
+            sbatch_path=qpaths["sbatch"],
+            squeue_path=qpaths["squeue"],
+            scancel_path=qpaths["scancel"],
+            num_tasks_per_batch=6,
+        )
+        results = pool.map(func=sum, iterable=make_tasks(), chunksize=3)
+        assert results == [sum(task) for task in make_tasks()]
+
+        with pytest.raises(AssertionError):
+            pool.map(func=sum, iterable=make_tasks(), chunksize=4)
+
+
+def test_run_in_chunks_on_multiple_cores(debug_dir):
+    with pypoolparty.testing.DebugDirectory(
+        suffix="-slurm-array-chunks-cores", debug_dir=debug_dir
+    ) as tmp_dir:
+        work_dir = os.path.join(tmp_dir, "work_dir")
+        dummy_dir = os.path.join(tmp_dir, "dummy")
+
+        qpaths = pypoolparty.slurm.testing.dummy_init(path=dummy_dir)
+        pypoolparty.testing.dummy_init_queue_state(path=qpaths["queue_state"])
+
+        NUM_JOBS = 12
+        tasks = ["task {:d}".format(i) for i in range(NUM_JOBS)]
+
+        pool = pypoolparty.slurm.array.Pool(
+            polling_interval=0.1,
+            work_dir=work_dir,
+            keep_work_dir=True,
+            sbatch_path=qpaths["sbatch"],
+            squeue_path=qpaths["squeue"],
+            scancel_path=qpaths["scancel"],
+            num_cores_per_job=3,
+        )
+        results = pool.map(func=print, iterable=tasks, chunksize=6)
+        assert results == [None] * NUM_JOBS
+
+        session_dir = os.path.join(work_dir, os.listdir(work_dir)[0])
+        dbg = pypoolparty.slurm.array.debugging.Debugging(work_dir=session_dir)
+        for task_id in range(NUM_JOBS):
+            assert dbg.stdout[task_id] == tasks[task_id].encode() + b"\n"
+
+
+def test_telemetry_of_tasks(debug_dir):
+    np = pytest.importorskip("numpy")
+    with pypoolparty.testing.DebugDirectory(
+        suffix="-slurm-array-telemetry", debug_dir=debug_dir
+    ) as tmp_dir:
+        work_dir = os.path.join(tmp_dir, "work_dir")
+        dummy_dir = os.path.join(tmp_dir, "dummy")
+
+        qpaths = pypoolparty.slurm.testing.dummy_init(path=dummy_dir)
+        pypoolparty.testing.dummy_init_queue_state(path=qpaths["queue_state"])
+
+        NUM_JOBS = 9
+        tasks = [[i, i] for i in range(NUM_JOBS)]
+
+        pool = pypoolparty.slurm.array.Pool(
+            polling_interval=0.1,
+            work_dir=work_dir,
+            keep_work_dir=True,
+            sbatch_path=qpaths["sbatch"],
+            squeue_path=qpaths["squeue"],
+            scancel_path=qpaths["scancel"],
+        )
+        results = pool.map(func=sum, iterable=tasks)
+        assert results == [sum(task) for task in tasks]
+
+        session_dir = os.path.join(work_dir, os.listdir(work_dir)[0])
+        dbg = pypoolparty.slurm.array.debugging.Debugging(work_dir=session_dir)
+        telemetry = dbg.telemetry
+        assert sorted(telemetry["task_id"]) == list(range(NUM_JOBS))
+        assert np.all(telemetry["wall_time"] >= 0.0)
+        assert np.all(telemetry["io_time"] >= 0.0)
+        assert np.all(telemetry["io_time"] <= telemetry["wall_time"])
+        assert np.all(telemetry["max_rss"] > 0)
+        assert np.all(telemetry["queue_latency"] >= 0.0)
+        assert set(telemetry["hostname"]) == {os.uname().nodename}
+
+
+def test_task_timeout(debug_dir):
+    with pypoolparty.testing.DebugDirectory(
+        suffix="-slurm-array-task-timeout", debug_dir=debug_dir
+    ) as tmp_dir:
+        work_dir = os.path.join(tmp_dir, "work_dir")
+        dummy_dir = os.path.join(tmp_dir, "dummy")
+
+        qpaths = pypoolparty.slurm.testing.dummy_init(path=dummy_dir)
+        pypoolparty.testing.dummy_init_queue_state(path=qpaths["queue_state"])
+
+        tasks = [0.0, 60.0, 0.1, 0.0]
+
+        pool = pypoolparty.slurm.array.Pool(
+            polling_interval=0.1,
+            work_dir=work_dir,
+            keep_work_dir=True,
+            sbatch_path=qpaths["sbatch"],
+            squeue_path=qpaths["squeue"],
+            scancel_path=qpaths["scancel"],
+            task_timeout=2.0,
+        )
+        results = pool.map(
+            func=pypoolparty.testing.sleep_and_return,
+            iterable=tasks,
+            chunksize=2,
+        )
+        assert results[0] == 0.0
+        assert results[2] == 0.1
+        assert results[3] == 0.0
+
+        session_dir = os.path.join(work_dir, os.listdir(work_dir)[0])
+        dbg = pypoolparty.slurm.array.debugging.Debugging(work_dir=session_dir)
+        assert dbg.has_exceptions() == {1}
+        assert dbg.has_exceeded_limits() == {1}
+        assert (
+            pypoolparty.slurm.array.debugging.exceeded_limit(dbg.exceptions[1])
+            == "TaskTimeout"
+        )
+
+
+def test_run_watching_work_dir(debug_dir):
+    with pypoolparty.testing.DebugDirectory(
+        suffix="-slurm-array-watching", debug_dir=debug_dir
+    ) as tmp_dir:
+        work_dir = os.path.join(tmp_dir, "work_dir")
+        dummy_dir = os.path.join(tmp_dir, "dummy")
+
+        qpaths = pypoolparty.slurm.testing.dummy_init(path=dummy_dir)
+        pypoolparty.testing.dummy_init_queue_state(path=qpaths["queue_state"])
+
+        tasks = [[i, i] for i in range(5)]
+
+        pool = pypoolparty.slurm.array.Pool(
+            polling_interval=0.1,
+            work_dir=work_dir,
+            keep_work_dir=True,
+            sbatch_path=qpaths["sbatch"],
+            squeue_path=qpaths["squeue"],
+            scancel_path=qpaths["scancel"],
+            watch_work_dir=True,
+        )
+        results = pool.map(func=sum, iterable=tasks)
+        assert results == [2 * i for i in range(5)]
+
+        session_dir = os.path.join(work_dir, os.listdir(work_dir)[0])
+        dbg = pypoolparty.slurm.array.debugging.Debugging(work_dir=session_dir)
+        assert any("Waking up on results" in item["m"] for item in dbg.log)
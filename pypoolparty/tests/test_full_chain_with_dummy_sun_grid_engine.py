@@ -70,3 +70,34 @@ def test_run_with_failing_job(debug_dir):
         assert not results[1]
         assert results[2]
         assert results[3]
+
+
+def test_run_with_status_cache(debug_dir):
+    with pypoolparty.testing.DebugDirectory(
+        debug_dir=debug_dir, suffix="-sun-grid-engine-status-cache"
+    ) as tmp_dir:
+        work_dir = os.path.join(tmp_dir, "work_dir")
+        dummy_dir = os.path.join(tmp_dir, "dummy")
+
+        qpaths = pypoolparty.sun_grid_engine.testing.dummy_init(path=dummy_dir)
+        pypoolparty.testing.dummy_init_queue_state(path=qpaths["queue_state"])
+
+        tasks = [[i, i] for i in range(5)]
+
+        pool = pypoolparty.sun_grid_engine.Pool(
+            polling_interval=0.1,
+            work_dir=work_dir,
+            keep_work_dir=True,
+            qsub_path=qpaths["qsub"],
+            qstat_path=qpaths["qstat"],
+            qdel_path=qpaths["qdel"],
+            status_cache_ttl=0.05,
+        )
+        results = pool.map(func=sum, iterable=tasks, chunksize=2)
+        assert results == [2 * i for i in range(5)]
+
+        session_dir = os.path.join(work_dir, os.listdir(work_dir)[0])
+        job_ids = pypoolparty.pooling.read_job_ids(work_dir=session_dir)
+        assert len(job_ids) == 3
+        with open(os.path.join(session_dir, "log.jsonl"), "rt") as f:
+            assert "Status cache dummy_qstat.py: miss" in f.read()
@@ -0,0 +1,92 @@
+import pypoolparty as ppp
+import tempfile
+import os
+
+
+def test_append_and_read():
+    with tempfile.TemporaryDirectory(prefix="pypoolparty") as tmp:
+        path = os.path.join(tmp, "journal")
+        records, offset = ppp.journal.read(path=path)
+        assert records == []
+        assert offset == 0
+
+        fd = ppp.journal.open_for_appending(path=path)
+        ppp.journal.append(fd=fd, key=3, payload=b"abc")
+        ppp.journal.append(fd=fd, key=1, payload=b"")
+
+        records, offset = ppp.journal.read(path=path)
+        assert [(k, bytes(p)) for k, p in records] == [(3, b"abc"), (1, b"")]
+
+        ppp.journal.append(fd=fd, key=7, payload=b"defg")
+        os.close(fd)
+
+        records, offset = ppp.journal.read(path=path, offset=offset)
+        assert [(k, bytes(p)) for k, p in records] == [(7, b"defg")]
+        assert offset == os.stat(path).st_size
+
+
+def test_torn_record_is_ignored_and_repaired():
+    with tempfile.TemporaryDirectory(prefix="pypoolparty") as tmp:
+        path = os.path.join(tmp, "journal")
+        fd = ppp.journal.open_for_appending(path=path)
+        ppp.journal.append(fd=fd, key=0, payload=b"complete")
+        os.close(fd)
+        size = os.stat(path).st_size
+
+        with open(path, "ab") as f:
+            f.write(ppp.journal.HEADER.pack(ppp.journal.MAGIC, 1, 100, 0))
+            f.write(b"torn")
+
+        records, offset = ppp.journal.read(path=path)
+        assert len(records) == 1
+        assert offset == size
+
+        records = ppp.journal.repair(path=path)
+        assert len(records) == 1
+        assert os.stat(path).st_size == size
+
+
+def test_records_behind_garbage_are_read():
+    with tempfile.TemporaryDirectory(prefix="pypoolparty") as tmp:
+        path = os.path.join(tmp, "journal")
+        fd = ppp.journal.open_for_appending(path=path)
+        ppp.journal.append(fd=fd, key=1, payload=b"r")
+        os.close(fd)
+        size = os.stat(path).st_size
+
+        # interleaved appends of two nodes on NFS
+        with open(path, "ab") as f:
+            f.write(b"\x00garbage")
+            f.write(ppp.journal.HEADER.pack(ppp.journal.MAGIC, 2, 1, 0))
+            f.write(b"r")
+
+        records, offset = ppp.journal.read(path=path)
+        assert [(k, bytes(p)) for k, p in records] == [(1, b"r")]
+        assert offset == size
+
+        fd = ppp.journal.open_for_appending(path=path)
+        ppp.journal.append(fd=fd, key=3, payload=b"r")
+        ppp.journal.append(fd=fd, key=4, payload=b"e")
+        os.close(fd)
+
+        records, offset = ppp.journal.read(path=path, offset=offset)
+        assert [(k, bytes(p)) for k, p in records] == [(3, b"r"), (4, b"e")]
+        assert offset == os.stat(path).st_size
+
+        records, offset = ppp.journal.read(path=path, offset=offset)
+        assert records == []
+        assert offset == os.stat(path).st_size
+
+
+def test_torn_header_does_not_swallow_the_next_record():
+    with tempfile.TemporaryDirectory(prefix="pypoolparty") as tmp:
+        path = os.path.join(tmp, "journal")
+        with open(path, "ab") as f:
+            f.write(ppp.journal.HEADER.pack(ppp.journal.MAGIC, 1, 30, 0))
+        fd = ppp.journal.open_for_appending(path=path)
+        ppp.journal.append(fd=fd, key=2, payload=b"payload")
+        os.close(fd)
+
+        records, offset = ppp.journal.read(path=path)
+        assert [(k, bytes(p)) for k, p in records] == [(2, b"payload")]
+        assert offset == os.stat(path).st_size
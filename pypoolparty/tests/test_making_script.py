@@ -2,6 +2,43 @@ import pypoolparty as ppp
 import tempfile
 import os
 import subprocess
+import pickle
+
+
+def test_make_worker_node_script_with_shared():
+    with tempfile.TemporaryDirectory(prefix="pypoolparty") as tmp:
+        bundle = [[1, 2], [3, 4]]
+        func = ppp.testing.sum_plus_shared_offset
+        ppp.utils.write_pickle(
+            path=os.path.join(tmp, "bundle.pkl"),
+            content=bundle,
+        )
+        ppp.utils.write_pickle(
+            path=ppp.pooling.shared_path(tmp),
+            content={"offset": 100},
+        )
+        script_str = ppp.making_script.make(
+            func_module=func.__module__,
+            func_name=func.__name__,
+            environ={},
+            with_shared=True,
+        )
+        ppp.utils.write_text(
+            path=os.path.join(tmp, "worker_node_script.py"),
+            content=script_str,
+        )
+        rc = subprocess.call(
+            [
+                "python",
+                os.path.join(tmp, "worker_node_script.py"),
+                os.path.join(tmp, "bundle.pkl"),
+            ]
+        )
+        assert rc == 0
+        result = ppp.utils.read_pickle(
+            path=os.path.join(tmp, "bundle.pkl.out")
+        )
+        assert result == [103, 107]
 
 
 def test_make_worker_node_script():
@@ -39,6 +76,110 @@ def test_make_worker_node_script():
         assert result == result_conventional
 
 
+def test_worker_node_script_skips_tasks_in_journal():
+    with tempfile.TemporaryDirectory(prefix="pypoolparty") as tmp:
+        chunk_path = os.path.join(tmp, "bundle.pkl")
+        ppp.utils.write_pickle(path=chunk_path, content=[[1, 2], [3, 4], [5]])
+
+        # the first task returned in an earlier run which got killed
+        fd = ppp.journal.open_for_appending(path=chunk_path + ".journal")
+        ppp.journal.append(fd=fd, key=0, payload=pickle.dumps("earlier"))
+        os.close(fd)
+        with open(chunk_path + ".journal", "ab") as f:
+            f.write(b"torn")
+
+        script_str = ppp.making_script.make(
+            func_module="builtins",
+            func_name="sum",
+            environ={},
+        )
+        ppp.utils.write_text(
+            path=os.path.join(tmp, "worker_node_script.py"),
+            content=script_str,
+        )
+        rc = subprocess.call(
+            ["python", os.path.join(tmp, "worker_node_script.py"), chunk_path]
+        )
+        assert rc == 0
+        result = ppp.utils.read_pickle(path=chunk_path + ".out")
+        assert result == ["earlier", 7, 5]
+
+        # the results are not kept twice
+        assert not os.path.exists(chunk_path + ".journal")
+
+
+def test_worker_node_script_on_multiple_cores():
+    with tempfile.TemporaryDirectory(prefix="pypoolparty") as tmp:
+        chunk_path = os.path.join(tmp, "bundle.pkl")
+        chunk = [[i, 1] for i in range(20)]
+        ppp.utils.write_pickle(path=chunk_path, content=chunk)
+        script_str = ppp.making_script.make(
+            func_module="builtins",
+            func_name="sum",
+            environ={},
+            num_cores=3,
+        )
+        ppp.utils.write_text(
+            path=os.path.join(tmp, "worker_node_script.py"),
+            content=script_str,
+        )
+        rc = subprocess.call(
+            ["python", os.path.join(tmp, "worker_node_script.py"), chunk_path]
+        )
+        assert rc == 0
+        result = ppp.utils.read_pickle(path=chunk_path + ".out")
+        assert result == [sum(task) for task in chunk]
+
+
+def test_worker_node_script_moves_on_after_task_timeout():
+    with tempfile.TemporaryDirectory(prefix="pypoolparty") as tmp:
+        chunk_path = os.path.join(tmp, "bundle.pkl")
+        chunk = [0.0, 60.0, 0.1]
+        ppp.utils.write_pickle(path=chunk_path, content=chunk)
+        func = ppp.testing.sleep_and_return
+        script_str = ppp.making_script.make(
+            func_module=func.__module__,
+            func_name=func.__name__,
+            environ={},
+            task_timeout=2.0,
+        )
+        ppp.utils.write_text(
+            path=os.path.join(tmp, "worker_node_script.py"),
+            content=script_str,
+        )
+        proc = subprocess.run(
+            ["python", os.path.join(tmp, "worker_node_script.py"), chunk_path],
+            stderr=subprocess.PIPE,
+            timeout=30.0,
+        )
+        assert proc.returncode == 0
+        assert b"exceeded its timeout" in proc.stderr
+        result = ppp.utils.read_pickle(path=chunk_path + ".out")
+        assert result == [0.0, None, 0.1]
+
+
+def test_worker_node_script_does_not_import_pypoolparty():
+    with tempfile.TemporaryDirectory(prefix="pypoolparty") as tmp:
+        chunk_path = os.path.join(tmp, "bundle.pkl")
+        ppp.utils.write_pickle(path=chunk_path, content=[[1, 2]])
+        script_str = ppp.making_script.make(
+            func_module="builtins",
+            func_name="sum",
+            environ={},
+        )
+        script_str += 'assert "pypoolparty" not in sys.modules\n'
+        script_str += 'assert "json_line_logger" not in sys.modules\n'
+        ppp.utils.write_text(
+            path=os.path.join(tmp, "worker_node_script.py"),
+            content=script_str,
+        )
+        rc = subprocess.call(
+            ["python", os.path.join(tmp, "worker_node_script.py"), chunk_path]
+        )
+        assert rc == 0
+        assert ppp.utils.read_pickle(path=chunk_path + ".out") == [3]
+
+
 def test_make_environ_str():
     s = ppp.making_script.make_os_environ_string(environ={"a": "b"})
     assert s == 'os.environ["a"] = bytes([98]).decode()\n'
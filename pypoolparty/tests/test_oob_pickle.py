@@ -0,0 +1,169 @@
+import pypoolparty as ppp
+import tempfile
+import zipfile
+import pickle
+import os
+import pytest
+
+
+def test_plain_objects_round_trip():
+    objs = [None, 1, "abc", {"a": [1, 2, 3]}, b"", b"x" * 1000]
+    for obj in objs:
+        assert ppp.oob_pickle.loads(ppp.oob_pickle.dumps(obj)) == obj
+
+
+def test_loads_falls_back_to_plain_pickle():
+    obj = {"a": bytearray(b"abc")}
+    assert ppp.oob_pickle.loads(pickle.dumps(obj)) == obj
+
+
+def test_buffers_are_aligned_and_not_copied():
+    raws = [bytearray(os.urandom(i)) for i in [1, 63, 64, 65, 1000]]
+    obj = [pickle.PickleBuffer(raw) for raw in raws]
+    payload = bytearray(ppp.oob_pickle.dumps(obj))
+    back = ppp.oob_pickle.loads(payload)
+    assert back == raws
+
+    _, _, num_buffers = ppp.oob_pickle.HEADER.unpack_from(payload, 0)
+    assert num_buffers == len(obj)
+    for i in range(num_buffers):
+        offset, size = ppp.oob_pickle.TABLE_ENTRY.unpack_from(
+            payload, ppp.oob_pickle.HEADER.size + i * 16
+        )
+        assert offset % ppp.oob_pickle.ALIGNMENT == 0
+        assert payload[offset : offset + size] == raws[i]
+
+    # the buffers are views into the payload
+    payload[offset] = (payload[offset] + 1) % 256
+    assert back[-1][0] == payload[offset]
+
+
+def test_write_and_read_file():
+    obj = {"small": 1, "large": bytearray(os.urandom(10000))}
+    with tempfile.TemporaryDirectory(prefix="pypoolparty") as tmp:
+        path = os.path.join(tmp, "obj.pkl")
+        ppp.utils.write_pickle(path=path, content=obj, oob=True)
+        assert ppp.utils.read_pickle(path=path) == obj
+
+        ppp.utils.write_pickle(path=path, content=obj)
+        assert ppp.utils.read_pickle(path=path) == obj
+
+
+def test_aligned_zip_members():
+    objs = {
+        "{:d}.pickle".format(i): bytearray(os.urandom(i * 100))
+        for i in range(20)
+    }
+    with tempfile.TemporaryDirectory(prefix="pypoolparty") as tmp:
+        path = os.path.join(tmp, "objs.zip")
+        with zipfile.ZipFile(path, "w") as zout:
+            for name in objs:
+                with ppp.oob_pickle.open_aligned_zip_member_for_writing(
+                    zout=zout, name=name
+                ) as f:
+                    ppp.oob_pickle.dump(obj=objs[name], file=f)
+
+        with zipfile.ZipFile(path, "r") as zin:
+            assert zin.testzip() is None
+            for zinfo in zin.infolist():
+                with open(path, "rb") as f:
+                    view = f.read()
+                start = ppp.oob_pickle.member_data_offset(view, zinfo)
+                assert start % ppp.oob_pickle.ALIGNMENT == 0
+
+        back = ppp.oob_pickle.read_all_zip_members(path=path)
+        assert back == objs
+
+
+def test_numpy_arrays_are_mapped_and_writable():
+    np = pytest.importorskip("numpy")
+    arr = np.arange(10000, dtype=np.float64)
+    with tempfile.TemporaryDirectory(prefix="pypoolparty") as tmp:
+        path = os.path.join(tmp, "arr.pkl")
+        ppp.utils.write_pickle(path=path, content=arr, oob=True)
+
+        back = ppp.utils.read_pickle(path=path)
+        np.testing.assert_array_equal(back, arr)
+        assert back.ctypes.data % ppp.oob_pickle.ALIGNMENT == 0
+
+        # copy on write, the file is not modified
+        back[0] = -1.0
+        again = ppp.utils.read_pickle(path=path)
+        assert again[0] == 0.0
+
+
+def test_aligned_zip_members_after_other_members_and_in_append_mode():
+    with tempfile.TemporaryDirectory(prefix="pypoolparty") as tmp:
+        path = os.path.join(tmp, "objs.zip")
+        with zipfile.ZipFile(path, "w") as zout:
+            zout.writestr("plain.pickle", pickle.dumps(b"x" * 13))
+            with ppp.oob_pickle.open_aligned_zip_member_for_writing(
+                zout=zout, name="a.pickle"
+            ) as f:
+                ppp.oob_pickle.dump(obj=bytearray(b"a" * 1000), file=f)
+        with zipfile.ZipFile(path, "a") as zout:
+            with ppp.oob_pickle.open_aligned_zip_member_for_writing(
+                zout=zout, name="bb.pickle"
+            ) as f:
+                ppp.oob_pickle.dump(obj=bytearray(b"b" * 1000), file=f)
+
+        with open(path, "rb") as f:
+            view = f.read()
+        with zipfile.ZipFile(path, "r") as zin:
+            assert zin.testzip() is None
+            for name in ["a.pickle", "bb.pickle"]:
+                start = ppp.oob_pickle.member_data_offset(
+                    view, zin.getinfo(name)
+                )
+                assert start % ppp.oob_pickle.ALIGNMENT == 0
+
+        back = ppp.oob_pickle.read_all_zip_members(path=path)
+        assert back == {
+            "plain.pickle": b"x" * 13,
+            "a.pickle": b"a" * 1000,
+            "bb.pickle": b"b" * 1000,
+        }
+
+
+def _forbid_mmap(monkeypatch):
+    def mmap_file(file):
+        raise AssertionError("The file must not be mapped.")
+
+    monkeypatch.setattr(ppp.oob_pickle, "mmap_file", mmap_file)
+
+
+def test_zip_without_oob_members_is_not_mapped(monkeypatch):
+    with tempfile.TemporaryDirectory(prefix="pypoolparty") as tmp:
+        path = os.path.join(tmp, "objs.zip")
+        with zipfile.ZipFile(path, "w") as zout:
+            for i in range(3):
+                zout.writestr(str(i), pickle.dumps(i))
+
+        _forbid_mmap(monkeypatch)
+        assert ppp.oob_pickle.read_all_zip_members(path=path) == {
+            "0": 0,
+            "1": 1,
+            "2": 2,
+        }
+        with zipfile.ZipFile(path, "r") as zin:
+            assert ppp.oob_pickle.read_zip_member(path, zin, "1") == 1
+
+
+def test_zip_members_read_without_mapping_can_be_removed(monkeypatch):
+    np = pytest.importorskip("numpy")
+    arr = np.arange(1000, dtype=np.float64)
+    with tempfile.TemporaryDirectory(prefix="pypoolparty") as tmp:
+        path = os.path.join(tmp, "objs.zip")
+        with zipfile.ZipFile(path, "w") as zout:
+            with ppp.oob_pickle.open_aligned_zip_member_for_writing(
+                zout=zout, name="arr"
+            ) as f:
+                ppp.oob_pickle.dump(obj=arr, file=f)
+
+        _forbid_mmap(monkeypatch)
+        back = ppp.oob_pickle.read_all_zip_members(
+            path=path, map_into_memory=False
+        )
+        os.remove(path)
+        np.testing.assert_array_equal(back["arr"], arr)
+        back["arr"][0] = -1.0
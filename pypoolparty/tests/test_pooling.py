@@ -1,4 +1,7 @@
 import pypoolparty
+import tempfile
+import pickle
+import os
 
 
 def test_jobname_ichunk():
@@ -15,3 +18,135 @@ def test_jobname_ichunk():
             jobname=jobname
         )
         assert ichunk_back == ichunk
+
+
+def _append(path, key, obj):
+    fd = pypoolparty.journal.open_for_appending(path=path)
+    pypoolparty.journal.append(fd=fd, key=key, payload=pickle.dumps(obj))
+    os.close(fd)
+
+
+def test_read_task_results_from_journals_reads_only_new_records(monkeypatch):
+    chunks = [[0, 1], [2, 3, 4]]
+    with tempfile.TemporaryDirectory(prefix="pypoolparty") as tmp:
+        paths = [pypoolparty.pooling.journal_path(tmp, i) for i in range(2)]
+        task_results_by_ichunk = {}
+        journal_offsets = {}
+
+        def read():
+            return pypoolparty.pooling.read_task_results_from_journals(
+                work_dir=tmp,
+                chunks=chunks,
+                task_results_by_ichunk=task_results_by_ichunk,
+                journal_offsets=journal_offsets,
+            )
+
+        _append(paths[0], 1, "b")
+        _append(paths[1], 0, "c")
+        assert read() == 2
+        assert journal_offsets[0] == (
+            os.stat(paths[0]).st_ino,
+            os.stat(paths[0]).st_size,
+        )
+
+        offsets_read = []
+        original_read = pypoolparty.journal.read
+
+        def journal_read(path, offset=0):
+            offsets_read.append((path, offset))
+            return original_read(path=path, offset=offset)
+
+        monkeypatch.setattr(pypoolparty.journal, "read", journal_read)
+
+        offsets_before = dict(journal_offsets)
+        _append(paths[0], 0, "a")
+        assert read() == 1
+        assert offsets_read == [
+            (paths[0], offsets_before[0][1]),
+            (paths[1], offsets_before[1][1]),
+        ]
+        assert task_results_by_ichunk[0] == {0: "a", 1: "b"}
+
+        # the complete chunk's journal is not opened anymore
+        offsets_read.clear()
+        assert read() == 0
+        assert [path for path, offset in offsets_read] == [paths[1]]
+
+
+def test_read_task_results_from_journals_restarts_replaced_journal():
+    chunks = [[0, 1, 2]]
+    with tempfile.TemporaryDirectory(prefix="pypoolparty") as tmp:
+        path = pypoolparty.pooling.journal_path(tmp, 0)
+        task_results_by_ichunk = {}
+        journal_offsets = {}
+
+        def read():
+            return pypoolparty.pooling.read_task_results_from_journals(
+                work_dir=tmp,
+                chunks=chunks,
+                task_results_by_ichunk=task_results_by_ichunk,
+                journal_offsets=journal_offsets,
+            )
+
+        _append(path, 0, "a" * 100)
+        assert read() == 1
+
+        # the journal is gone
+        os.remove(path)
+        assert read() == 0
+        assert 0 not in journal_offsets
+
+        # a resubmission starts a new and shorter journal
+        _append(path, 1, "b")
+        assert read() == 1
+
+        # an other resubmission replaces the journal
+        _append(path + ".new", 1, "b")
+        _append(path + ".new", 2, "c" * 1000)
+        os.rename(path + ".new", path)
+        assert read() == 1
+        assert task_results_by_ichunk[0] == {
+            0: "a" * 100,
+            1: "b",
+            2: "c" * 1000,
+        }
+
+
+def test_find_chunks_done():
+    chunks = [[0, 1], [2], [3]]
+    with tempfile.TemporaryDirectory(prefix="pypoolparty") as tmp:
+        task_results_by_ichunk = {0: {0: "a"}, 1: {0: "b"}}
+        chunks_done = set()
+
+        def find():
+            return pypoolparty.pooling.find_chunks_done(
+                work_dir=tmp,
+                chunks=chunks,
+                task_results_by_ichunk=task_results_by_ichunk,
+                chunks_done=chunks_done,
+            )
+
+        assert find() == 1
+        assert chunks_done == {1}
+
+        # the '.pkl.out' marks a chunk done, even without its journal
+        pypoolparty.utils.write_pickle(
+            path=pypoolparty.pooling.chunk_path(tmp, 0) + ".out",
+            content=["a", "x"],
+        )
+        assert find() == 1
+        assert chunks_done == {0, 1}
+        assert find() == 0
+
+        # a done chunk's journal is not read anymore
+        _append(pypoolparty.pooling.journal_path(tmp, 0), 1, "x")
+        assert (
+            pypoolparty.pooling.read_task_results_from_journals(
+                work_dir=tmp,
+                chunks=chunks,
+                task_results_by_ichunk=task_results_by_ichunk,
+                journal_offsets={},
+                chunks_done=chunks_done,
+            )
+            == 0
+        )
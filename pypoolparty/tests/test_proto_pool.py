@@ -0,0 +1,131 @@
+import pypoolparty as ppp
+import pytest
+import subprocess
+import tempfile
+import time
+import sys
+import os
+
+
+def test_delete_func_is_called_for_each_job():
+    deleted = []
+
+    def delete_func(job, logger, tag):
+        deleted.append((job["name"], tag))
+
+    pool = ppp.proto_pool.Pool(
+        delete_func=delete_func, delete_func_kwargs={"tag": "x"}
+    )
+    pool._delete_jobs(jobs=[{"name": "a"}, {"name": "b"}], logger=None)
+    assert deleted == [("a", "x"), ("b", "x")]
+
+
+def test_delete_many_func_is_called_once():
+    calls = []
+
+    def delete_many_func(jobs, logger, tag):
+        calls.append(([job["name"] for job in jobs], tag))
+
+    pool = ppp.proto_pool.Pool(
+        delete_func=None,
+        delete_many_func=delete_many_func,
+        delete_func_kwargs={"tag": "x"},
+    )
+    pool._delete_jobs(jobs=[{"name": "a"}, {"name": "b"}], logger=None)
+    assert calls == [(["a", "b"], "x")]
+
+
+class BackgroundScheduler:
+    """
+    Runs each job right away in a process of its own. A job is running
+    as long as its process is alive.
+    """
+
+    def __init__(self):
+        self.procs = {}
+
+    def submit(
+        self,
+        jobname,
+        script_path,
+        script_arguments,
+        stdout_path,
+        stderr_path,
+        logger,
+    ):
+        with open(stdout_path, "wt") as o, open(stderr_path, "wt") as e:
+            self.procs[jobname] = subprocess.Popen(
+                [sys.executable, script_path] + script_arguments,
+                stdout=o,
+                stderr=e,
+            )
+        return None
+
+    def status(self, jobnames, logger, job_ids):
+        running = [
+            {"name": jobname}
+            for jobname, proc in self.procs.items()
+            if jobname in jobnames and proc.poll() is None
+        ]
+        return {"running": running, "pending": [], "error": []}
+
+
+def test_map_returns_promptly_when_last_chunk_is_done():
+    scheduler = BackgroundScheduler()
+    with tempfile.TemporaryDirectory(prefix="pypoolparty") as tmp:
+        pool = ppp.proto_pool.Pool(
+            polling_interval=0.1,
+            max_polling_interval=60.0,
+            reduction_interval=0.1,
+            max_reduction_interval=0.2,
+            work_dir=tmp,
+            keep_work_dir=True,
+            submit_func=scheduler.submit,
+            submit_func_kwargs={},
+            status_func=scheduler.status,
+            status_func_kwargs={},
+            delete_func=None,
+            delete_func_kwargs={},
+        )
+        # the scheduler's cadence backs off while the task sleeps
+        results = pool.map(func=ppp.testing.sleep_and_return, iterable=[4.0])
+        returned = time.time()
+        assert results == [4.0]
+
+        session_dir = os.path.join(tmp, os.listdir(tmp)[0])
+        out_path = ppp.pooling.chunk_path(session_dir, 0) + ".out"
+        assert returned - os.stat(out_path).st_mtime < 1.0
+
+
+def test_watcher_wakes_up_map_when_last_chunk_is_done():
+    scheduler = BackgroundScheduler()
+    with tempfile.TemporaryDirectory(prefix="pypoolparty") as tmp:
+        watcher = ppp.watching.Watcher(path=tmp, suffixes=[".pkl.out"])
+        mode = watcher.mode
+        watcher.close()
+        if mode != "inotify":
+            pytest.skip("The work_dir can not be watched.")
+
+        pool = ppp.proto_pool.Pool(
+            polling_interval=0.1,
+            max_polling_interval=60.0,
+            reduction_interval=0.1,
+            max_reduction_interval=60.0,
+            work_dir=tmp,
+            keep_work_dir=True,
+            submit_func=scheduler.submit,
+            submit_func_kwargs={},
+            status_func=scheduler.status,
+            status_func_kwargs={},
+            delete_func=None,
+            delete_func_kwargs={},
+            watch_work_dir=True,
+        )
+        # both cadences back off while the task sleeps
+        results = pool.map(func=ppp.testing.sleep_and_return, iterable=[4.0])
+        returned = time.time()
+        assert results == [4.0]
+
+        session_dir = os.path.join(tmp, os.listdir(tmp)[0])
+        out_path = ppp.pooling.chunk_path(session_dir, 0) + ".out"
+        assert returned - os.stat(out_path).st_mtime < 1.0
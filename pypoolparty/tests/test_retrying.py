@@ -0,0 +1,136 @@
+import pypoolparty as ppp
+import pytest
+import time
+
+
+class ListLogger:
+    def __init__(self):
+        self.msgs = []
+
+    def debug(self, msg):
+        self.msgs.append(msg)
+
+    def warning(self, msg):
+        self.msgs.append(msg)
+
+    def critical(self, msg):
+        self.msgs.append(msg)
+
+
+class Flaky:
+    def __init__(self, num_failures):
+        self.num_failures = num_failures
+        self.num_calls = 0
+
+    def __call__(self):
+        self.num_calls += 1
+        if self.num_calls <= self.num_failures:
+            raise OSError("squeue: error: slurm_receive_msg")
+        return "ok"
+
+
+def test_delay_grows_and_is_clamped():
+    policy = ppp.retrying.RetryPolicy(
+        min_delay=1.0, max_delay=5.0, factor=2.0, jitter=0.0
+    )
+    assert [policy.delay(num_retries=i) for i in [1, 2, 3, 4]] == [
+        1.0,
+        2.0,
+        4.0,
+        5.0,
+    ]
+
+    policy = ppp.retrying.RetryPolicy(min_delay=1.0, jitter=0.5)
+    for i in range(100):
+        assert 0.5 <= policy.delay(num_retries=1) <= 1.5
+
+
+def test_success_after_failures():
+    logger = ListLogger()
+    policy = ppp.retrying.RetryPolicy(min_delay=0.0, max_delay=0.0)
+    flaky = Flaky(num_failures=3)
+    assert policy.call(func=flaky, name="squeue", logger=logger) == "ok"
+    assert flaky.num_calls == 4
+
+    m = policy.metrics["squeue"]
+    assert m["num_calls"] == 1
+    assert m["num_failures"] == 3
+    assert m["num_retries"] == 3
+    assert m["num_give_ups"] == 0
+    assert "Call squeue" in logger.msgs[-1]
+    assert "failures 3" in logger.msgs[-1]
+
+
+def test_gives_up_after_max_num_retry():
+    policy = ppp.retrying.RetryPolicy(
+        max_num_retry=2,
+        min_delay=0.0,
+        max_delay=0.0,
+        max_num_consecutive_failures=None,
+    )
+    flaky = Flaky(num_failures=10)
+    with pytest.raises(ppp.retrying.RetryError) as err:
+        policy.call(func=flaky, name="sbatch")
+    assert isinstance(err.value.__cause__, OSError)
+    assert flaky.num_calls == 1 + 2
+    assert policy.metrics["sbatch"]["num_give_ups"] == 1
+
+
+def test_gives_up_at_deadline():
+    policy = ppp.retrying.RetryPolicy(
+        max_num_retry=None,
+        min_delay=0.05,
+        max_delay=0.05,
+        jitter=0.0,
+        deadline=0.12,
+        max_num_consecutive_failures=None,
+    )
+    flaky = Flaky(num_failures=100)
+    with pytest.raises(ppp.retrying.RetryError):
+        policy.call(func=flaky, name="qstat")
+    assert flaky.num_calls == 3
+
+
+def test_shared_budget():
+    policy = ppp.retrying.RetryPolicy(
+        max_num_retry=3,
+        min_delay=0.0,
+        max_delay=0.0,
+        max_num_consecutive_failures=None,
+    )
+    budget = policy.budget()
+    policy.call(func=Flaky(num_failures=2), name="qdel", budget=budget)
+    with pytest.raises(ppp.retrying.RetryError):
+        policy.call(func=Flaky(num_failures=2), name="qdel", budget=budget)
+
+
+def test_circuit_opens_and_waits_cooldown():
+    logger = ListLogger()
+    policy = ppp.retrying.RetryPolicy(
+        min_delay=0.0,
+        max_delay=0.0,
+        max_num_consecutive_failures=2,
+        circuit_cooldown=0.2,
+    )
+    flaky = Flaky(num_failures=2)
+    start = time.monotonic()
+    assert policy.call(func=flaky, name="scancel", logger=logger) == "ok"
+    assert time.monotonic() - start >= 0.2
+    assert policy.metrics["scancel"]["num_circuit_opens"] == 1
+    assert any("Circuit opened" in msg for msg in logger.msgs)
+
+    # a success closes the circuit again
+    assert policy.circuit_opened is None
+    assert policy.num_consecutive_failures == 0
+
+
+def test_circuit_open_beyond_deadline():
+    policy = ppp.retrying.RetryPolicy(
+        min_delay=0.0,
+        max_delay=0.0,
+        deadline=1.0,
+        max_num_consecutive_failures=1,
+        circuit_cooldown=60.0,
+    )
+    with pytest.raises(ppp.retrying.RetryError):
+        policy.call(func=Flaky(num_failures=1), name="squeue")
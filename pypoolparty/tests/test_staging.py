@@ -0,0 +1,162 @@
+import pypoolparty as ppp
+import tempfile
+import threading
+import time
+import os
+import pytest
+
+
+def test_each_chunk_is_submitted_after_it_was_written():
+    tasks = list(range(100))
+    chunks = ppp.chunking.assign_tasks_to_chunks(num_tasks=100, num_chunks=17)
+    submitted = []
+
+    with tempfile.TemporaryDirectory(prefix="pypoolparty") as tmp:
+
+        def submit(jobname, ichunk):
+            assert threading.current_thread() is not threading.main_thread()
+            path = ppp.pooling.chunk_path(tmp, ichunk)
+            assert ppp.utils.read_pickle(path) == [
+                tasks[i] for i in chunks[ichunk]
+            ]
+            submitted.append((jobname, ichunk))
+
+        jobnames = ppp.staging.write_and_submit_chunks(
+            work_dir=tmp,
+            tasks=tasks,
+            chunks=chunks,
+            session_id="abc",
+            submit=submit,
+            num_threads=3,
+            max_num_chunks_in_flight=5,
+        )
+
+    assert len(submitted) == len(chunks)
+    assert sorted([ichunk for _, ichunk in submitted]) == list(range(17))
+    assert jobnames == set([jobname for jobname, _ in submitted])
+    for jobname, ichunk in submitted:
+        assert ppp.pooling.make_ichunk_from_jobname(jobname) == ichunk
+
+
+def test_no_chunks():
+    with tempfile.TemporaryDirectory(prefix="pypoolparty") as tmp:
+        jobnames = ppp.staging.write_and_submit_chunks(
+            work_dir=tmp,
+            tasks=[],
+            chunks=[],
+            session_id="abc",
+            submit=None,
+        )
+    assert jobnames == set()
+
+
+def test_exception_in_writing_is_raised():
+    tasks = [1, 2, lambda x: x, 4, 5, 6, 7, 8]
+    chunks = [[i] for i in range(len(tasks))]
+    submitted = []
+
+    def submit(jobname, ichunk):
+        submitted.append(ichunk)
+
+    with tempfile.TemporaryDirectory(prefix="pypoolparty") as tmp:
+        with pytest.raises(Exception):
+            ppp.staging.write_and_submit_chunks(
+                work_dir=tmp,
+                tasks=tasks,
+                chunks=chunks,
+                session_id="abc",
+                submit=submit,
+                num_threads=1,
+                max_num_chunks_in_flight=1,
+            )
+    # The submissions which did not start yet are cancelled.
+    assert submitted in ([0], [0, 1])
+
+
+class SubmitError(Exception):
+    pass
+
+
+def test_exception_in_submitting_is_raised():
+    tasks = list(range(100))
+    chunks = [[i] for i in range(len(tasks))]
+    submitted = []
+
+    def submit(jobname, ichunk):
+        if len(submitted) == 3:
+            raise SubmitError()
+        submitted.append(ichunk)
+
+    with tempfile.TemporaryDirectory(prefix="pypoolparty") as tmp:
+        with pytest.raises(SubmitError):
+            ppp.staging.write_and_submit_chunks(
+                work_dir=tmp,
+                tasks=tasks,
+                chunks=chunks,
+                session_id="abc",
+                submit=submit,
+                num_threads=2,
+                max_num_chunks_in_flight=4,
+            )
+        num_written = len([f for f in os.listdir(tmp) if f.endswith(".pkl")])
+    assert len(submitted) == 3
+    assert num_written < len(chunks)
+
+
+def test_chunks_are_submitted_concurrently():
+    tasks = list(range(40))
+    chunks = [[i] for i in range(len(tasks))]
+    lock = threading.Lock()
+    running = {"now": 0, "max": 0}
+
+    def submit(jobname, ichunk):
+        with lock:
+            running["now"] += 1
+            running["max"] = max(running["max"], running["now"])
+        time.sleep(0.01)
+        with lock:
+            running["now"] -= 1
+
+    with tempfile.TemporaryDirectory(prefix="pypoolparty") as tmp:
+        jobnames = ppp.staging.write_and_submit_chunks(
+            work_dir=tmp,
+            tasks=tasks,
+            chunks=chunks,
+            session_id="abc",
+            submit=submit,
+            num_submit_threads=4,
+        )
+    assert len(jobnames) == len(chunks)
+    assert 1 < running["max"] <= 4
+
+
+def test_chunks_waiting_for_submission_count_as_in_flight():
+    chunks = [[i] for i in range(20)]
+    max_num_chunks_in_flight = 3
+    lock = threading.Lock()
+    num_returned = [0]
+    num_ahead = []
+
+    with tempfile.TemporaryDirectory(prefix="pypoolparty") as tmp:
+
+        def submit(jobname, ichunk):
+            time.sleep(0.02)
+            with lock:
+                num_written = len(
+                    [n for n in os.listdir(tmp) if n.endswith(".pkl")]
+                )
+                num_ahead.append(num_written - num_returned[0])
+                num_returned[0] += 1
+
+        ppp.staging.write_and_submit_chunks(
+            work_dir=tmp,
+            tasks=list(range(20)),
+            chunks=chunks,
+            session_id="abc",
+            submit=submit,
+            num_threads=2,
+            max_num_chunks_in_flight=max_num_chunks_in_flight,
+            num_submit_threads=1,
+        )
+    assert num_returned[0] == len(chunks)
+    assert max(num_ahead) <= max_num_chunks_in_flight
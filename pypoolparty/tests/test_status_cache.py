@@ -0,0 +1,112 @@
+import pypoolparty
+import multiprocessing
+import fcntl
+import pytest
+import os
+import tempfile
+import time
+
+
+def _refresh_slowly(counter_path):
+    with open(counter_path, "at") as f:
+        f.write("x")
+    time.sleep(0.5)
+    return "the queue"
+
+
+def _get(cache_dir, counter_path, out):
+    cache = pypoolparty.status_cache.StatusCache(
+        command=["squeue", "--me"], ttl=10.0, cache_dir=cache_dir
+    )
+    out.put(cache.get(refresh=lambda: _refresh_slowly(counter_path)))
+
+
+def test_hit_and_miss():
+    with tempfile.TemporaryDirectory(prefix="pypoolparty") as tmp:
+        cache = pypoolparty.status_cache.StatusCache(
+            command=["squeue", "--me"], ttl=0.5, cache_dir=tmp
+        )
+        calls = []
+
+        def refresh():
+            calls.append(1)
+            return "stdout {:d}".format(len(calls))
+
+        assert cache.get(refresh=refresh) == "stdout 1"
+        assert cache.get(refresh=refresh) == "stdout 1"
+        assert cache.statistics() == {"hits": 1, "misses": 1, "waits": 0}
+
+        # an other process with the same command shares the snapshot
+        other = pypoolparty.status_cache.StatusCache(
+            command=["squeue", "--me"], ttl=0.5, cache_dir=tmp
+        )
+        assert other.get(refresh=refresh) == "stdout 1"
+
+        # but not an other command
+        qstat = pypoolparty.status_cache.StatusCache(
+            command=["qstat", "-xml"], ttl=0.5, cache_dir=tmp
+        )
+        assert qstat.get(refresh=refresh) == "stdout 2"
+
+        time.sleep(0.6)
+        assert cache.get(refresh=refresh) == "stdout 3"
+        assert cache.statistics() == {"hits": 1, "misses": 2, "waits": 0}
+
+
+def test_only_one_refresh_in_flight():
+    with tempfile.TemporaryDirectory(prefix="pypoolparty") as tmp:
+        counter_path = os.path.join(tmp, "counter.txt")
+        ctx = multiprocessing.get_context("fork")
+        out = ctx.Queue()
+        procs = [
+            ctx.Process(target=_get, args=(tmp, counter_path, out))
+            for i in range(4)
+        ]
+        for proc in procs:
+            proc.start()
+        results = [out.get(timeout=30) for proc in procs]
+        for proc in procs:
+            proc.join()
+
+        assert results == ["the queue"] * 4
+        with open(counter_path, "rt") as f:
+            assert f.read() == "x"
+
+
+def test_lock_is_released_when_refresh_fails():
+    with tempfile.TemporaryDirectory(prefix="pypoolparty") as tmp:
+        cache = pypoolparty.status_cache.StatusCache(
+            command=["squeue", "--me"], ttl=10.0, cache_dir=tmp
+        )
+        calls = []
+
+        def refresh():
+            calls.append(1)
+            with open(cache.lock_path, "a") as lock:
+                with pytest.raises(BlockingIOError):
+                    fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            if len(calls) == 1:
+                raise OSError("squeue: error: slurm_receive_msg")
+            return "the queue"
+
+        # the retry waits without holding the lock
+        policy = pypoolparty.retrying.RetryPolicy(min_delay=0.0, max_delay=0.0)
+        assert (
+            policy.call(func=lambda: cache.get(refresh=refresh), name="squeue")
+            == "the queue"
+        )
+        assert len(calls) == 2
+        with open(cache.lock_path, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+
+def test_shared_instance_within_process():
+    with tempfile.TemporaryDirectory(prefix="pypoolparty") as tmp:
+        a = pypoolparty.status_cache.shared(
+            command=["squeue"], ttl=1.0, cache_dir=tmp
+        )
+        b = pypoolparty.status_cache.shared(
+            command=["squeue"], ttl=2.0, cache_dir=tmp
+        )
+        assert a is b
+        assert b.ttl == 2.0
@@ -0,0 +1,61 @@
+import pypoolparty as ppp
+import pytest
+import time
+
+
+class ListLogger:
+    def __init__(self):
+        self.msgs = []
+
+    def info(self, msg):
+        self.msgs.append(msg)
+
+
+def test_rate_limiter_spaces_the_calls():
+    limiter = ppp.submitting.RateLimiter(max_rate=50.0)
+    start = time.monotonic()
+    for i in range(6):
+        limiter.acquire()
+    assert time.monotonic() - start >= 5 / 50.0
+
+
+def test_rate_limiter_without_limit():
+    limiter = ppp.submitting.RateLimiter(max_rate=None)
+    start = time.monotonic()
+    for i in range(1000):
+        limiter.acquire()
+    assert time.monotonic() - start < 1.0
+
+
+def test_submitter_returns_results_and_logs_throughput():
+    logger = ListLogger()
+    submitter = ppp.submitting.Submitter(
+        submit=lambda jobname: jobname + ".id",
+        num_threads=3,
+        logger=logger,
+    )
+    futures = [submitter.submit(jobname=str(i)) for i in range(10)]
+    submitter.wait()
+
+    assert [f.result() for f in futures] == [str(i) + ".id" for i in range(10)]
+    s = submitter.statistics()
+    assert s["num_submitted"] == 10
+    assert s["latency_max"] >= s["latency_mean"] >= 0.0
+    assert len(logger.msgs) == 1
+    assert "Submitted 10 jobs" in logger.msgs[0]
+
+
+class SubmitError(Exception):
+    pass
+
+
+def test_submitter_raises_first_failure():
+    def submit(ichunk):
+        if ichunk == 3:
+            raise SubmitError()
+
+    submitter = ppp.submitting.Submitter(submit=submit, num_threads=2)
+    for ichunk in range(8):
+        submitter.submit(ichunk=ichunk)
+    with pytest.raises(SubmitError):
+        submitter.wait()
@@ -1,5 +1,9 @@
 import pypoolparty as ppp
+import json_line_logger
 import tempfile
+import multiprocessing
+import pytest
+import sys
 import os
 
 
@@ -26,3 +30,104 @@ def test_int_ceil_division():
     assert 3 == ppp.utils.int_ceil_division(10, 4)
     assert 4 == ppp.utils.int_ceil_division(10, 3)
     assert 5 == ppp.utils.int_ceil_division(10, 2)
+
+
+def test_num_cores_allotted():
+    assert ppp.utils.num_cores_allotted(num_cores=3) == 3
+    assert ppp.utils.num_cores_allotted(num_cores="auto", environ={}) == 1
+    assert (
+        ppp.utils.num_cores_allotted(
+            num_cores="auto", environ={"SLURM_CPUS_PER_TASK": "16"}
+        )
+        == 16
+    )
+    assert (
+        ppp.utils.num_cores_allotted(num_cores="auto", environ={"NSLOTS": "4"})
+        == 4
+    )
+    assert (
+        ppp.utils.num_cores_allotted(
+            num_cores="auto", environ={"SLURM_CPUS_PER_TASK": "nonsense"}
+        )
+        == 1
+    )
+
+
+def test_imap_unordered_on_cores():
+    for num_cores in [1, 3]:
+        results = ppp.utils.imap_unordered_on_cores(
+            func=sum, iterable=[[i, i] for i in range(20)], num_cores=num_cores
+        )
+        assert sorted(results) == [2 * i for i in range(20)]
+
+
+def _sum_in_child_processes(task):
+    with multiprocessing.get_context("fork").Pool(processes=2) as pool:
+        return sum(pool.map(abs, task))
+
+
+def test_imap_unordered_on_cores_func_may_start_processes():
+    results = ppp.utils.imap_unordered_on_cores(
+        func=_sum_in_child_processes,
+        iterable=[[-i, i] for i in range(6)],
+        num_cores=2,
+    )
+    assert sorted(results) == [2 * i for i in range(6)]
+
+
+def _inverse(x):
+    return 1 / x
+
+
+def test_imap_unordered_on_cores_raises_exception_of_func():
+    with pytest.raises(ZeroDivisionError):
+        for result in ppp.utils.imap_unordered_on_cores(
+            func=_inverse, iterable=[1, 2, 0, 4], num_cores=2
+        ):
+            pass
+
+
+def test_split_arguments():
+    groups = ppp.utils.split_arguments(["1234"] * 10, max_num_chars=12)
+    assert groups == [["1234"] * 2] * 5
+    assert ppp.utils.split_arguments([]) == []
+    # an argument longer than max_num_chars still gets a group of its own
+    groups = ppp.utils.split_arguments(["1", "123456", "2"], 4)
+    assert groups == [["1"], ["123456"], ["2"]]
+
+
+def test_call_with_arguments_in_groups():
+    with tempfile.TemporaryDirectory(prefix="pypoolparty") as tmp:
+        log_path = os.path.join(tmp, "calls.txt")
+        script = (
+            "import sys\n"
+            "with open(sys.argv[1], 'at') as f:\n"
+            "    f.write(' '.join(sys.argv[2:]) + '\\n')\n"
+            "if 'gone' in sys.argv:\n"
+            "    print('job gone does not exist')\n"
+            "    sys.exit(1)\n"
+        )
+        logger = json_line_logger.LoggerStdout()
+        ppp.utils.call_with_arguments_in_groups(
+            cmd=[sys.executable, "-c", script, log_path],
+            arguments=["1", "2", "3", "gone", "5"],
+            logger=logger,
+            is_harmless=lambda output: "does not exist" in output,
+            max_num_chars=4,
+        )
+        with open(log_path, "rt") as f:
+            assert f.read() == "1 2\n3\ngone\n5\n"
+
+        # the retries are shared by all groups
+        with pytest.raises(RuntimeError):
+            ppp.utils.call_with_arguments_in_groups(
+                cmd=[sys.executable, "-c", script, log_path],
+                arguments=["gone", "gone", "gone"],
+                logger=logger,
+                retry_policy=ppp.retrying.RetryPolicy(
+                    max_num_retry=2, min_delay=0.0, max_delay=0.0
+                ),
+                max_num_chars=5,
+            )
+        with open(log_path, "rt") as f:
+            assert f.read().count("gone\n") == 1 + 3
@@ -0,0 +1,56 @@
+import pypoolparty as ppp
+import tempfile
+import threading
+import time
+import os
+import pytest
+
+MOUNTS = (
+    "/dev/sda1 / ext4 rw,relatime 0 0\n"
+    "server:/export /mnt/shared nfs4 rw,relatime 0 0\n"
+    "tmpfs /mnt/shared/scratch\\040space tmpfs rw 0 0\n"
+)
+
+
+def test_filesystem_type():
+    fst = ppp.watching.filesystem_type
+    assert fst(path="/home/user", mounts=MOUNTS) == "ext4"
+    assert fst(path="/mnt/shared/work_dir", mounts=MOUNTS) == "nfs4"
+    assert fst(path="/mnt/sharedfoo", mounts=MOUNTS) == "ext4"
+    assert fst(path="/mnt/shared/scratch space/a", mounts=MOUNTS) == "tmpfs"
+    assert fst(path="/a", mounts="") is None
+
+
+def test_disabled_watcher_sleeps():
+    with tempfile.TemporaryDirectory(prefix="pypoolparty") as tmp:
+        with ppp.watching.Watcher(
+            path=tmp, suffixes=[".out"], enabled=False
+        ) as watcher:
+            assert watcher.mode == "polling"
+            start = time.monotonic()
+            assert not watcher.wait(timeout=0.2)
+            assert time.monotonic() - start >= 0.2
+
+
+def test_watcher_wakes_up_on_matching_file():
+    with tempfile.TemporaryDirectory(prefix="pypoolparty") as tmp:
+        with ppp.watching.Watcher(
+            path=tmp, suffixes=[".out"], min_interval=0.0
+        ) as watcher:
+            if watcher.mode != "inotify":
+                pytest.skip(watcher.reason)
+
+            def write_later():
+                time.sleep(0.1)
+                ppp.utils.write_text(os.path.join(tmp, "a.txt"), "no match")
+                time.sleep(0.1)
+                ppp.utils.write_text(os.path.join(tmp, "000.pkl.out"), "a")
+
+            thread = threading.Thread(target=write_later)
+            start = time.monotonic()
+            thread.start()
+            assert watcher.wait(timeout=30.0)
+            assert time.monotonic() - start < 10.0
+            thread.join()
+
+            assert not watcher.wait(timeout=0.1)
@@ -0,0 +1,70 @@
+import pypoolparty as ppp
+from pypoolparty import worker_runtime
+import os
+import time
+import pytest
+
+
+def test_run_with_limits_returns_result():
+    assert worker_runtime.run_with_limits(lambda: [1, 2]) == [1, 2]
+    assert worker_runtime.run_with_limits(lambda: [1, 2], timeout=10) == [1, 2]
+
+
+def test_run_with_limits_timeout():
+    start = time.monotonic()
+    with pytest.raises(worker_runtime.TaskTimeout):
+        worker_runtime.run_with_limits(
+            lambda: ppp.testing.sleep_and_return(60.0), timeout=0.5
+        )
+    assert time.monotonic() - start < 30.0
+
+
+def test_run_with_limits_max_memory():
+    with pytest.raises(worker_runtime.TaskMemoryExceeded):
+        worker_runtime.run_with_limits(
+            lambda: bytearray(2**32), max_memory=2**30
+        )
+
+
+def test_run_with_limits_exception_of_task():
+    with pytest.raises(ZeroDivisionError) as err:
+        worker_runtime.run_with_limits(lambda: 1 / 0, timeout=10)
+    assert isinstance(err.value.__cause__, worker_runtime.RemoteTraceback)
+    assert "ZeroDivisionError" in str(err.value.__cause__)
+
+
+def test_run_with_limits_process_died():
+    with pytest.raises(worker_runtime.TaskKilled):
+        worker_runtime.run_with_limits(lambda: os._exit(1), timeout=10)
+
+
+def test_run_with_limits_records_rusage_of_each_task():
+    def hungry():
+        block = bytearray(256 * 1024 * 1024)
+        for i in range(0, len(block), 4096):
+            block[i] = 1
+        return len(block)
+
+    telemetry_hungry = worker_runtime.TaskTelemetry(task_id=0)
+    worker_runtime.run_with_limits(
+        hungry, timeout=60, telemetry=telemetry_hungry
+    )
+    telemetry_small = worker_runtime.TaskTelemetry(task_id=1)
+    worker_runtime.run_with_limits(
+        lambda: 1, timeout=60, telemetry=telemetry_small
+    )
+
+    hungry_rss = telemetry_hungry.to_dict()["max_rss"]
+    small_rss = telemetry_small.to_dict()["max_rss"]
+    assert hungry_rss >= 256 * 1024 * 1024
+    assert small_rss < hungry_rss - 128 * 1024 * 1024
+    assert telemetry_hungry.to_dict()["cpu_time"] > 0.0
+
+
+def test_run_with_limits_records_rusage_on_timeout():
+    telemetry = worker_runtime.TaskTelemetry(task_id=0)
+    with pytest.raises(worker_runtime.TaskTimeout):
+        worker_runtime.run_with_limits(
+            lambda: time.sleep(10), timeout=0.2, telemetry=telemetry
+        )
+    assert telemetry.to_dict()["max_rss"] > 0
@@ -5,8 +5,13 @@ import time
 import rename_after_writing
 import pickle
 import random
+import subprocess
 import json_line_logger
 import uuid
+from . import oob_pickle
+from . import retrying
+from .worker_runtime import num_cores_allotted
+from .worker_runtime import imap_unordered_on_cores
 
 
 def arange(start, stop):
@@ -53,11 +58,33 @@ def write_text(path, content):
 
 
 def read_pickle(path):
-    return pickle.loads(read(path=path, mode="b"))
+    """
+    Reads both plain pickles and pickles with out-of-band buffers.
+    See oob_pickle.
+    """
+    return oob_pickle.read(path=path)
 
 
-def write_pickle(path, content):
-    write(path=path, content=pickle.dumps(content), mode="b")
+def write_pickle(path, content, oob=False):
+    """
+    Parameters
+    ----------
+    path : str
+        Path to write to.
+    content : object
+        To be pickled.
+    oob : bool
+        If True, the content is pickled with protocol 5 and its large
+        buffers, e.g. numpy arrays, are written out-of-band and aligned next
+        to the pickle-stream. See oob_pickle.
+    """
+    if oob:
+        chunks = oob_pickle.dumps_to_chunks(content)
+        with rename_after_writing.open(file=path, mode="wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+    else:
+        write(path=path, content=pickle.dumps(content), mode="b")
 
 
 def resources_path(package_name="pypoolparty"):
@@ -120,6 +147,90 @@ def random_sleep(timecooldown, logger):
     time.sleep(delta_time)
 
 
+# The arguments of one call of e.g. scancel or qdel are kept below this many
+# characters. Linux limits a single argument to 128KiB and all arguments and
+# the environment together to ARG_MAX.
+MAX_NUM_ARGUMENT_CHARS = 64 * 1024
+
+
+def split_arguments(arguments, max_num_chars=MAX_NUM_ARGUMENT_CHARS):
+    """
+    Returns the arguments split into groups whose total length, including
+    one separator for each argument, is not longer than max_num_chars.
+    """
+    groups = []
+    group = []
+    num_chars = 0
+    for argument in arguments:
+        argument = str(argument)
+        if group and num_chars + len(argument) + 1 > max_num_chars:
+            groups.append(group)
+            group = []
+            num_chars = 0
+        group.append(argument)
+        num_chars += len(argument) + 1
+    if group:
+        groups.append(group)
+    return groups
+
+
+def call_with_arguments_in_groups(
+    cmd,
+    arguments,
+    logger,
+    is_harmless=None,
+    timeout=None,
+    retry_policy=None,
+    max_num_chars=MAX_NUM_ARGUMENT_CHARS,
+):
+    """
+    Calls cmd + group for each group of the arguments, see
+    split_arguments(). A failed call is retried. All groups share one
+    budget of retries.
+
+    Parameters
+    ----------
+    cmd : list of str
+        E.g. ['scancel'].
+    arguments : list of str
+        E.g. the ids of the jobs.
+    is_harmless : function or None
+        Called with the output of a call which returned non zero. When it
+        returns True, the call is not retried, e.g. when the jobs to be
+        deleted are already gone.
+    retry_policy : retrying.RetryPolicy or None
+        How a failed call is retried. Default is retrying.RetryPolicy().
+    """
+    if retry_policy is None:
+        retry_policy = retrying.RetryPolicy()
+
+    name = os.path.basename(cmd[0])
+
+    def call(group):
+        logger.debug(
+            "calling {:s} with {:d} arguments".format(name, len(group))
+        )
+        try:
+            subprocess.check_output(
+                cmd + group, stderr=subprocess.STDOUT, timeout=timeout
+            )
+        except subprocess.CalledProcessError as bad:
+            output = bad.output.decode(errors="replace")
+            if is_harmless is not None and is_harmless(output):
+                logger.debug("{:s}: {:s}".format(name, output.strip()))
+                return
+            raise RuntimeError(output) from bad
+
+    budget = retry_policy.budget()
+    for group in split_arguments(arguments, max_num_chars=max_num_chars):
+        retry_policy.call(
+            func=lambda: call(group),
+            name=name,
+            logger=logger,
+            budget=budget,
+        )
+
+
 def dict_sum(d):
     num = 0
     for key in d:
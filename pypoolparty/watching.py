@@ -0,0 +1,240 @@
+"""
+Wakes the loops of the pools as soon as the worker-nodes write their results
+into the work_dir instead of sleeping for a full polling_interval.
+
+On linux, the work_dir is watched with inotify which is called via ctypes.
+Inotify only sees the changes made by the local kernel. So when the work_dir
+is on a shared filesystem, e.g. NFS, the changes made by other nodes are not
+seen and the Watcher falls back to polling, i.e. it just sleeps. The Watcher
+also falls back to polling when inotify is not available.
+"""
+
+import os
+import re
+import time
+import errno
+import select
+import struct
+
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+EVENT = struct.Struct("iIII")
+
+# Inotify does not see the changes made by other nodes on these.
+REMOTE_FILESYSTEMS = {
+    "nfs",
+    "nfs4",
+    "cifs",
+    "smb3",
+    "smbfs",
+    "lustre",
+    "gpfs",
+    "beegfs",
+    "ceph",
+    "glusterfs",
+    "afs",
+    "panfs",
+    "9p",
+}
+
+
+class Watcher:
+    """
+    Waits until a file with one of the suffixes is written into a directory,
+    or until a timeout.
+    """
+
+    def __init__(self, path, suffixes, enabled=True, min_interval=0.1):
+        """
+        Parameters
+        ----------
+        path : str
+            The directory to be watched, e.g. the work_dir.
+        suffixes : list of str
+            Only files whose names end with one of these suffixes wake the
+            Watcher, e.g. [".pkl.out"].
+        enabled : bool
+            If False, the Watcher always falls back to polling.
+        min_interval : float
+            The Watcher does not wake up earlier than this many seconds
+            after it woke up the last time. This limits the rate of polls
+            when many results are written.
+        """
+        self.path = path
+        self.suffixes = tuple(suffixes)
+        self.min_interval = float(min_interval)
+        self.fd = None
+        self.last_wake = time.monotonic()
+
+        if not enabled:
+            self.reason = "watching is disabled"
+            return
+
+        reliable, self.reason = inotify_is_reliable(path=path)
+        if not reliable:
+            return
+
+        try:
+            self.fd = inotify_watch(
+                path=path, mask=IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO
+            )
+            self.reason = "inotify"
+        except (OSError, ImportError) as err:
+            self.reason = "inotify failed: {:s}".format(str(err))
+
+    @property
+    def mode(self):
+        return "polling" if self.fd is None else "inotify"
+
+    def wait(self, timeout):
+        """
+        Returns True when a matching file was written, or False after
+        timeout seconds.
+        """
+        deadline = time.monotonic() + timeout
+        if self.fd is None:
+            time.sleep(timeout)
+            return False
+
+        earliest = self.last_wake + self.min_interval
+        woken = False
+        while True:
+            now = time.monotonic()
+            if woken and now >= earliest:
+                break
+            if now >= deadline:
+                break
+            if woken:
+                time.sleep(min(earliest, deadline) - now)
+                continue
+            ready, _, _ = select.select([self.fd], [], [], deadline - now)
+            if ready and self._read_events():
+                woken = True
+
+        self.last_wake = time.monotonic()
+        return woken
+
+    def _read_events(self):
+        match = False
+        for mask, name in read_inotify_events(fd=self.fd):
+            if mask & IN_Q_OVERFLOW:
+                match = True
+            elif name.endswith(self.suffixes):
+                match = True
+        return match
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, type, value, traceback):
+        self.close()
+
+    def __repr__(self):
+        return "{:s}(path={:s}, mode={:s})".format(
+            self.__class__.__name__, repr(self.path), repr(self.mode)
+        )
+
+
+def inotify_is_reliable(path, mounts_path="/proc/self/mounts"):
+    """
+    Returns (reliable, reason). Inotify is reliable when it is available and
+    when the path is on a filesystem which is local to this node.
+    """
+    if not os.path.exists(mounts_path):
+        return False, "no {:s}, not linux".format(mounts_path)
+    with open(mounts_path, "rt") as f:
+        fstype = filesystem_type(path=path, mounts=f.read())
+    if fstype is None:
+        return False, "unknown filesystem"
+    if fstype in REMOTE_FILESYSTEMS or fstype.startswith("fuse"):
+        return False, "filesystem '{:s}' is not local".format(fstype)
+    return True, "filesystem '{:s}'".format(fstype)
+
+
+def filesystem_type(path, mounts):
+    """
+    Returns the type of the filesystem the path is on, or None.
+
+    Parameters
+    ----------
+    path : str
+        Path to a file or directory.
+    mounts : str
+        The content of '/proc/self/mounts'.
+    """
+    path = os.path.realpath(path)
+    best = None
+    for line in mounts.splitlines():
+        fields = line.split()
+        if len(fields) < 3:
+            continue
+        mount_point = _unescape_octal(fields[1])
+        if path == mount_point or path.startswith(
+            mount_point.rstrip("/") + "/"
+        ):
+            if best is None or len(mount_point) >= len(best[0]):
+                best = (mount_point, fields[2])
+    return None if best is None else best[1]
+
+
+def _unescape_octal(s):
+    # e.g. spaces in mount points are written as '\040'.
+    return re.sub(r"\\([0-7]{3})", lambda m: chr(int(m.group(1), 8)), s)
+
+
+def inotify_watch(path, mask):
+    """
+    Returns the non-blocking file-descriptor of a new inotify instance
+    which watches path for the events in mask.
+    """
+    import ctypes
+    import ctypes.util
+
+    libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+    if not hasattr(libc, "inotify_init1"):
+        raise OSError(errno.ENOSYS, "No inotify in libc.")
+
+    fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+    if fd < 0:
+        num = ctypes.get_errno()
+        raise OSError(num, os.strerror(num))
+
+    wd = libc.inotify_add_watch(
+        ctypes.c_int(fd), os.fsencode(path), ctypes.c_uint32(mask)
+    )
+    if wd < 0:
+        num = ctypes.get_errno()
+        os.close(fd)
+        raise OSError(num, os.strerror(num))
+    return fd
+
+
+def read_inotify_events(fd):
+    """
+    Returns the list of (mask, name) of the events which are ready to be
+    read from the inotify file-descriptor fd.
+    """
+    events = []
+    while True:
+        try:
+            data = os.read(fd, 64 * 1024)
+        except BlockingIOError:
+            break
+        pos = 0
+        while pos + EVENT.size <= len(data):
+            _, mask, _, size = EVENT.unpack_from(data, pos)
+            pos += EVENT.size
+            name = data[pos : pos + size].rstrip(b"\0")
+            pos += size
+            events.append((mask, os.fsdecode(name)))
+    return events
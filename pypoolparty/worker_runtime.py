@@ -0,0 +1,757 @@
+"""
+The runtime of the scripts executed on the worker-nodes.
+
+It only depends on python's standard library and on the modules oob_pickle,
+flat_archive, and journal which themselves only depend on the standard
+library. The worker-node's script loads this module from its file without
+importing the package pypoolparty, see make_load_string(). This way a
+worker-node does not import the backends, the loggers, and the other
+dependencies of pypoolparty which are only needed on the process-node.
+When there are many worker-nodes which read their site-packages from a
+shared filesystem, this saves a lot of time and file-system-load.
+"""
+
+import os
+import sys
+import time
+import json
+import pickle
+import select
+import signal
+import zipfile
+import traceback
+import contextlib
+import importlib.util
+
+
+def _load_sibling(name):
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), name)
+    spec = importlib.util.spec_from_file_location(
+        "pypoolparty_worker_runtime_" + name, path + ".py"
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+if __package__:
+    from . import oob_pickle
+    from . import flat_archive
+    from . import journal
+else:
+    oob_pickle = _load_sibling("oob_pickle")
+    flat_archive = _load_sibling("flat_archive")
+    journal = _load_sibling("journal")
+
+
+def make_load_string(name="rt"):
+    """
+    Returns a python-code string which loads this module from its file
+    without importing the package pypoolparty and assigns it to name.
+    """
+    return (
+        "import importlib.util\n"
+        "\n"
+        "\n"
+        "def _load_worker_runtime():\n"
+        '    spec = importlib.util.find_spec("pypoolparty")\n'
+        "    path = os.path.join(\n"
+        '        spec.submodule_search_locations[0], "worker_runtime.py"\n'
+        "    )\n"
+        "    spec = importlib.util.spec_from_file_location(\n"
+        '        "pypoolparty_worker_runtime", path\n'
+        "    )\n"
+        "    module = importlib.util.module_from_spec(spec)\n"
+        "    spec.loader.exec_module(module)\n"
+        "    return module\n"
+        "\n"
+        "\n"
+        "{:s} = _load_worker_runtime()\n".format(name)
+    )
+
+
+def read_pickle(path):
+    """
+    Reads both plain pickles and pickles with out-of-band buffers.
+    See oob_pickle.
+    """
+    return oob_pickle.read(path=path)
+
+
+def write(path, chunks):
+    """
+    Writes the chunks of bytes one after another into a temporary file next
+    to path and moves it to path when all chunks are written. This way,
+    a reader never sees a partially written file at path.
+    """
+    tmp_path = "{:s}.{:d}.part".format(path, os.getpid())
+    try:
+        with open(tmp_path, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def write_text(path, content):
+    write(path=path, chunks=[content.encode()])
+
+
+def write_pickle(path, content, oob=False):
+    """
+    Parameters
+    ----------
+    path : str
+        Path to write to.
+    content : object
+        To be pickled.
+    oob : bool
+        If True, the content is pickled with out-of-band buffers.
+        See oob_pickle.
+    """
+    if oob:
+        chunks = oob_pickle.dumps_to_chunks(content)
+    else:
+        chunks = [pickle.dumps(content)]
+    write(path=path, chunks=chunks)
+
+
+def apply_environ(path):
+    """
+    Sets the environment variables in the json-file at path which are
+    missing in, or differ from, the environment of this process.
+    Returns the number of variables which were set.
+    See pypoolparty.environment.
+    """
+    with open(path, "rt") as f:
+        environ = json.loads(f.read())
+
+    num = 0
+    for key, value in environ.items():
+        if os.environ.get(key) != value:
+            os.environ[key] = value
+            num += 1
+    return num
+
+
+def seconds_since_process_start():
+    """
+    Returns the time in seconds since this process was started, including
+    the start of the interpreter. Only on linux. Returns None when the time
+    can not be read.
+    """
+    try:
+        with open("/proc/self/stat", "rt") as f:
+            stat = f.read()
+        with open("/proc/uptime", "rt") as f:
+            uptime = float(f.read().split()[0])
+        # The name of the executable in parentheses may contain spaces.
+        fields = stat[stat.rindex(")") + 2 :].split()
+        start_ticks = int(fields[19])
+        return uptime - start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def num_cores_allotted(num_cores=1, environ=None):
+    """
+    Returns the number of cores a job on a worker-node shall run its tasks
+    on.
+
+    Parameters
+    ----------
+    num_cores : int or str
+        Either the explicit number of cores, or 'auto'. When 'auto', the
+        number is read from the environment variable 'SLURM_CPUS_PER_TASK'
+        (slurm) or 'NSLOTS' (sun grid engine). Defaults to 1 when neither
+        is set.
+    environ : dict or None
+        The environment variables. Default is os.environ.
+    """
+    if num_cores != "auto":
+        num_cores = int(num_cores)
+        assert num_cores >= 1
+        return num_cores
+
+    if environ is None:
+        environ = os.environ
+
+    for key in ["SLURM_CPUS_PER_TASK", "NSLOTS"]:
+        try:
+            return max(1, int(environ[key]))
+        except (KeyError, ValueError):
+            pass
+    return 1
+
+
+def imap_unordered_on_cores(func, iterable, num_cores=1):
+    """
+    Yields func(item) for each item in iterable. When num_cores > 1, the
+    items are processed by a local pool of this many forked processes and
+    the results are yielded in the order they are completed.
+    The processes are not daemonic, so func may start processes of its own,
+    e.g. a multiprocessing.Pool.
+    """
+    if num_cores <= 1:
+        for item in iterable:
+            yield func(item)
+        return
+
+    # Only imported here to keep the start of serial workers fast.
+    import multiprocessing
+    import concurrent.futures
+    import itertools
+
+    # Not to duplicate buffered output into the forked processes.
+    sys.stdout.flush()
+    sys.stderr.flush()
+    items = iter(iterable)
+    with concurrent.futures.ProcessPoolExecutor(
+        max_workers=num_cores,
+        mp_context=multiprocessing.get_context("fork"),
+    ) as ex:
+        # Each process has one item to work on and one item waiting.
+        in_flight = set()
+        try:
+            for item in itertools.islice(items, 2 * num_cores):
+                in_flight.add(ex.submit(func, item))
+
+            while len(in_flight) > 0:
+                done, in_flight = concurrent.futures.wait(
+                    in_flight, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                for future in done:
+                    for item in itertools.islice(items, 1):
+                        in_flight.add(ex.submit(func, item))
+                    yield future.result()
+        finally:
+            for future in in_flight:
+                future.cancel()
+
+
+@contextlib.contextmanager
+def redirect_stdout_and_stderr(stdout_path, stderr_path):
+    """
+    Redirects the file-descriptors of stdout and stderr into the files at
+    stdout_path and stderr_path. This also captures the output of
+    subprocesses and of compiled extensions.
+    """
+    sys.stdout.flush()
+    sys.stderr.flush()
+    original_stdout = os.dup(1)
+    original_stderr = os.dup(2)
+    try:
+        with open(stdout_path, "wb") as fout, open(stderr_path, "wb") as ferr:
+            os.dup2(fout.fileno(), 1)
+            os.dup2(ferr.fileno(), 2)
+            try:
+                yield
+            finally:
+                sys.stdout.flush()
+                sys.stderr.flush()
+                os.dup2(original_stdout, 1)
+                os.dup2(original_stderr, 2)
+    finally:
+        os.close(original_stdout)
+        os.close(original_stderr)
+
+
+class TaskLimitExceeded(Exception):
+    """
+    A task exceeded one of the limits set by run_with_limits().
+    """
+
+
+class TaskTimeout(TaskLimitExceeded):
+    """
+    A task ran longer than its timeout and was killed.
+    """
+
+
+class TaskMemoryExceeded(TaskLimitExceeded):
+    """
+    A task tried to allocate more memory than its max_memory.
+    """
+
+
+class TaskKilled(TaskLimitExceeded):
+    """
+    The process of a task died without reporting its result, e.g. it was
+    killed by a signal.
+    """
+
+
+class RemoteTraceback(Exception):
+    """
+    The traceback of an exception raised in the forked process of a task.
+    """
+
+    def __init__(self, tb):
+        self.tb = tb
+
+    def __str__(self):
+        return self.tb
+
+
+def run_with_limits(func, timeout=None, max_memory=None, telemetry=None):
+    """
+    Returns func(). When timeout or max_memory is set, func is called in a
+    forked process so that the caller survives when func hangs or runs
+    out of memory, and can move on to its next task.
+
+    Parameters
+    ----------
+    func : callable
+        Called without arguments. Its return value must be picklable.
+    timeout : float or None
+        Wall-clock time in seconds. When func did not return in time, its
+        process is killed and TaskTimeout is raised.
+    max_memory : int or None
+        Limit of the address space in bytes of func's process, see
+        resource.RLIMIT_AS. When func runs out of memory,
+        TaskMemoryExceeded is raised.
+    telemetry : TaskTelemetry or None
+        If provided, the resource usage of func's process, i.e. its cpu
+        time and its maximum resident set size, is recorded in the
+        telemetry.
+
+    Raises
+    ------
+    The exception raised by func, with the traceback of func's process as
+    its cause, or one of the subclasses of TaskLimitExceeded.
+    """
+    if timeout is None and max_memory is None:
+        return func()
+
+    # Not to duplicate buffered output into the forked process.
+    sys.stdout.flush()
+    sys.stderr.flush()
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        _run_with_limits_in_child(func, max_memory, write_fd)
+    # In its own process-group to kill also the subprocesses of func. Both
+    # the child and the parent set it, so that it is set before either one
+    # continues.
+    try:
+        os.setpgid(pid, pid)
+    except OSError:
+        pass
+    os.close(write_fd)
+
+    deadline = None if timeout is None else time.monotonic() + timeout
+    try:
+        payload = _read_until_eof(fd=read_fd, deadline=deadline)
+    finally:
+        os.close(read_fd)
+
+    if payload is None:
+        rusage = _kill_process_group(pid)
+        if telemetry is not None:
+            telemetry.add_rusage_of_task(rusage)
+        raise TaskTimeout(
+            "The task exceeded its timeout of {:g}s.".format(timeout)
+        )
+
+    _, status, rusage = os.wait4(pid, 0)
+    if telemetry is not None:
+        telemetry.add_rusage_of_task(rusage)
+    if len(payload) == 0:
+        raise TaskKilled(
+            "The task's process died without a result, "
+            "wait-status: {:d}.".format(status)
+        )
+
+    kind, value = pickle.loads(payload)
+    if kind == "result":
+        return value
+    elif kind == "memory":
+        raise TaskMemoryExceeded(
+            "The task exceeded its max_memory of {:d} bytes.".format(
+                max_memory
+            )
+        ) from RemoteTraceback(value)
+    else:
+        exception, tb = value
+        if exception is None:
+            raise RemoteTraceback(tb)
+        raise exception from RemoteTraceback(tb)
+
+
+def _run_with_limits_in_child(func, max_memory, write_fd):
+    try:
+        try:
+            os.setpgid(0, 0)
+        except OSError:
+            pass
+        if max_memory is not None:
+            import resource
+
+            max_memory = int(max_memory)
+            resource.setrlimit(resource.RLIMIT_AS, (max_memory, max_memory))
+        try:
+            payload = pickle.dumps(("result", func()))
+        except MemoryError:
+            payload = pickle.dumps(("memory", traceback.format_exc()))
+        except Exception as err:
+            tb = traceback.format_exc()
+            try:
+                payload = pickle.dumps(("exception", (err, tb)))
+            except Exception:
+                payload = pickle.dumps(("exception", (None, tb)))
+        view = memoryview(payload)
+        while len(view) > 0:
+            view = view[os.write(write_fd, view) :]
+        sys.stdout.flush()
+        sys.stderr.flush()
+    finally:
+        os._exit(0)
+
+
+def _read_until_eof(fd, deadline=None):
+    """
+    Returns the bytes read from fd until its end, or None when the deadline
+    (time.monotonic()) passed before.
+    """
+    chunks = []
+    while True:
+        if deadline is not None:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0.0:
+                return None
+            ready, _, _ = select.select([fd], [], [], remaining)
+            if not ready:
+                return None
+        chunk = os.read(fd, 1024 * 1024)
+        if len(chunk) == 0:
+            return b"".join(chunks)
+        chunks.append(chunk)
+
+
+def _kill_process_group(pid):
+    """
+    Kills the process-group of pid and returns the resource usage of pid.
+    """
+    try:
+        os.killpg(pid, signal.SIGKILL)
+    except OSError:
+        os.kill(pid, signal.SIGKILL)
+    _, _, rusage = os.wait4(pid, 0)
+    return rusage
+
+
+class TaskTelemetry:
+    """
+    Measures the telemetry of one task on the worker-node: its wall time,
+    its cpu time, the time spent on reading and writing (io), the maximum
+    resident set size of the process, the hostname, and the latency from
+    the submission of the job until the start of the worker's process.
+    """
+
+    def __init__(self, task_id, submit_time=None):
+        """
+        Parameters
+        ----------
+        task_id : int
+            The task's id.
+        submit_time : float or None
+            The time (unix) the job was submitted.
+        """
+        self.task_id = int(task_id)
+        self.submit_time = submit_time
+        self.start_time = time.time()
+        self._start_perf = time.perf_counter()
+        self._start_cpu = cpu_time()
+        self._start_cpu_self = cpu_time(children=False)
+        self.io_time = 0.0
+        self.rusage_cpu_time = 0.0
+        self.rusage_max_rss = None
+
+    def add_rusage_of_task(self, rusage):
+        """
+        Records the resource usage, see os.wait4(), of a process which ran
+        the task, e.g. in run_with_limits(). Its cpu time is counted for
+        the task, and its maximum resident set size is the task's.
+        """
+        self.rusage_cpu_time += rusage.ru_utime + rusage.ru_stime
+        self.rusage_max_rss = max(
+            self.rusage_max_rss or 0, _ru_maxrss_in_bytes(rusage.ru_maxrss)
+        )
+
+    @contextlib.contextmanager
+    def io(self):
+        """
+        Adds the time spent within this context to the io time.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.io_time += time.perf_counter() - start
+
+    def to_dict(self):
+        """
+        Returns the telemetry up to now.
+        """
+        return {
+            "task_id": self.task_id,
+            "start_time": self.start_time,
+            "wall_time": time.perf_counter() - self._start_perf,
+            "cpu_time": self._cpu_time(),
+            "io_time": self.io_time,
+            "max_rss": self._max_rss(),
+            "queue_latency": queue_latency(submit_time=self.submit_time),
+            "hostname": os.uname().nodename,
+        }
+
+    def _cpu_time(self):
+        if self.rusage_max_rss is None:
+            return cpu_time() - self._start_cpu
+        # The children's counters are cumulative and include the process of
+        # the task which is already counted in its rusage.
+        return (
+            cpu_time(children=False)
+            - self._start_cpu_self
+            + (self.rusage_cpu_time)
+        )
+
+    def _max_rss(self):
+        if self.rusage_max_rss is None:
+            return max_rss()
+        return self.rusage_max_rss
+
+
+def cpu_time(children=True):
+    """
+    Returns the cpu time in seconds of this process and, if children, of
+    its terminated child processes.
+    """
+    times = os.times()
+    out = times.user + times.system
+    if children:
+        out += times.children_user + times.children_system
+    return out
+
+
+def max_rss():
+    """
+    Returns the maximum resident set size in bytes of this process, or None
+    when it can not be read. This is the peak since the start of the
+    process. The peak of a task which ran in its own process is recorded
+    with TaskTelemetry.add_rusage_of_task().
+    """
+    try:
+        import resource
+
+        ru_maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    except (ImportError, OSError):
+        return None
+    return _ru_maxrss_in_bytes(ru_maxrss)
+
+
+def _ru_maxrss_in_bytes(ru_maxrss):
+    # ru_maxrss is in kilobytes on linux, but in bytes on macos.
+    return ru_maxrss if sys.platform == "darwin" else 1024 * ru_maxrss
+
+
+def queue_latency(submit_time):
+    """
+    Returns the time in seconds from submit_time until this process was
+    started, or None when it is not known.
+    """
+    age = seconds_since_process_start()
+    if submit_time is None or age is None:
+        return None
+    return (time.time() - age) - submit_time
+
+
+def write_telemetry(work_dir, telemetry):
+    """
+    Writes the telemetry of a task into '{task_id}.telemetry' in the
+    work_dir, see pypoolparty.slurm.array.telemetry.
+    """
+    write_text(
+        path=os.path.join(
+            work_dir, "{:d}.telemetry".format(telemetry.task_id)
+        ),
+        content=json.dumps(telemetry.to_dict()),
+    )
+
+
+# The tasks of a slurm.array.Pool
+# -------------------------------
+
+TASK_STORES = {"zip": ".zip", "flat": ".bin"}
+
+
+def tasks_path(work_dir, ibatch=None, task_store="zip", ishard=None):
+    """
+    Returns the path of the file holding the tasks.
+    When the tasks were written in batches, each batch has its own file.
+    When the tasks were written in shards, each shard has its own file.
+
+    Parameters
+    ----------
+    work_dir : str
+        Path to the work_dir.
+    ibatch : int or None
+        Index of the batch. None if the tasks were not written in batches.
+    task_store : str
+        Either 'zip' or 'flat'. The 'zip' store is a zip-file with one
+        '{task_id}.pickle' per task. The 'flat' store is a flat_archive with
+        a fixed-width index which allows to read a task in constant time.
+    ishard : int or None
+        Index of the shard. None if the tasks were not written in shards.
+    """
+    extension = TASK_STORES[task_store]
+    basename = "tasks"
+    if ibatch is not None:
+        basename += ".{:06d}".format(ibatch)
+    if ishard is not None:
+        basename += ".shard{:06d}".format(ishard)
+    return os.path.join(work_dir, basename + extension)
+
+
+def shared_path(work_dir):
+    return os.path.join(work_dir, "shared.pkl")
+
+
+_shared_by_path = {}
+
+
+def read_shared_from_work_dir(work_dir):
+    """
+    Returns the shared object in the work_dir. It is read only once per
+    process and is kept in memory for the following calls.
+    """
+    path = shared_path(work_dir)
+    if path not in _shared_by_path:
+        _shared_by_path[path] = read_pickle(path=path)
+    return _shared_by_path[path]
+
+
+def chunk_task_ids_path(work_dir, ichunk):
+    return os.path.join(work_dir, "{:d}.chunk.json".format(ichunk))
+
+
+def read_chunk_task_ids(work_dir, ichunk, chunksize):
+    """
+    Returns the task_ids in the chunk. When there is no explicit list of
+    the chunk's task_ids, the chunk holds the range of chunksize tasks
+    starting at 'ichunk * chunksize'.
+    """
+    try:
+        with open(chunk_task_ids_path(work_dir=work_dir, ichunk=ichunk)) as f:
+            return json.loads(f.read())
+    except FileNotFoundError:
+        return list(range(ichunk * chunksize, (ichunk + 1) * chunksize))
+
+
+def locate_task(task_id, num_tasks_per_batch=None, num_shards=None):
+    """
+    Returns the batch, the shard, and the position within the file of the
+    batch and shard where the task with task_id is stored.
+
+    Parameters
+    ----------
+    task_id : int
+        The task's id.
+    num_tasks_per_batch : int or None
+        The number of tasks in a batch, or None if there are no batches.
+    num_shards : int or None
+        The number of shards, or None if there are no shards.
+        The shard of a task is 'task_id % num_shards'.
+
+    Returns
+    -------
+    (ibatch, ishard, position) : (int or None, int or None, int)
+    """
+    if num_tasks_per_batch is None:
+        ibatch = None
+        position = task_id
+    else:
+        ibatch = task_id // num_tasks_per_batch
+        position = task_id % num_tasks_per_batch
+
+    if num_shards is None:
+        ishard = None
+    else:
+        ishard = task_id % num_shards
+        position = position // num_shards
+
+    return ibatch, ishard, position
+
+
+def read_task_from_work_dir(
+    work_dir,
+    task_id,
+    num_tasks_per_batch=None,
+    task_store="zip",
+    num_shards=None,
+):
+    ibatch, ishard, position = locate_task(
+        task_id=task_id,
+        num_tasks_per_batch=num_tasks_per_batch,
+        num_shards=num_shards,
+    )
+    path = tasks_path(
+        work_dir, ibatch=ibatch, task_store=task_store, ishard=ishard
+    )
+
+    if task_store == "flat":
+        key, payload = flat_archive.read_view(path=path, position=position)
+        assert key == task_id, "Expected task_id {:d}, but found {:d}.".format(
+            task_id, key
+        )
+        return oob_pickle.loads(payload)
+
+    task_filename = "{:d}.pickle".format(task_id)
+    with zipfile.ZipFile(file=path, mode="r") as zin:
+        task = oob_pickle.read_zip_member(
+            path=path, zin=zin, name=task_filename
+        )
+    return task
+
+
+COMPLETED_WITH_RESULT = b"r"
+COMPLETED_WITH_EXCEPTION = b"e"
+
+
+def completions_path(work_dir):
+    return os.path.join(work_dir, "tasks.completions.journal")
+
+
+def append_completion(work_dir, task_id, with_result):
+    """
+    Appends a fixed-size record to the work_dir's journal of completions
+    when a task has written its result, or its exception, and its
+    telemetry. The Reducer reads only the records which are new since its
+    last poll instead of listing the work_dir. See journal.
+
+    Parameters
+    ----------
+    work_dir : str
+        The work_dir of the slurm.array.Pool.
+    task_id : int
+        The task's id.
+    with_result : bool
+        If True, the task wrote '{task_id}.pickle', else
+        '{task_id}.exception'.
+    """
+    fd = journal.open_for_appending(path=completions_path(work_dir))
+    try:
+        journal.append(
+            fd=fd,
+            key=task_id,
+            payload=(
+                COMPLETED_WITH_RESULT
+                if with_result
+                else COMPLETED_WITH_EXCEPTION
+            ),
+        )
+    finally:
+        os.close(fd)